@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from backend.metrics import TimedRepresentationMixin
 from .models import Address
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = (
@@ -0,0 +1,111 @@
+"""Cola de salida acotada por conexión, con coalescencia, para consumidores síncronos.
+
+ASGI no da control de flujo al escribir en el socket: cuando una conexión (o el
+hilo compartido de los consumidores) se atrasa, lo que crece es la cola del
+canal en la capa, y channels_redis descarta en silencio los mensajes que
+exceden su `capacity`. Por eso el atraso se mide en el consumidor y por
+conexión: `dispatch` anota con `time.monotonic()` cuándo llegó cada mensaje al
+lado asíncrono, y el handler lo compara con el momento en que el hilo síncrono
+lo procesa. No se usa la hora del publicador (otro host, otro reloj).
+
+- Sin atraso (menos de `DELIVERIES_WS_LAG_SECONDS`) y sin cola, el frame se
+  envía de inmediato.
+- Con atraso, el frame pasa a la cola de la conexión, indexada por el `id` del
+  objeto: un estado más nuevo del mismo objeto reemplaza al anterior. Al
+  encolar el primero se manda un mensaje `outbound.flush` al propio canal; como
+  llega detrás de todo lo atrasado, al procesarlo la cola ya tiene solo el
+  último estado de cada objeto y se envía de una vez.
+- Si la cola de la conexión pasa de `DELIVERIES_WS_QUEUE_MAX` objetos, solo esa
+  conexión se cierra con `RESUME_CLOSE_CODE` (4008): el cliente debe reconectar
+  y el snapshot inicial del connect le devuelve el estado completo.
+"""
+import itertools
+import time
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from backend.metrics import registry
+
+
+RESUME_CLOSE_CODE = 4008
+FLUSH_MESSAGE = {'type': 'outbound.flush'}
+
+_unkeyed = itertools.count()
+
+
+def coalesce_key(frame):
+    """Clave de coalescencia: el `id` del objeto del frame, o una única si no tiene."""
+    data = frame.get('data') if isinstance(frame, dict) else None
+    if isinstance(data, dict) and data.get('id') is not None:
+        return str(data['id'])
+    return ('unkeyed', next(_unkeyed))
+
+
+class BackpressureConsumerMixin:
+    """Envía los broadcasts con `send_coalesced` en lugar de `send_json`.
+
+    Requiere `JsonWebsocketConsumer` (o compatible) y una capa de canales, y
+    debe ir antes que los mixins que redefinen `dispatch` (como
+    `InstrumentedConsumerMixin`) para anotar la llegada antes del salto al hilo.
+    """
+
+    _outbound = None
+    _flush_pending = False
+    _shed = False
+    _received_at = None
+
+    async def dispatch(self, message):
+        self._received_at = time.monotonic()
+        await super().dispatch(message)
+
+    def send_coalesced(self, frame):
+        if self._shed:
+            return
+        route = self._backpressure_route()
+        lag = 0.0
+        if self._received_at is not None:
+            lag = max(time.monotonic() - self._received_at, 0.0)
+            registry.observe('ws_event_lag_seconds', (route,), lag)
+
+        if lag < getattr(settings, 'DELIVERIES_WS_LAG_SECONDS', 1.0) and not self._outbound:
+            self.send_json(frame)
+            return
+
+        if self._outbound is None:
+            self._outbound = OrderedDict()
+        key = coalesce_key(frame)
+        if key in self._outbound:
+            # Solo el último estado de cada objeto, en la posición del más reciente
+            del self._outbound[key]
+            registry.inc('ws_coalesced_total', (route,))
+        self._outbound[key] = frame
+        if len(self._outbound) > getattr(settings, 'DELIVERIES_WS_QUEUE_MAX', 500):
+            self._shed_connection(route, 'queue')
+            return
+        if not self._flush_pending:
+            self._flush_pending = True
+            try:
+                async_to_sync(self.channel_layer.send)(self.channel_name, dict(FLUSH_MESSAGE))
+            except Exception:
+                # Canal lleno (o capa caída): no hay forma de programar el vaciado
+                self.outbound_flush(FLUSH_MESSAGE)
+
+    def outbound_flush(self, message):
+        self._flush_pending = False
+        if self._shed or not self._outbound:
+            return
+        frames, self._outbound = list(self._outbound.values()), OrderedDict()
+        registry.observe('ws_outbound_queue_depth', (self._backpressure_route(),), len(frames))
+        for frame in frames:
+            self.send_json(frame)
+
+    def _shed_connection(self, route, reason):
+        self._shed = True
+        self._outbound = None
+        registry.inc('ws_shed_total', (route, reason))
+        self.close(code=RESUME_CLOSE_CODE)
+
+    def _backpressure_route(self):
+        return self.scope.get('url_route', {}).get('kwargs', {}).get('group_type') or 'unknown'
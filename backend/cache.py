@@ -0,0 +1,207 @@
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Clave en L2 cuyo valor cambia con cada escritura de una clave que vive en L1
+STAMP_KEY = 'backend:l1_stamp'
+
+
+class TwoTierCache(BaseCache):
+    """Caché de dos niveles: L1 en memoria (LRU acotado) delante de una caché compartida (L2).
+
+    L2 es otro alias de `CACHES` (Redis en producción) y es la fuente de verdad.
+    Solo las claves con alguno de los prefijos `L1_KEY_PREFIXES` se copian a L1:
+    están pensadas para valores muy leídos y poco escritos (JWKS, versión del
+    catálogo, ...). Cada escritura de una de esas claves cambia un sello en L2;
+    cada proceso revisa el sello como mucho cada `STAMP_INTERVAL` segundos y, si
+    cambió, vacía su L1. Así la invalidación llega a todos los workers con un
+    retraso acotado, y aun sin ella ninguna copia en L1 dura más de `L1_TIMEOUT`.
+
+    Si L2 falla (p. ej. Redis caído) las lecturas se tratan como fallos de caché
+    y las escrituras se descartan, registrando un warning: la caché nunca tumba
+    una petición.
+
+    OPTIONS: L2 (alias, por defecto 'shared'), L1_MAX_ENTRIES (1024),
+    L1_TIMEOUT (5 s), STAMP_INTERVAL (1 s), L1_KEY_PREFIXES (vacío = todas).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 1024)
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._stamp_interval = options.get('STAMP_INTERVAL', 1.0)
+        self._l1_prefixes = tuple(options.get('L1_KEY_PREFIXES', ()))
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._stamp_checked_at = 0.0
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # --- L1 -----------------------------------------------------------------
+
+    def _in_l1(self, key):
+        return not self._l1_prefixes or key.startswith(self._l1_prefixes)
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            payload, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(payload)
+
+    def _l1_set(self, key, value, timeout):
+        ttl = self._l1_timeout if timeout is None else min(self._l1_timeout, timeout)
+        if ttl <= 0:
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (payload, time.monotonic() + ttl)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _check_stamp(self):
+        now = time.monotonic()
+        if now - self._stamp_checked_at < self._stamp_interval:
+            return
+        self._stamp_checked_at = now
+        stamp = self._l2_call('get', STAMP_KEY)
+        if stamp != self._stamp:
+            with self._lock:
+                self._l1.clear()
+            self._stamp = stamp
+
+    def _invalidate(self, key):
+        """Descarta la copia local y avisa a los demás procesos cambiando el sello."""
+        self._l1_discard(key)
+        stamp = uuid.uuid4().hex
+        self._l2_call('set', STAMP_KEY, stamp, None)
+        self._stamp = stamp
+
+    # --- L2 -----------------------------------------------------------------
+
+    def _l2_call(self, method, *args, default=None, **kwargs):
+        try:
+            return getattr(self.l2, method)(*args, **kwargs)
+        except Exception:
+            logger.warning('Caché compartida no disponible (%s)', method, exc_info=True)
+            return default
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # --- API de BaseCache ---------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        version = version or self.version
+        if not self._in_l1(key):
+            return self._l2_call('get', key, default, version=version, default=default)
+        self._check_stamp()
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self._l1_get(l1_key)
+        if value is not _MISSING:
+            return value
+        value = self._l2_call('get', key, _MISSING, version=version, default=_MISSING)
+        if value is _MISSING:
+            return default
+        self._l1_set(l1_key, value, self._l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = version or self.version
+        self._l2_call('set', key, value, self._timeout(timeout), version=version)
+        if self._in_l1(key):
+            self._invalidate(self.make_and_validate_key(key, version=version))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = version or self.version
+        added = self._l2_call('add', key, value, self._timeout(timeout), version=version, default=False)
+        if added and self._in_l1(key):
+            self._invalidate(self.make_and_validate_key(key, version=version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._l2_call('touch', key, self._timeout(timeout), version=version or self.version, default=False)
+
+    def delete(self, key, version=None):
+        version = version or self.version
+        deleted = self._l2_call('delete', key, version=version, default=False)
+        if self._in_l1(key):
+            self._invalidate(self.make_and_validate_key(key, version=version))
+        return deleted
+
+    def get_many(self, keys, version=None):
+        version = version or self.version
+        if any(self._in_l1(key) for key in keys):
+            return super().get_many(keys, version=version)
+        # Una sola ida y vuelta a L2 para claves que no se copian en L1
+        return self._l2_call('get_many', keys, version=version, default={})
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        version = version or self.version
+        value = self.l2.incr(key, delta, version=version)
+        if self._in_l1(key):
+            self._invalidate(self.make_and_validate_key(key, version=version))
+        return value
+
+    def incr_many(self, deltas, timeout=DEFAULT_TIMEOUT, version=None):
+        """Suma cada `delta` a su clave, creándola si no existe (`{clave: delta}`).
+
+        Con Redis como L2 se envía en un solo pipeline (INCRBY y EXPIRE por clave),
+        así un volcado de miles de claves es una ida y vuelta y no dos por clave.
+        Con otro L2 se hace `add` o `incr` clave por clave.
+        """
+        version = version or self.version
+        timeout = self._timeout(timeout)
+        l2 = self.l2
+        if isinstance(l2, RedisCache):
+            backend_timeout = l2.get_backend_timeout(timeout)
+            with l2._cache.get_client(write=True).pipeline(transaction=False) as pipe:
+                for key, delta in deltas.items():
+                    l2_key = l2.make_and_validate_key(key, version=version)
+                    pipe.incrby(l2_key, delta)
+                    if backend_timeout is not None:
+                        pipe.expire(l2_key, max(backend_timeout, 1))
+                pipe.execute()
+        else:
+            for key, delta in deltas.items():
+                if not l2.add(key, delta, timeout, version=version):
+                    l2.incr(key, delta, version=version)
+        for key in deltas:
+            if self._in_l1(key):
+                self._invalidate(self.make_and_validate_key(key, version=version))
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self._l2_call('clear')
+        self._stamp = None
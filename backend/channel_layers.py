@@ -0,0 +1,177 @@
+"""Capa de Channels sobre Redis que entrega en memoria a los miembros del propio proceso.
+
+Con `RedisChannelLayer` cada `group_send` viaja a Redis y vuelve, aunque todos los
+miembros del grupo (p. ej. `new_quotes`) estén conectados al mismo worker que
+publica: un `EVAL` para encolar, y en el proceso receptor un `BZPOPMIN` y la
+limpieza del respaldo por mensaje.
+
+`HybridRedisChannelLayer` lee los miembros del grupo en Redis como siempre, pero
+los canales de este proceso (los que llevan su `client_prefix`) los entrega
+directo en el buffer de recepción local, igual que haría el bucle de recepción
+al sacar el mensaje de Redis. Solo los miembros de otros procesos van a Redis,
+y channels_redis ya los agrupa en un mensaje por proceso (`__asgi_channel__`).
+Si no hay miembros remotos no se hace `EVAL` ni se toca ningún canal en Redis.
+
+La entrega local se hace en el event loop donde el proceso recibe mensajes. Si
+todavía no hay ninguno (nadie ha llamado a `receive`) los canales locales se
+envían por Redis como antes. `send` a un canal concreto no cambia.
+
+Los buffers locales respetan los mismos límites que Redis: un canal con
+`get_capacity(channel)` mensajes pendientes no recibe más (como el `EVAL` de
+`group_send`, el mensaje nuevo se descarta), y el buffer de un canal que nadie
+lee desde hace `group_expiry` segundos se descarta, igual que Redis olvida a los
+miembros del grupo que no se renuevan.
+
+Depende de métodos internos de channels_redis 4 (`_map_channel_keys_to_connection`,
+`receive_single`), por eso no es la capa por defecto. Uso (settings):
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'backend.channel_layers.HybridRedisChannelLayer', 'CONFIG': {...}}}
+"""
+import asyncio
+import logging
+import time
+
+from channels_redis.core import RedisChannelLayer
+
+
+logger = logging.getLogger(__name__)
+
+
+class HybridRedisChannelLayer(RedisChannelLayer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Event loop en el que los consumidores de este proceso reciben mensajes
+        self._local_loop = None
+        self._pump = None
+        self.local_deliveries = 0
+        # Canal local -> time.monotonic() de su última lectura (o de la creación del buffer)
+        self._buffer_read_at = {}
+        self._next_sweep = 0.0
+
+    async def receive(self, channel):
+        """Como `RedisChannelLayer.receive`, pero sin turnarse el `BZPOPMIN`.
+
+        En la capa original el receptor que tiene el lock queda bloqueado en
+        Redis (hasta `brpop_timeout`) y no vería un mensaje entregado en memoria
+        a su propio canal. Aquí una sola tarea por proceso lee de Redis y
+        reparte en `receive_buffer`, y cada receptor solo espera su buffer.
+        """
+        if '!' not in channel:
+            return await super().receive(channel)
+        assert self.require_valid_channel_name(channel)
+        real_channel = self.non_local_name(channel)
+        assert real_channel.endswith(self.client_prefix + '!'), 'Wrong client prefix'
+        loop = asyncio.get_running_loop()
+        self._local_loop = loop
+        self.receive_count += 1
+        buffer = self.receive_buffer[channel]
+        self._buffer_read_at[channel] = time.monotonic()
+        try:
+            while buffer.empty():
+                pump = self._ensure_pump(loop, real_channel)
+                getter = asyncio.ensure_future(buffer.get())
+                try:
+                    await asyncio.wait([getter, pump], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    if not getter.done():
+                        getter.cancel()
+                if getter.done() and not getter.cancelled():
+                    return getter.result()
+                if not pump.cancelled() and pump.exception() is not None:
+                    raise pump.exception()
+            return buffer.get_nowait()
+        finally:
+            self.receive_count -= 1
+            if self.receive_buffer.get(channel) is buffer:
+                if buffer.empty():
+                    del self.receive_buffer[channel]
+                    self._buffer_read_at.pop(channel, None)
+                else:
+                    self._buffer_read_at[channel] = time.monotonic()
+
+    def _ensure_pump(self, loop, real_channel):
+        pump = self._pump
+        if pump is not None and not pump.done():
+            if pump.get_loop() is loop:
+                return pump
+            if not pump.get_loop().is_closed():
+                raise RuntimeError('Two event loops are trying to receive() on one channel layer at once!')
+        self._pump = loop.create_task(self._pump_messages(real_channel))
+        return self._pump
+
+    async def _pump_messages(self, real_channel):
+        # Mientras haya receptores; al salir el último termina tras su `BZPOPMIN`
+        while self.receive_count:
+            message_channel, message = await self.receive_single(real_channel)
+            channels = message_channel if isinstance(message_channel, list) else [message_channel]
+            self._buffer_all(channels, message)
+
+    async def flush(self):
+        if self._pump is not None and not self._pump.done():
+            self._pump.cancel()
+        self._pump = None
+        await super().flush()
+
+    def _is_local(self, channel):
+        return '!' in channel and self.non_local_name(channel).endswith(self.client_prefix + '!')
+
+    def _map_channel_keys_to_connection(self, channel_names, message):
+        # `group_send` llama a este método con los miembros del grupo justo antes
+        # de encolar en Redis: aquí se separan y entregan los locales.
+        loop = self._local_loop
+        if loop is not None and not loop.is_closed():
+            local = [channel for channel in channel_names if self._is_local(channel)]
+            if local:
+                channel_names = [channel for channel in channel_names if not self._is_local(channel)]
+                self._deliver_locally(loop, local, message)
+        return super()._map_channel_keys_to_connection(channel_names, message)
+
+    def _deliver_locally(self, loop, channels, message):
+        # Un mismo dict para todos los canales locales, como al deserializar de Redis
+        message = dict(message)
+
+        def deliver():
+            self.local_deliveries += self._buffer_all(channels, message)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            deliver()
+        else:
+            # Publicación desde otro hilo/loop (p. ej. un async_to_sync sin loop principal)
+            loop.call_soon_threadsafe(deliver)
+
+    def _buffer_all(self, channels, message):
+        """Encola `message` en el buffer de cada canal local; devuelve cuántos lo aceptaron."""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._expire_buffers(now)
+        accepted = 0
+        for channel in channels:
+            buffer = self.receive_buffer.get(channel)
+            if buffer is None:
+                buffer = self.receive_buffer[channel]
+                self._buffer_read_at[channel] = now
+            elif buffer.qsize() >= self.get_capacity(channel):
+                continue
+            buffer.put_nowait(message)
+            accepted += 1
+        if accepted < len(channels):
+            logger.info('%s of %s local channels over capacity', len(channels) - accepted, len(channels))
+        return accepted
+
+    def _expire_buffers(self, now):
+        # Como mucho una pasada por segundo: recorre todos los buffers pendientes
+        self._next_sweep = now + 1
+        stale = [
+            channel for channel, read_at in self._buffer_read_at.items()
+            if now - read_at > self.group_expiry
+        ]
+        for channel in stale:
+            buffer = self.receive_buffer.get(channel)
+            # Un buffer vacío es de un receptor que espera: no está abandonado
+            if buffer is not None and buffer.empty():
+                continue
+            self.receive_buffer.pop(channel, None)
+            del self._buffer_read_at[channel]
@@ -0,0 +1,62 @@
+import hashlib
+
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag):
+    """True si `If-None-Match` de la petición incluye `etag` (comparación débil)."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    return _strip_weak(etag) in {_strip_weak(candidate) for candidate in candidates}
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Agrega `ETag`/`Last-Modified` a la respuesta y la devuelve."""
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(etag=None, last_modified=None):
+    """Respuesta 304 sin cuerpo con los mismos validadores que la respuesta completa."""
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+
+def make_etag(*parts):
+    """ETag fuerte a partir de las partes dadas (versión, ids, ...)."""
+    return quote_etag('-'.join(str(part) for part in parts))
+
+
+def digest_etag(*parts):
+    """ETag compacto: hash de las partes (timestamps, conteos, versiones)."""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest()[:20])
+
+
+def latest(*values):
+    """Máximo de los timestamps no nulos (para Last-Modified), o None."""
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def conditional_response(request, etag, last_modified, build):
+    """304 si `If-None-Match` coincide con `etag`; si no, `build()` con los validadores.
+
+    Los validadores se calculan antes con una consulta barata, así en el caso
+    304 no se serializa nada.
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
+    return set_validators(build(), etag, last_modified)
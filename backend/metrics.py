@@ -0,0 +1,369 @@
+"""Métricas por endpoint en memoria del proceso, expuestas en formato Prometheus.
+
+Por cada petición HTTP (`MetricsMiddleware`) y cada evento de `DeliveryConsumer`
+(`InstrumentedConsumerMixin`) se registran, por nombre de ruta: tiempo total,
+número de consultas y tiempo en la base de datos, tiempo de serialización y
+broadcasts emitidos (cantidad y bytes). Cada broadcast se mide además por tipo
+de evento y prefijo de grupo (`quote_*`, `user_quotes_*`, ...): bytes, tiempo de
+codificación, tiempo bloqueado en `group_send` y fallos. Todo vive en
+histogramas del proceso que `metrics_view` publica en `/metrics`.
+
+El costo por petición es un par de `perf_counter()` por consulta y un lock
+corto al final, así que se puede dejar activo en producción (`METRICS_ENABLED`).
+Cada worker tiene su propio registro: Prometheus debe raspar cada proceso o
+sumar las series.
+"""
+import contextlib
+import contextvars
+import hmac
+import threading
+import time
+from bisect import bisect_left
+
+from channels.db import database_sync_to_async
+from channels.consumer import get_handler_name
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+DEPTH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+# Grupos de Channels por prefijo: el sufijo (id de usuario, cotización, ...) no es etiqueta
+BROADCAST_GROUP_PREFIXES = (
+    'user_quotes_', 'user_deliveries_', 'driver_deliveries_', 'driver_offers_',
+    'person_stats_', 'quote_', 'delivery_',
+)
+BROADCAST_STATIC_GROUPS = ('new_quotes',)
+
+
+class _Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label_values, value):
+        entry = self.series.get(label_values)
+        if entry is None:
+            entry = self.series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            labels = _format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_bucket{{{labels},le="+Inf"}} {count}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {count}'
+
+
+class _Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, label_values, amount=1):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for label_values, value in sorted(self.series.items()):
+            yield f'{self.name}{{{_format_labels(self.labels, label_values)}}} {value}'
+
+
+def _format_labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+class Registry:
+    """Conjunto de métricas del proceso; todas las escrituras van bajo un único lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        for kind, event_label in (('http', 'method'), ('ws', 'event')):
+            labels = ('route', event_label)
+            self._add(_Histogram(f'{kind}_request_duration_seconds', 'Tiempo total de la petición', labels, LATENCY_BUCKETS))
+            self._add(_Histogram(f'{kind}_request_db_queries', 'Consultas a la base de datos por petición', labels, QUERY_BUCKETS))
+            self._add(_Histogram(f'{kind}_request_db_seconds', 'Tiempo en la base de datos por petición', labels, LATENCY_BUCKETS))
+            self._add(_Histogram(f'{kind}_request_serializer_seconds', 'Tiempo de serialización por petición', labels, LATENCY_BUCKETS))
+            self._add(_Counter(f'{kind}_broadcasts_total', 'Mensajes enviados a grupos de Channels', labels))
+            self._add(_Counter(f'{kind}_broadcast_bytes_total', 'Bytes (JSON) enviados a grupos de Channels', labels))
+        self._add(_Counter('http_responses_total', 'Respuestas por código de estado', ('route', 'method', 'status')))
+        self._add(_Counter('ws_sent_bytes_total', 'Bytes enviados a los sockets', ('route',)))
+        # Cola de salida por conexión (backend.backpressure)
+        self._add(_Histogram('ws_event_lag_seconds', 'Atraso entre la llegada al consumidor y el envío al socket', ('route',), LATENCY_BUCKETS))
+        self._add(_Histogram('ws_outbound_queue_depth', 'Frames en la cola de salida al vaciarla', ('route',), DEPTH_BUCKETS))
+        self._add(_Counter('ws_coalesced_total', 'Frames reemplazados por un estado más nuevo del mismo objeto', ('route',)))
+        self._add(_Counter('ws_shed_total', 'Conexiones cerradas por atraso (4008)', ('route', 'reason')))
+        # Pipeline de broadcasts (deliveries.services.expiration._broadcast), por evento y prefijo de grupo
+        labels = ('event', 'group')
+        self._add(_Histogram('broadcast_payload_bytes', 'Tamaño del mensaje codificado', labels, BYTES_BUCKETS))
+        self._add(_Histogram('broadcast_serialize_seconds', 'Tiempo de codificar el mensaje a JSON', labels, FAST_BUCKETS))
+        self._add(_Histogram('broadcast_send_seconds', 'Tiempo bloqueado en group_send', labels, FAST_BUCKETS))
+        self._add(_Counter('broadcast_failures_total', 'Broadcasts fallidos por etapa', ('event', 'group', 'stage')))
+        self._add(_Counter('broadcast_skipped_total', 'Broadcasts descartados por no haber suscriptores', labels))
+        self._add(_Histogram('broadcast_render_seconds', 'Tiempo del serializer que arma el payload de un evento',
+                             ('event',), FAST_BUCKETS))
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+
+    def record(self, kind, label_values, stats, duration):
+        with self._lock:
+            metrics = self._metrics
+            metrics[f'{kind}_request_duration_seconds'].observe(label_values, duration)
+            metrics[f'{kind}_request_db_queries'].observe(label_values, stats.queries)
+            metrics[f'{kind}_request_db_seconds'].observe(label_values, stats.db_time)
+            metrics[f'{kind}_request_serializer_seconds'].observe(label_values, stats.serializer_time)
+            if stats.broadcasts:
+                metrics[f'{kind}_broadcasts_total'].inc(label_values, stats.broadcasts)
+                metrics[f'{kind}_broadcast_bytes_total'].inc(label_values, stats.broadcast_bytes)
+
+    def inc(self, name, label_values, amount=1):
+        with self._lock:
+            self._metrics[name].inc(label_values, amount)
+
+    def observe(self, name, label_values, value):
+        with self._lock:
+            self._metrics[name].observe(label_values, value)
+
+    def record_broadcast(self, label_values, size, serialize_seconds, send_seconds):
+        with self._lock:
+            metrics = self._metrics
+            metrics['broadcast_payload_bytes'].observe(label_values, size)
+            metrics['broadcast_serialize_seconds'].observe(label_values, serialize_seconds)
+            metrics['broadcast_send_seconds'].observe(label_values, send_seconds)
+
+    def totals(self, name):
+        """{etiquetas: (suma, cantidad)} de un histograma, o {etiquetas: valor} de un contador."""
+        with self._lock:
+            metric = self._metrics[name]
+            if isinstance(metric, _Histogram):
+                return {labels: (entry[1], entry[2]) for labels, entry in metric.series.items()}
+            return dict(metric.series)
+
+    def render(self):
+        with self._lock:
+            lines = [line for metric in self._metrics.values() for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+    """Acumulador de una petición (o evento de WebSocket) en curso."""
+
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth', 'broadcasts', 'broadcast_bytes')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.broadcasts = 0
+        self.broadcast_bytes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Firma de `connection.execute_wrapper`
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+_current = contextvars.ContextVar('backend_metrics_stats', default=None)
+
+
+@contextlib.contextmanager
+def track(kind, label_values):
+    """Mide el bloque y lo registra bajo `kind` ('http' o 'ws') y las etiquetas dadas.
+
+    `label_values` puede ser una función: se evalúa al final, cuando la ruta ya
+    está resuelta.
+    """
+    stats = RequestStats()
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            yield stats
+    finally:
+        duration = time.perf_counter() - start
+        _current.reset(token)
+        registry.record(kind, label_values() if callable(label_values) else label_values, stats, duration)
+
+
+def record_broadcast(size):
+    """Cuenta un `group_send` de `size` bytes en la petición en curso (si la hay)."""
+    stats = _current.get()
+    if stats is not None:
+        stats.broadcasts += 1
+        stats.broadcast_bytes += size
+
+
+def broadcast_group(group_name):
+    """Prefijo del grupo para usarlo como etiqueta (`quote_<uuid>` -> `quote_*`)."""
+    for prefix in BROADCAST_GROUP_PREFIXES:
+        if group_name.startswith(prefix):
+            return prefix + '*'
+    return group_name if group_name in BROADCAST_STATIC_GROUPS else 'other'
+
+
+def broadcast_event(payload):
+    event = payload.get('type') if isinstance(payload, dict) else None
+    return event if isinstance(event, str) else 'unknown'
+
+
+def observe_broadcast(event, group_name, size, serialize_seconds, send_seconds):
+    """Registra un broadcast enviado: bytes, tiempo de codificación y de `group_send`."""
+    if getattr(settings, 'METRICS_ENABLED', True):
+        registry.record_broadcast((event, broadcast_group(group_name)), size, serialize_seconds, send_seconds)
+
+
+def broadcast_failed(event, group_name, stage):
+    """Cuenta un broadcast fallido en `stage` ('serialize' o 'send')."""
+    if getattr(settings, 'METRICS_ENABLED', True):
+        registry.inc('broadcast_failures_total', (event, broadcast_group(group_name), stage))
+
+
+def broadcast_skipped(event, group_name):
+    """Cuenta un broadcast descartado porque el grupo no tiene suscriptores."""
+    if getattr(settings, 'METRICS_ENABLED', True):
+        registry.inc('broadcast_skipped_total', (event, broadcast_group(group_name)))
+
+
+@contextlib.contextmanager
+def timed_render(event):
+    """Mide el serializer que arma el payload de `event` (p. ej. en las señales)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if getattr(settings, 'METRICS_ENABLED', True):
+            registry.observe('broadcast_render_seconds', (event,), time.perf_counter() - start)
+
+
+class TimedRepresentationMixin:
+    """Suma el tiempo de `to_representation` a la petición en curso.
+
+    Solo se mide el serializador más externo; los anidados quedan incluidos en
+    su tiempo y no se cuentan dos veces.
+    """
+
+    def to_representation(self, instance):
+        stats = _current.get()
+        if stats is None or stats.serializer_depth:
+            return super().to_representation(instance)
+        stats.serializer_depth = 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+            stats.serializer_depth = 0
+
+
+def _route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Sin ruta resuelta (404): una sola serie para no disparar la cardinalidad
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Registra cada petición HTTP bajo el nombre de su ruta (p. ej. `delivery-detail`)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def labels():
+            return (_route_name(request), request.method)
+
+        with track('http', labels):
+            response = self.get_response(request)
+        route, method = labels()
+        registry.inc('http_responses_total', (route, method, response.status_code))
+        return response
+
+
+class InstrumentedConsumerMixin:
+    """Equivalente de `MetricsMiddleware` para consumidores síncronos de Channels.
+
+    Cada mensaje despachado (connect, receive, disconnect, broadcast, ...) se
+    registra con `route` igual al `group_type` de la ruta y `event` igual al
+    tipo del mensaje.
+    """
+
+    @database_sync_to_async
+    def dispatch(self, message):
+        handler = getattr(self, get_handler_name(message), None)
+        if not handler:
+            raise ValueError('No handler for message type %s' % message['type'])
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            handler(message)
+            return
+        with track('ws', (self._metrics_route(), message['type'])):
+            handler(message)
+
+    def send(self, text_data=None, bytes_data=None, close=False):
+        if getattr(settings, 'METRICS_ENABLED', True):
+            size = len(text_data.encode()) if text_data is not None else len(bytes_data or b'')
+            if size:
+                registry.inc('ws_sent_bytes_total', (self._metrics_route(),), size)
+        super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+    def send_json(self, content, close=False):
+        # `JsonWebsocketConsumer.send_json` llama a `WebsocketConsumer.send`
+        # directamente; pasar por `self.send` para contar los bytes
+        self.send(text_data=self.encode_json(content), close=close)
+
+    def _metrics_route(self):
+        return self.scope.get('url_route', {}).get('kwargs', {}).get('group_type') or 'unknown'
+
+
+def metrics_view(request):
+    """Exposición en formato texto de Prometheus.
+
+    Exige `Authorization: Bearer <METRICS_TOKEN>`. Sin token configurado solo
+    responde con `DEBUG` activo: en producción un token olvidado cierra el
+    endpoint en lugar de dejarlo abierto.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,23 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) ordenada por (created_at, id), de más reciente a más antiguo.
+
+    El cursor guarda la posición de `created_at` del último elemento, así que cada
+    página se obtiene con `WHERE created_at < posición ORDER BY created_at DESC, id DESC
+    LIMIT n` sobre los índices compuestos: una página profunda cuesta lo mismo que
+    la primera. `id` solo desempata registros con el mismo `created_at`.
+
+    El tamaño de página se controla con `?page_size=` (por defecto `API_PAGE_SIZE`)
+    y nunca supera `API_MAX_PAGE_SIZE`.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        self.page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+        return super().get_page_size(request)
@@ -0,0 +1,31 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Parser para cuerpos `application/x-ndjson` (un objeto JSON por línea).
+
+    Devuelve un generador que lee el cuerpo línea por línea, de modo que una
+    carga grande se procesa por lotes sin cargarla completa en memoria. Las
+    líneas vacías se ignoran; una línea inválida lanza `ParseError` con su número.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return self._iter_objects(stream, encoding)
+
+    @staticmethod
+    def _iter_objects(stream, encoding):
+        if stream is None:
+            return
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line.decode(encoding))
+            except ValueError as exc:
+                raise ParseError(f'Línea {number} no es JSON válido: {exc}')
@@ -0,0 +1,257 @@
+"""Perfilado bajo demanda de una petición HTTP o de un connect de WebSocket.
+
+Se activa con `PROFILING_ENABLED`. Apagado, el middleware no se instala y el
+consumidor hace una sola lectura de settings por connect. Encendido, una
+petición se perfila si:
+
+- trae la cabecera `X-Profile-Token` (o `?_profile_token=` en WebSockets, donde
+  el navegador no permite cabeceras) con un token de `make_token()` vigente
+  (`PROFILING_TOKEN_MAX_AGE` segundos);
+- trae `?_profile=1` y el usuario es staff o está en `PROFILING_STAFF_USERIDS`
+  (solo HTTP: en WebSockets la autenticación ocurre dentro del connect);
+- cae en la muestra aleatoria `PROFILING_SAMPLE_RATE` (0.0 a 1.0).
+
+Por cada perfil se escriben en `PROFILING_DIR`, con el mismo prefijo:
+
+- `<nombre>.pstats`: salida de cProfile (`python -m pstats`, snakeviz, ...); solo
+  un perfil a la vez usa cProfile, los que se solapan con él no lo generan;
+- `<nombre>.collapsed`: pilas muestreadas cada `PROFILING_SAMPLE_INTERVAL`
+  segundos en formato colapsado (flamegraph.pl, speedscope);
+- `<nombre>.sql`: consultas emitidas con su duración, sin parámetros.
+
+La respuesta HTTP lleva `X-Profile-Id: <nombre>` para ubicar los archivos.
+
+Generar un token:
+    python manage.py shell -c "from backend.profiling import make_token; print(make_token())"
+"""
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'backend.profiling'
+TOKEN_HEADER = 'X-Profile-Token'
+TOKEN_PARAM = '_profile_token'
+STAFF_PARAM = '_profile'
+
+
+def make_token():
+    """Token firmado (con SECRET_KEY) que habilita un perfil mientras esté vigente."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(token):
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 300)
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def sampled():
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def _is_staff(user):
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return False
+    return bool(getattr(user, 'is_staff', False)) or str(user.pk) in getattr(settings, 'PROFILING_STAFF_USERIDS', ())
+
+
+def _authenticated_user(request):
+    """Usuario según la autenticación de DRF (el middleware corre antes que la vista)."""
+    from rest_framework.exceptions import APIException
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user
+    except APIException:
+        return None
+
+
+class _StackSampler(threading.Thread):
+    """Muestrea la pila de otro hilo cada `interval` segundos (perfilador de muestreo)."""
+
+    def __init__(self, target_ident, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# Desde Python 3.12 cProfile usa `sys.monitoring`, que admite un solo perfilador
+# por proceso: un segundo `enable()` en otro hilo lanza ValueError. Quien no
+# obtiene este lock (dos peticiones perfiladas a la vez) se perfila solo con el
+# muestreador de pilas y el registro de SQL.
+_cprofile_lock = threading.Lock()
+
+
+class Profile:
+    """Context manager que perfila el bloque y escribe los archivos en `PROFILING_DIR`."""
+
+    def __init__(self, label):
+        stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%S')
+        safe_label = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in label)[:60]
+        self.name = f'{stamp}-{safe_label}-{uuid.uuid4().hex[:8]}'
+        self.queries = []
+        self._profiler = None
+        self._sampler = None
+        self._wrappers = []
+
+    def _record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - start, sql))
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        try:
+            self._start()
+        except BaseException:
+            # `__exit__` no corre si `__enter__` falla: deshacer lo ya iniciado
+            self._stop()
+            raise
+        return self
+
+    def _start(self):
+        if _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Otra herramienta (coverage, un depurador) ya usa sys.monitoring
+                _cprofile_lock.release()
+            else:
+                self._profiler = profiler
+        for alias in connections:
+            wrapper = connections[alias].execute_wrapper(self._record_query)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        interval = getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.005)
+        if interval:
+            self._sampler = _StackSampler(threading.get_ident(), interval)
+            self._sampler.start()
+
+    def _stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            _cprofile_lock.release()
+        if self._sampler is not None and self._sampler.is_alive():
+            self._sampler.stop()
+        while self._wrappers:
+            self._wrappers.pop().__exit__(None, None, None)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop()
+        self.duration = time.perf_counter() - self._started
+        try:
+            self.write()
+        except OSError:
+            # Un disco lleno o sin permisos no debe tumbar la petición perfilada
+            logger.warning('No se pudo escribir el perfil %s', self.name, exc_info=True)
+        return False
+
+    def write(self):
+        directory = getattr(settings, 'PROFILING_DIR', 'profiles')
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.name)
+        if self._profiler is not None:
+            self._profiler.dump_stats(f'{base}.pstats')
+        if self._sampler is not None:
+            with open(f'{base}.collapsed', 'w') as fh:
+                for stack, count in self._sampler.stacks.most_common():
+                    fh.write(f'{stack} {count}\n')
+        with open(f'{base}.sql', 'w') as fh:
+            total = sum(duration for duration, _ in self.queries)
+            fh.write(f'-- {len(self.queries)} consultas, {total * 1000:.2f} ms en BD, '
+                     f'{self.duration * 1000:.2f} ms en total\n')
+            for duration, sql in self.queries:
+                fh.write(f'\n-- {duration * 1000:.3f} ms\n{sql};\n')
+        logger.info('Perfil escrito en %s.* (%.1f ms, %d consultas)', base, self.duration * 1000, len(self.queries))
+
+
+def _request_label(request):
+    return f'{request.method}-{request.path.strip("/").replace("/", "_") or "root"}'
+
+
+class ProfilingMiddleware:
+    """Perfila las peticiones HTTP que lo piden (ver el docstring del módulo)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def _wants_profile(self, request):
+        if valid_token(request.headers.get(TOKEN_HEADER)):
+            return True
+        if request.GET.get(STAFF_PARAM) == '1' and _is_staff(_authenticated_user(request)):
+            return True
+        return sampled()
+
+    def __call__(self, request):
+        if not self._wants_profile(request):
+            return self.get_response(request)
+        with Profile(_request_label(request)) as profile:
+            response = self.get_response(request)
+        response['X-Profile-Id'] = profile.name
+        return response
+
+
+class ProfiledConsumerMixin:
+    """Perfila el connect de un consumidor síncrono de Channels cuando se pide."""
+
+    def websocket_connect(self, message):
+        if not getattr(settings, 'PROFILING_ENABLED', False) or not self._wants_profile():
+            return super().websocket_connect(message)
+        group_type = self.scope.get('url_route', {}).get('kwargs', {}).get('group_type') or 'unknown'
+        with Profile(f'ws-connect-{group_type}'):
+            return super().websocket_connect(message)
+
+    def _wants_profile(self):
+        headers = dict(self.scope.get('headers') or ())
+        token = headers.get(TOKEN_HEADER.lower().encode(), b'').decode('latin-1')
+        if not token:
+            params = parse_qs(self.scope.get('query_string', b'').decode('utf-8'))
+            token = (params.get(TOKEN_PARAM) or [''])[0]
+        return valid_token(token) or sampled()
@@ -61,6 +61,10 @@ THIRD_APPS += [
 INSTALLED_APPS = BASE_APPS + LOCAL_APPS + THIRD_APPS
 
 MIDDLEWARE = [
+    # Primero, para medir también el resto de middlewares (backend.metrics)
+    'backend.metrics.MetricsMiddleware',
+    'backend.profiling.ProfilingMiddleware',
+    'backend.slow_queries.SlowQueryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -173,18 +177,77 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Métricas por endpoint en memoria del proceso, publicadas en /metrics (backend.metrics).
+# /metrics exige `Authorization: Bearer <METRICS_TOKEN>`; sin token responde 403 salvo con DEBUG.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Perfilado bajo demanda (backend.profiling): apagado no cuesta nada. Se dispara con un
+# token firmado (cabecera X-Profile-Token), con ?_profile=1 para los usuarios de
+# PROFILING_STAFF_USERIDS o por muestreo (PROFILING_SAMPLE_RATE, 0.0 a 1.0).
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', '0.005'))
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', '300'))
+PROFILING_STAFF_USERIDS = [
+    u.strip() for u in os.environ.get('PROFILING_STAFF_USERIDS', '').split(',') if u.strip()
+]
+
+# Consultas lentas (>= SLOW_QUERY_THRESHOLD_MS) y repetidas en una misma petición
+# (>= SLOW_QUERY_REPEAT_THRESHOLD veces, típico N+1), con EXPLAIN y sitio de llamada
+# (backend.slow_queries). Se publican en /slow-queries (staff) y con
+# `python manage.py slow_query_report`. Sin SLOW_QUERY_LOG_FILE solo se ven los del
+# proceso que atiende la petición; con él se reúnen los de todos los workers.
+SLOW_QUERY_ENABLED = os.environ.get('SLOW_QUERY_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_REPEAT_THRESHOLD = int(os.environ.get('SLOW_QUERY_REPEAT_THRESHOLD', '10'))
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', '')
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Paginación por cursor de los listados (backend.pagination.CreatedAtCursorPagination)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '200'))
+
 # Cache configuration (required for JWKS caching)
+# `default` es una caché de dos niveles (backend.cache.TwoTierCache): un L1 en memoria
+# por proceso delante de `shared`, que es común a todos los workers. `shared` usa el
+# mismo Redis que Channels; con CACHE_L2=locmem se usa una caché local (tests o
+# desarrollo sin Redis).
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', 'redis://127.0.0.1:6379/1')
+CACHE_L2 = os.environ.get('CACHE_L2', 'redis')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+        'BACKEND': 'backend.cache.TwoTierCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 1024,
+            'L1_TIMEOUT': 5,
+            'STAMP_INTERVAL': 1.0,
+            # Claves muy leídas y poco escritas que vale la pena copiar en memoria
+            'L1_KEY_PREFIXES': ['clerk_jwks', 'deliveries:catalog_version'],
+        },
+    },
+    'shared': (
+        {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'hermez',
+        }
+        if CACHE_L2 == 'redis'
+        else {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'shared-local',
+        }
+    ),
 }
 
 AUTH_USER_MODEL = 'users.User'
 
 CHANNEL_LAYERS = {
     'default': {
+        # backend.channel_layers.HybridRedisChannelLayer entrega en memoria a los miembros
+        # del grupo en este proceso, pero depende de internos de channels_redis: es opcional
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         "CONFIG": {
             "hosts": [("127.0.0.1", 6379)],
@@ -196,6 +259,31 @@ CHANNEL_LAYERS = {
 DELIVERIES_QUOTE_TTL_MINUTES = 10
 DELIVERIES_OFFER_TTL_MINUTES = 4
 
+# Tamaño de lote del expirador. Las lecturas excluyen registros vencidos con
+# `.live()`, por lo que el barrido puede ejecutarse con poca frecuencia.
+DELIVERIES_EXPIRER_BATCH_SIZE = 500
+# Máximo de domicilios por llamada a /deliveries/api/bulk_change_status/
+DELIVERIES_BULK_MAX_ITEMS = 100
+# Carga por lotes de cotizaciones (/deliveries/api/quotes/batch/)
+DELIVERIES_QUOTE_INGEST_BATCH_SIZE = 500
+DELIVERIES_QUOTE_INGEST_MAX_ITEMS = 5000
+# Segundos que vive el registro cacheado del detalle de un domicilio
+DELIVERIES_DETAIL_CACHE_TIMEOUT = 60
+# Un pk que no está en el catálogo en memoria recarga el catálogo como mucho una
+# vez cada tantos segundos (por si la caché compartida perdió un cambio de versión)
+DELIVERIES_CATALOG_MISS_RELOAD_SECONDS = 30
+# Registro de suscriptores por grupo de Channels (deliveries.services.group_registry):
+# los broadcasts a grupos sin nadie conectado se descartan antes de serializar.
+# Un worker caído deja de contar como mucho dos latidos después.
+DELIVERIES_GROUP_REGISTRY_ENABLED = os.environ.get('DELIVERIES_GROUP_REGISTRY_ENABLED', 'True') == 'True'
+DELIVERIES_GROUP_HEARTBEAT_SECONDS = 30
+# Cola de salida por conexión WebSocket (backend.backpressure): con más de
+# DELIVERIES_WS_LAG_SECONDS de atraso (medido en el propio worker) se guarda solo el
+# último estado de cada objeto; con más de DELIVERIES_WS_QUEUE_MAX objetos en su cola
+# la conexión se cierra con 4008 para que el cliente reconecte y reciba el snapshot.
+DELIVERIES_WS_LAG_SECONDS = 1.0
+DELIVERIES_WS_QUEUE_MAX = 500
+
 
 # Logging: mostrar logs de autenticación para depuración local
 LOGGING = {
@@ -0,0 +1,326 @@
+"""Registro de consultas lentas y repetidas con su plan (EXPLAIN) y su origen en el código.
+
+Durante cada petición HTTP (`SlowQueryMiddleware`) y cada connect de WebSocket
+(`SlowQueryConsumerMixin`) se instala un `execute_wrapper` en todas las
+conexiones que detecta:
+
+- consultas lentas: las que tardan `SLOW_QUERY_THRESHOLD_MS` o más. Se guarda
+  el plan de `EXPLAIN` (una vez por forma de consulta y proceso) y si recorre
+  una tabla completa, que suele indicar un índice faltante;
+- consultas repetidas: el mismo SQL ejecutado `SLOW_QUERY_REPEAT_THRESHOLD`
+  veces o más en la misma petición, el patrón típico de un N+1 aunque cada
+  consulta sea rápida.
+
+Cada hallazgo lleva el sitio de llamada en nuestro código (p. ej.
+`deliveries/serializers.py:get_vehicle_type`): el primer frame de la pila que
+está bajo `BASE_DIR` y fuera de librerías instaladas.
+
+Los hallazgos se agregan por (tipo, forma de la consulta, sitio) en un top-N por
+tiempo total que se recorta al crecer, y se añaden como líneas JSON a
+`SLOW_QUERY_LOG_FILE` (rotado a `.1` al superar `SLOW_QUERY_LOG_MAX_BYTES`) para
+reunir lo de todos los workers. Ese archivo es lo que muestran el endpoint
+`/slow-queries` (staff, como en `backend.profiling`) y
+`python manage.py slow_query_report`.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+from django.http import HttpResponseForbidden, JsonResponse
+
+
+# Normalización de SQL para agrupar consultas de la misma forma
+_IN_LIST = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+_VALUES_ROWS = re.compile(r'VALUES (\((?:[^()]|\([^()]*\))*\))(?:, \((?:[^()]|\([^()]*\))*\))+')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?(?![\w"])')
+
+# Marcas de recorrido completo de una tabla en el plan, por motor
+FULL_SCAN_MARKERS = {
+    'sqlite': re.compile(r'^\W*SCAN (?!.*USING (?:COVERING )?INDEX)', re.MULTILINE),
+    'postgresql': re.compile(r'Seq Scan'),
+}
+
+_IGNORED_PATH_PARTS = (os.sep + 'site-packages' + os.sep, os.sep + 'venv' + os.sep, os.sep + '.venv' + os.sep)
+# Instrumentación propia que envuelve las consultas y nunca es el origen real
+_INSTRUMENTATION_FILES = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('metrics.py', 'profiling.py', 'slow_queries.py')
+}
+
+
+def fingerprint(sql):
+    """Forma de la consulta: sin literales y con listas `IN (...)`/`VALUES` colapsadas."""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_ROWS.sub(r'VALUES \1, ...', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    return _NUMBER_LITERAL.sub('?', sql)
+
+
+def call_site():
+    """`ruta/relativa.py:función` del primer frame de nuestro código en la pila actual."""
+    base_dir = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base_dir) and filename not in _INSTRUMENTATION_FILES
+                and not any(part in filename for part in _IGNORED_PATH_PARTS)):
+            return f'{os.path.relpath(filename, base_dir)}:{frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def full_scan(plan, vendor):
+    marker = FULL_SCAN_MARKERS.get(vendor)
+    return bool(plan and marker and marker.search(plan))
+
+
+class SlowQueryLog:
+    """Top-N por tiempo total de los hallazgos agregados por (tipo, forma, sitio)."""
+
+    def __init__(self, top_n=50):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, finding):
+        key = (finding['kind'], finding['fingerprint'], finding['site'])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'kind': finding['kind'], 'fingerprint': finding['fingerprint'], 'site': finding['site'],
+                    'sql': finding['sql'], 'labels': [], 'occurrences': 0, 'executions': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0, 'plan': None, 'full_scan': False, 'last_seen': None,
+                }
+            entry['occurrences'] += 1
+            entry['executions'] += finding['executions']
+            entry['total_ms'] += finding['total_ms']
+            entry['max_ms'] = max(entry['max_ms'], finding['max_ms'])
+            entry['last_seen'] = finding['at']
+            if finding.get('plan'):
+                entry['plan'] = finding['plan']
+                entry['full_scan'] = finding['full_scan']
+            if finding['label'] not in entry['labels'] and len(entry['labels']) < 10:
+                entry['labels'].append(finding['label'])
+            # Recortar con holgura para no ordenar en cada hallazgo
+            if len(self._entries) > self.top_n * 4:
+                keep = sorted(self._entries.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:self.top_n]
+                self._entries = dict(keep)
+
+    def top(self, limit=None, kind=None):
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values() if kind in (None, entry['kind'])]
+        entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return entries[:limit or self.top_n]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+log = SlowQueryLog()
+_plans = {}
+_file_lock = threading.Lock()
+_explaining = contextvars.ContextVar('backend_slow_queries_explaining', default=False)
+_current = contextvars.ContextVar('backend_slow_queries_scope', default=None)
+
+
+def _explain(connection, sql, params):
+    """Plan de la consulta (cacheado por forma); None si no aplica o falla."""
+    key = (connection.alias, fingerprint(sql))
+    if key in _plans:
+        return _plans[key]
+    plan = None
+    if sql.lstrip()[:6].upper() in ('SELECT', 'UPDATE', 'DELETE'):
+        token = _explaining.set(True)
+        try:
+            # Savepoint: en PostgreSQL un EXPLAIN fallido no debe abortar la transacción en curso
+            with connection.cursor() as cursor, _savepoint(connection):
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                # SQLite devuelve (id, padre, -, detalle); PostgreSQL, una columna por línea
+                plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        except Exception:
+            plan = None
+        finally:
+            _explaining.reset(token)
+    if len(_plans) > 1000:
+        _plans.clear()
+    _plans[key] = plan
+    return plan
+
+
+@contextlib.contextmanager
+def _savepoint(connection):
+    if connection.in_atomic_block:
+        with transaction.atomic(using=connection.alias):
+            yield
+    else:
+        yield
+
+
+def _write(finding):
+    path = getattr(settings, 'SLOW_QUERY_LOG_FILE', '')
+    if not path:
+        return
+    line = json.dumps(finding, default=str) + '\n'
+    max_bytes = getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)
+    with _file_lock:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+                os.replace(path, f'{path}.1')
+            with open(path, 'a') as fh:
+                fh.write(line)
+        except OSError:
+            pass  # Un disco lleno no debe tumbar la petición
+
+
+def _record(finding):
+    finding['at'] = datetime.now(dt_timezone.utc).isoformat()
+    log.add(finding)
+    _write(finding)
+
+
+class _Scope:
+    """Estado de una petición: tiempos por SQL y detección de lentas y repetidas."""
+
+    def __init__(self, label):
+        self.label = label
+        self.threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100) / 1000
+        self.repeat_threshold = getattr(settings, 'SLOW_QUERY_REPEAT_THRESHOLD', 10)
+        self.seen = {}  # sql -> [ejecuciones, segundos, sitio]
+
+    def __call__(self, execute, sql, params, many, context):
+        if _explaining.get():
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        stats = self.seen.get(sql)
+        if stats is None:
+            stats = self.seen[sql] = [0, 0.0, None]
+        stats[0] += 1
+        stats[1] += duration
+        if stats[0] == self.repeat_threshold:
+            stats[2] = call_site()
+        if duration >= self.threshold:
+            connection = context['connection']
+            plan = None if many else _explain(connection, sql, params)
+            _record({
+                'kind': 'slow', 'label': self.label, 'site': call_site(), 'sql': sql,
+                'fingerprint': fingerprint(sql), 'executions': 1,
+                'total_ms': duration * 1000, 'max_ms': duration * 1000,
+                'plan': plan, 'full_scan': full_scan(plan, connection.vendor),
+            })
+        return result
+
+    def finish(self):
+        for sql, (executions, seconds, site) in self.seen.items():
+            if executions >= self.repeat_threshold:
+                _record({
+                    'kind': 'repeated', 'label': self.label, 'site': site, 'sql': sql,
+                    'fingerprint': fingerprint(sql), 'executions': executions,
+                    'total_ms': seconds * 1000, 'max_ms': seconds * 1000, 'plan': None, 'full_scan': False,
+                })
+
+
+@contextlib.contextmanager
+def capture(label):
+    """Detecta consultas lentas y repetidas dentro del bloque (una petición o evento)."""
+    if not getattr(settings, 'SLOW_QUERY_ENABLED', True) or _current.get() is not None:
+        yield None
+        return
+    scope = _Scope(label)
+    token = _current.set(scope)
+    try:
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(scope))
+            yield scope
+    finally:
+        _current.reset(token)
+        scope.finish()
+
+
+def load(path, top_n=50):
+    """Agrega el archivo de hallazgos (y su respaldo `.1`) en un `SlowQueryLog`."""
+    aggregated = SlowQueryLog(top_n=top_n)
+    for candidate in (f'{path}.1', path):
+        try:
+            with open(candidate) as fh:
+                for line in fh:
+                    try:
+                        aggregated.add(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue  # Línea truncada por una escritura concurrente
+        except FileNotFoundError:
+            continue
+    return aggregated
+
+
+def report(limit=None, kind=None):
+    """Hallazgos de todos los workers si hay archivo; si no, los de este proceso."""
+    path = getattr(settings, 'SLOW_QUERY_LOG_FILE', '')
+    if path:
+        return 'file', load(path, top_n=limit or 50).top(limit, kind)
+    return 'process', log.top(limit, kind)
+
+
+def _route_label(request):
+    return f'{request.method} {request.path}'
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with capture(_route_label(request)):
+            return self.get_response(request)
+
+
+class SlowQueryConsumerMixin:
+    """Vigila las consultas del connect (snapshot inicial) de un consumidor síncrono."""
+
+    def websocket_connect(self, message):
+        if not getattr(settings, 'SLOW_QUERY_ENABLED', True):
+            return super().websocket_connect(message)
+        group_type = self.scope.get('url_route', {}).get('kwargs', {}).get('group_type') or 'unknown'
+        with capture(f'ws connect {group_type}'):
+            return super().websocket_connect(message)
+
+
+def slow_queries_view(request):
+    """Top de hallazgos en JSON. Solo staff (o `PROFILING_STAFF_USERIDS`).
+
+    Parámetros: `limit` (por defecto 50) y `kind` (`slow` o `repeated`).
+    """
+    from backend.profiling import _authenticated_user, _is_staff
+
+    if not _is_staff(_authenticated_user(request)):
+        return HttpResponseForbidden()
+    try:
+        limit = max(1, int(request.GET.get('limit', 50)))
+    except ValueError:
+        limit = 50
+    source, entries = report(limit=limit, kind=request.GET.get('kind') or None)
+    return JsonResponse({
+        'source': source,
+        'threshold_ms': getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100),
+        'repeat_threshold': getattr(settings, 'SLOW_QUERY_REPEAT_THRESHOLD', 10),
+        'entries': entries,
+    })
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import uuid
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from backend.asgi import application
+from backend.backpressure import RESUME_CLOSE_CODE, coalesce_key
+
+
+def _event(frame_type, object_id, **data):
+    return {'type': 'broadcast', 'data': {'type': frame_type, 'data': {'id': object_id, **data}}}
+
+
+async def _connect_quote_socket():
+    quote_id = uuid.uuid4()
+    communicator = WebsocketCommunicator(application, f'/ws/deliveries/quotes/{quote_id}/')
+    connected, _ = await communicator.connect()
+    assert connected
+    assert (await communicator.receive_json_from())['type'] == 'initial_quotes'
+    return communicator, f'quote_{quote_id}'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lagging_connection_receives_only_the_latest_state_per_object(settings):
+    settings.DELIVERIES_WS_LAG_SECONDS = 0.5
+
+    async def run():
+        communicator, group = await _connect_quote_socket()
+        layer = get_channel_layer()
+        # Ocupa el hilo de los consumidores síncronos: lo que llegue mientras tanto se atrasa
+        busy = asyncio.ensure_future(sync_to_async(time.sleep)(1))
+        await asyncio.sleep(0)
+        await layer.group_send(group, _event('offer_made', 'a', proposed_price='10'))
+        await layer.group_send(group, _event('offer_updated', 'a', proposed_price='9'))
+        await layer.group_send(group, _event('offer_updated', 'a', proposed_price='8'))
+        await layer.group_send(group, _event('offer_made', 'b', proposed_price='12'))
+        await busy
+        frames = [await communicator.receive_json_from(timeout=5) for _ in range(2)]
+        assert await communicator.receive_nothing(timeout=0.2)
+        # Sin atraso vuelve a enviarse de inmediato
+        await layer.group_send(group, _event('offer_made', 'c'))
+        frames.append(await communicator.receive_json_from(timeout=5))
+        await communicator.disconnect()
+        return frames
+
+    frames = async_to_sync(run)()
+    assert [(f['type'], f['data']['id'], f['data'].get('proposed_price')) for f in frames] == [
+        ('offer_updated', 'a', '8'),
+        ('offer_made', 'b', '12'),
+        ('offer_made', 'c', None),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_only_the_connection_whose_queue_overflows_is_closed(settings):
+    # Todo se encola: cada conexión acumula su propia cola
+    settings.DELIVERIES_WS_LAG_SECONDS = 0
+    settings.DELIVERIES_WS_QUEUE_MAX = 1
+
+    async def run():
+        behind, behind_group = await _connect_quote_socket()
+        healthy, healthy_group = await _connect_quote_socket()
+        layer = get_channel_layer()
+        await layer.group_send(behind_group, _event('offer_made', 'a'))
+        await layer.group_send(behind_group, _event('offer_made', 'b'))
+        await layer.group_send(healthy_group, _event('offer_made', 'c'))
+        closed = await behind.receive_output(timeout=5)
+        await behind.wait()
+        frame = await healthy.receive_json_from(timeout=5)
+        await healthy.disconnect()
+        return closed, frame
+
+    closed, frame = async_to_sync(run)()
+    assert closed['type'] == 'websocket.close'
+    assert closed['code'] == RESUME_CLOSE_CODE
+    assert frame['data']['id'] == 'c'
+
+
+def test_frames_without_object_id_are_never_coalesced():
+    assert coalesce_key({'type': 'quote_created', 'data': {'id': 7}}) == '7'
+    assert coalesce_key({'type': 'deliveries_batch', 'data': []}) != coalesce_key({'type': 'deliveries_batch', 'data': []})
@@ -0,0 +1,214 @@
+import asyncio
+import threading
+import pytest
+from asgiref.sync import async_to_sync
+from backend.channel_layers import HybridRedisChannelLayer
+
+
+def _layer():
+    # Construir la capa no abre conexiones: estas pruebas no necesitan Redis
+    return HybridRedisChannelLayer(hosts=['redis://127.0.0.1:6379/15'])
+
+
+class FakeRedisInbox:
+    """Sustituye `receive_single`: entrega lo que se le pone, como un BZPOPMIN."""
+
+    def __init__(self, layer):
+        self.queue = asyncio.Queue()
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        layer.receive_single = self.receive_single
+
+    async def receive_single(self, channel):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            item = await self.queue.get()
+        finally:
+            self.active -= 1
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+
+async def _stop(layer):
+    pump = layer._pump
+    if pump is not None and not pump.done():
+        pump.cancel()
+        await asyncio.gather(pump, return_exceptions=True)
+
+
+def test_group_members_in_this_process_are_delivered_in_memory():
+    async def run():
+        layer = _layer()
+        local = await layer.new_channel()
+        other_process = 'specific.otherprocess!abc'
+        layer._local_loop = asyncio.get_running_loop()
+        message = {'type': 'broadcast', 'data': {'id': 1}}
+        connections, messages, _ = layer._map_channel_keys_to_connection([local, other_process], message)
+        return layer, local, connections, messages
+
+    layer, local, connections, messages = async_to_sync(run)()
+    # Un solo mensaje a Redis, para el proceso remoto
+    assert list(messages) == [layer.prefix + 'specific.otherprocess!']
+    assert sum(len(keys) for keys in connections.values()) == 1
+    assert layer.receive_buffer[local].get_nowait() == {'type': 'broadcast', 'data': {'id': 1}}
+    assert layer.local_deliveries == 1
+
+
+def test_without_local_receivers_every_member_goes_through_redis():
+    async def run():
+        layer = _layer()
+        local = await layer.new_channel()
+        _, messages, _ = layer._map_channel_keys_to_connection([local], {'type': 'broadcast'})
+        return layer, messages
+
+    layer, messages = async_to_sync(run)()
+    assert len(messages) == 1
+    assert layer.local_deliveries == 0
+
+
+def test_receivers_share_a_single_pump():
+    async def run():
+        layer = _layer()
+        inbox = FakeRedisInbox(layer)
+        channels = [await layer.new_channel() for _ in range(3)]
+        receivers = [asyncio.ensure_future(layer.receive(channel)) for channel in channels]
+        await asyncio.sleep(0)
+        pump = layer._pump
+        # Un mensaje a dos canales (como lo agrupa channels_redis) y otro a uno solo
+        await inbox.queue.put((channels[:2], {'type': 'a'}))
+        await inbox.queue.put((channels[2], {'type': 'b'}))
+        results = await asyncio.wait_for(asyncio.gather(*receivers), 1)
+        assert layer._pump is pump
+        await _stop(layer)
+        return results, inbox
+
+    results, inbox = async_to_sync(run)()
+    assert results == [{'type': 'a'}, {'type': 'a'}, {'type': 'b'}]
+    assert inbox.max_active == 1
+
+
+def test_local_delivery_wakes_a_waiting_receiver():
+    async def run():
+        layer = _layer()
+        FakeRedisInbox(layer)  # Redis no entrega nada
+        channel = await layer.new_channel()
+        receiver = asyncio.ensure_future(layer.receive(channel))
+        await asyncio.sleep(0)
+        layer._map_channel_keys_to_connection([channel], {'type': 'local'})
+        message = await asyncio.wait_for(receiver, 1)
+        await _stop(layer)
+        return message
+
+    assert async_to_sync(run)() == {'type': 'local'}
+
+
+def test_cancelled_receiver_does_not_strand_the_pump():
+    async def run():
+        layer = _layer()
+        inbox = FakeRedisInbox(layer)
+        first, second = await layer.new_channel(), await layer.new_channel()
+        cancelled = asyncio.ensure_future(layer.receive(first))
+        waiting = asyncio.ensure_future(layer.receive(second))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        await inbox.queue.put((second, {'type': 'still-pumped'}))
+        message = await asyncio.wait_for(waiting, 1)
+
+        # Sin receptores: el siguiente `receive` vuelve a tener quien lea de Redis
+        await inbox.queue.put((first, {'type': 'later'}))
+        later = await asyncio.wait_for(layer.receive(first), 1)
+        await _stop(layer)
+        return message, later, layer.receive_count
+
+    message, later, receive_count = async_to_sync(run)()
+    assert message == {'type': 'still-pumped'}
+    assert later == {'type': 'later'}
+    assert receive_count == 0
+
+
+def test_pump_failure_reaches_receivers_and_next_receive_starts_a_new_pump():
+    async def run():
+        layer = _layer()
+        inbox = FakeRedisInbox(layer)
+        channel = await layer.new_channel()
+        await inbox.queue.put(ConnectionError('redis caído'))
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(layer.receive(channel), 1)
+        failed_pump = layer._pump
+
+        await inbox.queue.put((channel, {'type': 'recovered'}))
+        message = await asyncio.wait_for(layer.receive(channel), 1)
+        assert layer._pump is not failed_pump
+        await _stop(layer)
+        return message
+
+    assert async_to_sync(run)() == {'type': 'recovered'}
+
+
+def test_publish_from_another_thread_is_handed_to_the_receiving_loop():
+    layer = _layer()
+    ready = threading.Event()
+    result = {}
+
+    async def receive():
+        FakeRedisInbox(layer)
+        channel = await layer.new_channel()
+        result['channel'] = channel
+        receiver = asyncio.ensure_future(layer.receive(channel))
+        await asyncio.sleep(0)
+        ready.set()
+        result['message'] = await asyncio.wait_for(receiver, 2)
+        await _stop(layer)
+
+    thread = threading.Thread(target=asyncio.run, args=(receive(),))
+    thread.start()
+    assert ready.wait(2)
+    # Sin event loop en este hilo: la entrega va por `call_soon_threadsafe`
+    layer._map_channel_keys_to_connection([result['channel']], {'type': 'cross-thread'})
+    thread.join(3)
+    assert result['message'] == {'type': 'cross-thread'}
+
+
+def test_local_delivery_respects_channel_capacity():
+    async def run():
+        layer = HybridRedisChannelLayer(hosts=['redis://127.0.0.1:6379/15'], capacity=2)
+        layer._local_loop = asyncio.get_running_loop()
+        channel = await layer.new_channel()
+        for number in range(4):
+            layer._map_channel_keys_to_connection([channel], {'type': 'broadcast', 'n': number})
+        return layer, channel
+
+    layer, channel = async_to_sync(run)()
+    buffer = layer.receive_buffer[channel]
+    # Como el EVAL de group_send: con el canal lleno se descarta el mensaje nuevo
+    assert [buffer.get_nowait()['n'] for _ in range(buffer.qsize())] == [0, 1]
+    assert layer.local_deliveries == 2
+
+
+def test_buffers_nobody_reads_expire_with_the_group_expiry():
+    async def run():
+        layer = HybridRedisChannelLayer(hosts=['redis://127.0.0.1:6379/15'], group_expiry=60)
+        FakeRedisInbox(layer)
+        layer._local_loop = asyncio.get_running_loop()
+        abandoned, idle = await layer.new_channel(), await layer.new_channel()
+        # `idle` tiene un receptor esperando; `abandoned` nunca se lee
+        receiver = asyncio.ensure_future(layer.receive(idle))
+        await asyncio.sleep(0)
+        layer._map_channel_keys_to_connection([abandoned], {'type': 'old'})
+        for channel in (abandoned, idle):
+            layer._buffer_read_at[channel] -= 61
+        layer._next_sweep = 0
+        layer._map_channel_keys_to_connection([idle], {'type': 'new'})
+        message = await asyncio.wait_for(receiver, 1)
+        await _stop(layer)
+        return layer, abandoned, message
+
+    layer, abandoned, message = async_to_sync(run)()
+    assert message == {'type': 'new'}
+    assert abandoned not in layer.receive_buffer
+    assert layer._buffer_read_at == {}
@@ -0,0 +1,96 @@
+import re
+import pytest
+from decimal import Decimal
+from django.test import Client
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import DeliveryCategory, Delivery
+from deliveries.services.expiration import _broadcast
+from backend import metrics
+
+
+def _value(text, sample):
+    match = re.search(rf'^{re.escape(sample)} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+@pytest.mark.django_db
+def test_requests_are_recorded_per_route_with_queries_and_serializer_time(settings):
+    settings.METRICS_TOKEN = 'secreto'
+    user = User.objects.create(userid="user_metrics_1", role="client")
+    Delivery.objects.create(
+        client=user,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=DeliveryCategory.objects.create(name="Métricas"),
+        final_price=Decimal("10000.00"),
+    )
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+    labels = '{route="delivery-list",method="GET"}'
+    before = metrics.registry.render()
+
+    assert api_client.get("/deliveries/api/").status_code == 200
+    assert Client().get("/no-existe/").status_code == 404
+
+    text = Client().get("/metrics", HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+    assert _value(text, f'http_request_duration_seconds_count{labels}') == _value(before, f'http_request_duration_seconds_count{labels}') + 1
+    assert _value(text, f'http_request_db_queries_sum{labels}') > _value(before, f'http_request_db_queries_sum{labels}')
+    assert _value(text, f'http_request_serializer_seconds_sum{labels}') > _value(before, f'http_request_serializer_seconds_sum{labels}')
+    assert _value(text, 'http_responses_total{route="delivery-list",method="GET",status="200"}') >= 1
+    assert _value(text, 'http_responses_total{route="unmatched",method="GET",status="404"}') >= 1
+    assert '# TYPE http_request_duration_seconds histogram' in text
+
+
+@pytest.mark.django_db
+def test_broadcasts_are_counted_in_the_current_request():
+    with metrics.track('http', ('test-broadcast', 'POST')) as stats:
+        _broadcast('metrics_test', {'type': 'ping', 'data': {'id': 1}})
+        _broadcast('metrics_test', {'type': 'ping', 'data': {'id': 2}})
+    assert stats.broadcasts == 2
+    assert stats.broadcast_bytes > 0
+
+    text = metrics.registry.render()
+    assert _value(text, 'http_broadcasts_total{route="test-broadcast",method="POST"}') >= 2
+
+
+@pytest.mark.django_db
+def test_broadcast_pipeline_is_recorded_per_event_and_group_prefix(monkeypatch):
+    from channels.layers import get_channel_layer
+    labels = '{event="ping",group="quote_*"}'
+    before = metrics.registry.render()
+
+    _broadcast('quote_1f0c2b6e-0000-4000-8000-000000000001', {'type': 'ping', 'data': {'id': 1}})
+    _broadcast('quote_1f0c2b6e-0000-4000-8000-000000000002', {'type': 'ping', 'data': {'id': 2}})
+
+    async def failing_group_send(group, message):
+        raise RuntimeError('capa caída')
+    monkeypatch.setattr(get_channel_layer(), 'group_send', failing_group_send)
+    with pytest.raises(RuntimeError):
+        _broadcast('new_quotes', {'type': 'ping', 'data': {}})
+
+    text = metrics.registry.render()
+    assert _value(text, f'broadcast_payload_bytes_count{labels}') == _value(before, f'broadcast_payload_bytes_count{labels}') + 2
+    assert _value(text, f'broadcast_payload_bytes_sum{labels}') > _value(before, f'broadcast_payload_bytes_sum{labels}')
+    assert _value(text, f'broadcast_send_seconds_count{labels}') == _value(before, f'broadcast_send_seconds_count{labels}') + 2
+    failures = 'broadcast_failures_total{event="ping",group="new_quotes",stage="send"}'
+    assert _value(text, failures) == _value(before, failures) + 1
+    assert metrics.broadcast_group('user_quotes_user_1') == 'user_quotes_*'
+    assert metrics.broadcast_group('grupo_raro') == 'other'
+
+
+def test_metrics_endpoint_requires_token_when_configured(settings):
+    settings.METRICS_TOKEN = 'secreto'
+    assert Client().get("/metrics").status_code == 403
+    response = Client().get("/metrics", HTTP_AUTHORIZATION='Bearer secreto')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+    assert Client().get("/metrics", HTTP_AUTHORIZATION='Bearer otro').status_code == 403
+
+
+def test_metrics_endpoint_is_closed_without_a_token_unless_debug(settings):
+    settings.METRICS_TOKEN = ''
+    settings.DEBUG = False
+    assert Client().get("/metrics").status_code == 403
+    settings.DEBUG = True
+    assert Client().get("/metrics").status_code == 200
@@ -0,0 +1,140 @@
+import cProfile
+import pstats
+import threading
+import pytest
+from decimal import Decimal
+from django.db import connection
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import DeliveryCategory, Delivery
+from backend import profiling
+
+
+@pytest.fixture
+def profiling_on(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_SAMPLE_RATE = 0.0
+    settings.PROFILING_SAMPLE_INTERVAL = 0.001
+    return tmp_path
+
+
+def _client_with_delivery(userid):
+    user = User.objects.create(userid=userid, role="client")
+    Delivery.objects.create(
+        client=user,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=DeliveryCategory.objects.create(name=f"Perfil {userid}"),
+        final_price=Decimal("10000.00"),
+    )
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+    return user, api_client
+
+
+@pytest.mark.django_db
+def test_signed_token_profiles_request_and_writes_pstats_collapsed_and_sql(profiling_on):
+    _, api_client = _client_with_delivery("user_prof_1")
+
+    response = api_client.get("/deliveries/api/", HTTP_X_PROFILE_TOKEN=profiling.make_token())
+
+    assert response.status_code == 200
+    name = response['X-Profile-Id']
+    base = profiling_on / name
+    assert pstats.Stats(str(base) + '.pstats').total_calls > 0
+    assert (profiling_on / f'{name}.collapsed').exists()
+    sql = (profiling_on / f'{name}.sql').read_text()
+    assert 'deliveries_delivery' in sql
+    assert sql.startswith('-- ')
+
+
+@pytest.mark.django_db
+def test_requests_without_valid_trigger_are_not_profiled(profiling_on):
+    _, api_client = _client_with_delivery("user_prof_2")
+
+    response = api_client.get("/deliveries/api/", HTTP_X_PROFILE_TOKEN='profile:falso:firma')
+    assert 'X-Profile-Id' not in response
+    # Usuario no incluido en PROFILING_STAFF_USERIDS
+    assert 'X-Profile-Id' not in api_client.get("/deliveries/api/?_profile=1")
+    assert list(profiling_on.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_staff_query_param_profiles_request(profiling_on, settings, monkeypatch):
+    user, api_client = _client_with_delivery("user_prof_3")
+    settings.PROFILING_STAFF_USERIDS = [user.pk]
+    # La autenticación real es de Clerk; aquí se sustituye la del middleware
+    monkeypatch.setattr(profiling, '_authenticated_user', lambda request: user)
+
+    response = api_client.get("/deliveries/api/?_profile=1")
+    assert 'X-Profile-Id' in response
+
+
+@pytest.mark.django_db
+def test_disabled_profiler_ignores_tokens(settings, tmp_path):
+    settings.PROFILING_ENABLED = False
+    settings.PROFILING_DIR = str(tmp_path)
+    _, api_client = _client_with_delivery("user_prof_4")
+
+    response = api_client.get("/deliveries/api/", HTTP_X_PROFILE_TOKEN=profiling.make_token())
+    assert 'X-Profile-Id' not in response
+    assert list(tmp_path.iterdir()) == []
+
+
+def _sampler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'profiling-sampler']
+
+
+def test_overlapping_profiles_share_cprofile_and_both_complete(profiling_on):
+    entered, release = threading.Event(), threading.Event()
+    names = {}
+
+    def first():
+        with profiling.Profile('primero') as profile:
+            names['first'] = profile.name
+            entered.set()
+            release.wait(2)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert entered.wait(2)
+    try:
+        with profiling.Profile('segundo') as second:
+            pass
+    finally:
+        release.set()
+        thread.join(2)
+
+    # El segundo se solapa: sin cProfile, pero con pilas y SQL
+    assert (profiling_on / f"{names['first']}.pstats").exists()
+    assert not (profiling_on / f'{second.name}.pstats').exists()
+    assert (profiling_on / f'{second.name}.sql').exists()
+    assert not profiling._cprofile_lock.locked()
+    assert _sampler_threads() == []
+
+
+def test_profiler_already_active_falls_back_to_sampling(profiling_on, monkeypatch):
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            # Lo que hace cProfile en Python 3.12+ si sys.monitoring ya está ocupado
+            raise ValueError('Another profiling tool is already active')
+
+    monkeypatch.setattr(profiling.cProfile, 'Profile', BusyProfile)
+    with profiling.Profile('ocupado') as profile:
+        pass
+    assert not (profiling_on / f'{profile.name}.pstats').exists()
+    assert (profiling_on / f'{profile.name}.collapsed').exists()
+    assert not profiling._cprofile_lock.locked()
+
+
+def test_failed_enter_unwinds_what_it_started(profiling_on, monkeypatch):
+    def broken_start(sampler):
+        raise RuntimeError('sin hilos')
+
+    monkeypatch.setattr(profiling._StackSampler, 'start', broken_start)
+    with pytest.raises(RuntimeError):
+        profiling.Profile('roto').__enter__()
+    assert not profiling._cprofile_lock.locked()
+    assert connection.execute_wrappers == []
+    assert _sampler_threads() == []
@@ -0,0 +1,91 @@
+import json
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import DeliveryCategory, Delivery
+from backend import slow_queries
+
+
+@pytest.fixture
+def slow_log(settings, tmp_path):
+    settings.SLOW_QUERY_ENABLED = True
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_REPEAT_THRESHOLD = 5
+    settings.SLOW_QUERY_LOG_FILE = str(tmp_path / 'slow.jsonl')
+    slow_queries.log.clear()
+    slow_queries._plans.clear()
+    yield tmp_path / 'slow.jsonl'
+    slow_queries.log.clear()
+
+
+def _client_with_delivery(userid):
+    user = User.objects.create(userid=userid, role="client")
+    delivery = Delivery.objects.create(
+        client=user,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=DeliveryCategory.objects.create(name=f"Lentas {userid}"),
+        final_price=Decimal("10000.00"),
+    )
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+    return user, delivery, api_client
+
+
+@pytest.mark.django_db
+def test_slow_queries_are_logged_with_call_site_and_plan(slow_log):
+    _, _, api_client = _client_with_delivery("user_slow_1")
+
+    assert api_client.get("/deliveries/api/").status_code == 200
+
+    findings = [json.loads(line) for line in slow_log.read_text().splitlines()]
+    listing = [f for f in findings if f['kind'] == 'slow' and 'FROM "deliveries_delivery"' in f['sql']]
+    assert listing
+    assert all(f['label'] == 'GET /deliveries/api/' for f in listing)
+    assert all(f['site'].startswith('deliveries/') for f in listing)
+    assert any(f['plan'] for f in listing)
+
+
+@pytest.mark.django_db
+def test_repeated_query_in_one_scope_is_reported_as_n_plus_one(slow_log, settings):
+    settings.SLOW_QUERY_THRESHOLD_MS = 10_000
+    _, delivery, _ = _client_with_delivery("user_slow_2")
+
+    with slow_queries.capture('test'):
+        for _ in range(7):
+            Delivery.objects.filter(pk=delivery.pk).first()
+
+    [entry] = slow_queries.log.top(kind='repeated')
+    assert entry['executions'] == 7
+    assert entry['site'] == 'backend/tests/test_slow_queries.py:test_repeated_query_in_one_scope_is_reported_as_n_plus_one'
+    assert slow_queries.log.top(kind='slow') == []
+
+    out = StringIO()
+    call_command('slow_query_report', '--kind', 'repeated', stdout=out)
+    assert 'N+1    7 ejecuciones en 1 peticiones' in out.getvalue()
+    assert entry['site'] in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_slow_queries_endpoint_is_staff_only(slow_log, settings):
+    user, _, api_client = _client_with_delivery("user_slow_3")
+    api_client.get("/deliveries/api/")
+
+    assert api_client.get("/slow-queries").status_code == 403
+
+    settings.PROFILING_STAFF_USERIDS = [user.pk]
+    response = api_client.get("/slow-queries?kind=slow&limit=3")
+    assert response.status_code == 200
+    body = response.json()
+    assert body['source'] == 'file'
+    assert 0 < len(body['entries']) <= 3
+    assert {entry['kind'] for entry in body['entries']} == {'slow'}
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert slow_queries.fingerprint(
+        'SELECT * FROM t WHERE id IN (%s, %s, %s) AND n = 42 AND s = \'x\''
+    ) == slow_queries.fingerprint('SELECT * FROM t WHERE id IN (%s) AND n = 7 AND s = \'yy\'')
@@ -0,0 +1,50 @@
+import pytest
+from django.core.cache import caches
+from backend.cache import TwoTierCache
+
+
+@pytest.fixture
+def shared_l2(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        'l2test': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'l2test'},
+        'l2down': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:1/0'},
+    }
+    caches['l2test'].clear()
+    return caches['l2test']
+
+
+def _worker(alias='l2test', **options):
+    return TwoTierCache(None, {'OPTIONS': {'L2': alias, 'STAMP_INTERVAL': 0, **options}})
+
+
+def test_l1_serves_reads_and_writes_invalidate_other_workers(shared_l2):
+    worker_a, worker_b = _worker(), _worker()
+    worker_a.set('catalog', 'v1')
+    assert worker_b.get('catalog') == 'v1'
+
+    # Un cambio directo en L2 (sin pasar por la caché) no se ve mientras dure la copia en L1
+    shared_l2.set('catalog', 'direct')
+    assert worker_b.get('catalog') == 'v1'
+
+    # Una escritura por la caché cambia el sello y el otro worker vacía su L1
+    worker_a.set('catalog', 'v2')
+    assert worker_b.get('catalog') == 'v2'
+    worker_a.delete('catalog')
+    assert worker_b.get('catalog', 'none') == 'none'
+
+
+def test_l1_is_bounded_and_only_holds_configured_prefixes(shared_l2):
+    worker = _worker(L1_MAX_ENTRIES=2, L1_KEY_PREFIXES=['hot:'])
+    for key in ('hot:a', 'hot:b', 'hot:c', 'cold:a'):
+        worker.set(key, key)
+        worker.get(key)
+    assert list(worker._l1) == [worker.make_key('hot:b'), worker.make_key('hot:c')]
+    assert worker.get('hot:a') == 'hot:a'  # sigue en L2
+
+
+def test_shared_cache_outage_degrades_to_misses(shared_l2):
+    worker = _worker(alias='l2down')
+    worker.set('clerk_jwks', {'keys': []})
+    assert worker.get('clerk_jwks', 'miss') == 'miss'
+    assert worker.add('clerk_jwks', 1) is False
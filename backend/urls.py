@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from backend.metrics import metrics_view
+from backend.slow_queries import slow_queries_view
+
 urlpatterns = [
     path('user/', include('users.urls')),
     path('deliveries/', include('deliveries.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    path('slow-queries', slow_queries_view, name='slow-queries'),
 ]
@@ -0,0 +1,78 @@
+"""Latencia y número de consultas de `POST /deliveries/api/offers/<id>/accept/`.
+
+Uso:
+    python -m benchmarks.accept_latency --quotes 500
+"""
+import argparse
+import json
+import time
+from decimal import Decimal
+
+from benchmarks.common import benchmark_database, setup, summarize
+
+
+def seed(quotes):
+    from deliveries.models import DeliveryCategory, DeliveryOffer, DeliveryQuote
+    from users.models import User
+
+    client = User.objects.create(userid='bench_accept_client', role='client')
+    driver = User.objects.create(userid='bench_accept_driver', role='delivery')
+    category = DeliveryCategory.objects.create(name='Benchmark accept')
+    offers = []
+    for i in range(quotes):
+        quote = DeliveryQuote.objects.create(
+            client=client,
+            pickup_address=f'Origen {i}',
+            delivery_address=f'Destino {i}',
+            category=category,
+            client_price=Decimal('10000.00'),
+        )
+        offers.append(DeliveryOffer.objects.create(
+            delivery_person=driver, quote=quote, proposed_price=Decimal('11000.00')
+        ))
+    return client, offers
+
+
+def run(args):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    client, offers = seed(args.quotes)
+    api_client = APIClient()
+    api_client.force_authenticate(user=client)
+
+    samples, queries = [], []
+    for offer in offers:
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = api_client.post(f'/deliveries/api/offers/{offer.id}/accept/')
+            samples.append(time.perf_counter() - start)
+        assert response.status_code == 201, response.status_code
+        queries.append(len(ctx.captured_queries))
+
+    result = summarize(samples)
+    result['queries_per_accept'] = sum(queries) / len(queries)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=500)
+    parser.add_argument('--settings', default=None)
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+
+    setup(args.settings)
+    with benchmark_database():
+        result = run(args)
+
+    print(f"accept: p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms "
+          f"ops/s={result['ops_per_sec']:.1f} consultas/aceptación={result['queries_per_accept']:.1f}")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Operaciones de Redis por `group_send`: `RedisChannelLayer` contra `HybridRedisChannelLayer`.
+
+Uso:
+    python -m benchmarks.channel_layer_ops --local 50 --remote 50 --remote-processes 2
+    python -m benchmarks.channel_layer_ops --redis-url redis://127.0.0.1:6379/2 --output ops.json
+
+Simula en un solo proceso un worker publicador con `--local` canales suscritos
+al grupo y `--remote-processes` workers más (instancias de la capa con otro
+`client_prefix`, como otro proceso de Daphne) que reparten `--remote` canales.
+Todos reciben en bucle con `receive()`, igual que los consumidores. Se publican
+`--broadcasts` mensajes y, cuando todos los canales los recibieron, se reportan
+por broadcast:
+
+- comandos y viajes de ida y vuelta a Redis del publicador (`group_send`);
+- comandos totales, incluidos los de recepción (`BZPOPMIN`, limpieza) de todos
+  los procesos;
+- latencia de `group_send` y hasta que el último canal recibe el mensaje.
+
+Un pipeline cuenta como un viaje con tantos comandos como tenga.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import time
+from collections import Counter
+
+from benchmarks.common import summarize
+
+
+GROUP = 'new_quotes'
+LAYERS = {
+    'redis': 'channels_redis.core.RedisChannelLayer',
+    'hybrid': 'backend.channel_layers.HybridRedisChannelLayer',
+}
+
+# Quién emite el comando: las tareas internas de `receive` heredan el contexto
+_scope = contextvars.ContextVar('channel_layer_ops_scope', default='setup')
+
+
+class CommandCounter:
+    """Cuenta comandos y viajes de todos los clientes redis.asyncio del proceso."""
+
+    def __init__(self):
+        self.commands = Counter()
+        self.round_trips = Counter()
+
+    def install(self):
+        from redis.asyncio.client import Pipeline, Redis
+
+        execute_command = Redis.execute_command
+        execute_pipeline = Pipeline.execute
+        counter = self
+
+        async def counted_command(client, *args, **options):
+            counter.round_trips[_scope.get()] += 1
+            counter.commands[_scope.get()] += 1
+            return await execute_command(client, *args, **options)
+
+        async def counted_pipeline(pipe, *args, **kwargs):
+            if pipe.command_stack:
+                counter.round_trips[_scope.get()] += 1
+                counter.commands[_scope.get()] += len(pipe.command_stack)
+            return await execute_pipeline(pipe, *args, **kwargs)
+
+        Redis.execute_command = counted_command
+        Pipeline.execute = counted_pipeline
+
+        def uninstall():
+            Redis.execute_command = execute_command
+            Pipeline.execute = execute_pipeline
+        return uninstall
+
+
+def build_layer(path, redis_url, prefix):
+    from django.utils.module_loading import import_string
+
+    return import_string(path)(hosts=[redis_url], prefix=prefix, capacity=10_000)
+
+
+async def receive_loop(layer, channel, expected, arrivals):
+    _scope.set('receive')
+    for _ in range(expected):
+        message = await layer.receive(channel)
+        arrivals[message['seq']] = time.perf_counter()
+
+
+async def run_layer(name, args, counter):
+    prefix = f'bench_ops_{name}_{os.getpid()}'
+    # Proceso 0: el publicador con sus canales locales; el resto, "remotos"
+    processes = [build_layer(LAYERS[name], args.redis_url, prefix) for _ in range(args.remote_processes + 1)]
+    members = [(processes[0], args.local)]
+    for index in range(args.remote_processes):
+        share = args.remote // args.remote_processes + (index < args.remote % args.remote_processes)
+        members.append((processes[index + 1], share))
+
+    receivers, arrivals = [], []
+    for layer, count in members:
+        for _ in range(count):
+            channel = await layer.new_channel()
+            await layer.group_add(GROUP, channel)
+            arrivals.append({})
+            receivers.append(asyncio.ensure_future(receive_loop(layer, channel, args.broadcasts, arrivals[-1])))
+    await asyncio.sleep(0.2)  # Que cada receptor quede esperando en `receive`
+
+    publisher = processes[0]
+    send_seconds, delivery_seconds = [], []
+    received_before = counter.commands['receive']
+    sent_at = {}
+    _scope.set('publish')
+    for seq in range(args.broadcasts):
+        start = time.perf_counter()
+        await publisher.group_send(GROUP, {'type': 'broadcast', 'seq': seq, 'data': {'id': seq}})
+        send_seconds.append(time.perf_counter() - start)
+        sent_at[seq] = start
+        await asyncio.sleep(0)
+    await asyncio.wait_for(asyncio.gather(*receivers), args.timeout)
+    _scope.set('setup')
+    received_commands = counter.commands['receive'] - received_before
+    for seq in range(args.broadcasts):
+        delivery_seconds.append(max(received[seq] for received in arrivals) - sent_at[seq])
+
+    for layer in processes:
+        await layer.flush()
+    broadcasts = args.broadcasts
+    publish_commands = counter.commands['publish']
+    total_commands = publish_commands + received_commands
+    return {
+        'layer': name,
+        'channels': len(arrivals),
+        'publisher_commands_per_broadcast': publish_commands / broadcasts,
+        'publisher_round_trips_per_broadcast': counter.round_trips['publish'] / broadcasts,
+        'total_commands_per_broadcast': total_commands / broadcasts,
+        'local_deliveries': getattr(publisher, 'local_deliveries', 0),
+        'group_send': summarize(send_seconds),
+        'last_delivery': summarize(delivery_seconds),
+    }
+
+
+async def run_async(args):
+    results = []
+    for name in args.layers:
+        counter = CommandCounter()
+        uninstall = counter.install()
+        try:
+            results.append(await run_layer(name, args, counter))
+        finally:
+            uninstall()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--local', type=int, default=50, help='Canales del grupo en el proceso publicador')
+    parser.add_argument('--remote', type=int, default=0, help='Canales del grupo en otros procesos')
+    parser.add_argument('--remote-processes', type=int, default=1)
+    parser.add_argument('--broadcasts', type=int, default=200)
+    parser.add_argument('--layers', nargs='+', choices=sorted(LAYERS), default=['redis', 'hybrid'])
+    parser.add_argument('--redis-url', default=os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/2'))
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+    if args.remote and args.remote_processes < 1:
+        parser.error('--remote requiere --remote-processes >= 1')
+    if not args.remote:
+        args.remote_processes = 0
+
+    results = asyncio.run(run_async(args))
+    for result in results:
+        print(f"{result['layer']:<7} canales={result['channels']:>5} "
+              f"publicador={result['publisher_commands_per_broadcast']:.2f} cmd/"
+              f"{result['publisher_round_trips_per_broadcast']:.2f} viajes  "
+              f"total={result['total_commands_per_broadcast']:.2f} cmd  "
+              f"group_send p50={result['group_send']['p50_ms']:.2f}ms  "
+              f"entrega p50={result['last_delivery']['p50_ms']:.2f}ms p99={result['last_delivery']['p99_ms']:.2f}ms  "
+              f"locales={result['local_deliveries']}")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'args': vars(args), 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Utilidades compartidas por los scripts de benchmark (`python -m benchmarks.<script>`)."""
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+import django
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(settings_module=None, inmemory_channel_layer=True):
+    """Inicializa Django fuera de `manage.py`.
+
+    Por defecto usa `InMemoryChannelLayer` para que los broadcasts no requieran
+    Redis ni mezclen su latencia con la de la base de datos.
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module or 'backend.settings')
+
+    from django.conf import settings
+    if inmemory_channel_layer:
+        settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database(keepdb=False):
+    """Crea una base de pruebas migrada (como la suite de tests) y la destruye al salir."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def timed(fn, repeat):
+    """Ejecuta `fn` `repeat` veces y devuelve las duraciones en segundos."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    """Resumen en milisegundos (p50, p99, media) y operaciones por segundo."""
+    ordered = sorted(samples)
+    p99_index = min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))
+    total = sum(ordered)
+    return {
+        'n': len(ordered),
+        'p50_ms': statistics.median(ordered) * 1000,
+        'p99_ms': ordered[p99_index] * 1000,
+        'mean_ms': total / len(ordered) * 1000,
+        'ops_per_sec': len(ordered) / total if total else None,
+    }
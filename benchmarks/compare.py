@@ -0,0 +1,68 @@
+"""Compara dos resultados de `benchmarks.suite` (p. ej. dos commits).
+
+Uso:
+    python -m benchmarks.compare base.json nuevo.json [--threshold 10] [--fail-on-regression]
+
+Muestra p50/p99 de cada caso en ambos archivos y la variación porcentual del
+p50. Un caso es regresión si su p50 empeora más de `--threshold` por ciento;
+con `--fail-on-regression` el script termina con código 1 si hay alguna.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.suite import flatten
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(base, new, threshold):
+    """Filas (caso, resumen base, resumen nuevo, variación % del p50, es_regresión)."""
+    base_flat, new_flat = flatten(base['results']), flatten(new['results'])
+    rows = []
+    for name in sorted(set(base_flat) | set(new_flat)):
+        old, cur = base_flat.get(name), new_flat.get(name)
+        delta = None
+        if old and cur and old['p50_ms']:
+            delta = (cur['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+        rows.append((name, old, cur, delta, delta is not None and delta > threshold))
+    return rows
+
+
+def _fmt(summary, key):
+    return f"{summary[key]:.2f}" if summary else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Porcentaje de empeoramiento del p50 tolerado')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"base: {base['meta'].get('commit')} ({base['meta'].get('database')})  "
+          f"nuevo: {new['meta'].get('commit')} ({new['meta'].get('database')})")
+    if base['meta'].get('dataset') != new['meta'].get('dataset'):
+        print('Aviso: los datasets sembrados no coinciden; la comparación puede no ser válida.')
+
+    rows = compare(base, new, args.threshold)
+    print(f"{'caso':<40} {'p50 base':>10} {'p50 nuevo':>10} {'Δ p50':>8} {'p99 base':>10} {'p99 nuevo':>10}")
+    for name, old, cur, delta, regression in rows:
+        delta_text = f'{delta:+.1f}%' if delta is not None else '-'
+        flag = '  REGRESIÓN' if regression else ''
+        print(f"{name:<40} {_fmt(old, 'p50_ms'):>10} {_fmt(cur, 'p50_ms'):>10} {delta_text:>8} "
+              f"{_fmt(old, 'p99_ms'):>10} {_fmt(cur, 'p99_ms'):>10}{flag}")
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions and args.fail_on_regression:
+        print(f"{len(regressions)} regresiones por encima de {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Ahorro de bytes y CPU de los GET condicionales (200 completo vs. 304).
+
+Uso:
+    python -m benchmarks.conditional_get --deliveries 200 --repeat 200
+
+Para el detalle de un domicilio, el listado filtrado por estado y `/user/api/me/`
+mide la petición completa y la misma petición con `If-None-Match` vigente:
+latencia, tiempo de CPU del proceso por petición y bytes del cuerpo.
+"""
+import argparse
+import json
+import time
+from decimal import Decimal
+
+from benchmarks.common import benchmark_database, setup, summarize
+
+
+def seed(deliveries):
+    from deliveries.models import Delivery, DeliveryCategory
+    from users.models import User
+
+    client = User.objects.create(userid='bench_cond_client', role='client')
+    driver = User.objects.create(userid='bench_cond_driver', role='delivery')
+    category = DeliveryCategory.objects.create(name='Benchmark condicional')
+    Delivery.objects.bulk_create([
+        Delivery(
+            client=client,
+            delivery_person=driver,
+            pickup_address=f'Origen {i}',
+            delivery_address=f'Destino {i}',
+            category=category,
+            final_price=Decimal('10000.00'),
+        )
+        for i in range(deliveries)
+    ])
+    return client
+
+
+def measure(api_client, url, repeat, **headers):
+    samples = []
+    size = 0
+    cpu_start = time.process_time()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = api_client.get(url, **headers)
+        samples.append(time.perf_counter() - start)
+        size = len(response.content)
+    result = summarize(samples)
+    result['cpu_ms'] = (time.process_time() - cpu_start) / repeat * 1000
+    result['bytes'] = size
+    result['status'] = response.status_code
+    return result
+
+
+def run(args):
+    from rest_framework.test import APIClient
+    from deliveries.models import Delivery
+
+    client = seed(args.deliveries)
+    api_client = APIClient()
+    api_client.force_authenticate(user=client)
+    delivery = Delivery.objects.filter(client=client).first()
+
+    results = {}
+    for name, url in (
+        ('delivery_detail', f'/deliveries/api/{delivery.id}/'),
+        ('delivery_list', '/deliveries/api/?status=assigned'),
+        ('profile', '/user/api/me/'),
+    ):
+        etag = api_client.get(url)['ETag']
+        results[name] = {
+            'full': measure(api_client, url, args.repeat),
+            'not_modified': measure(api_client, url, args.repeat, HTTP_IF_NONE_MATCH=etag),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--deliveries', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--settings', default=None)
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+
+    setup(args.settings)
+    with benchmark_database():
+        results = run(args)
+
+    print(f"{'endpoint':<16} {'200 bytes':>10} {'304 bytes':>10} {'200 p50':>10} {'304 p50':>10} "
+          f"{'200 cpu':>10} {'304 cpu':>10}")
+    for name, row in results.items():
+        full, cached = row['full'], row['not_modified']
+        print(f"{name:<16} {full['bytes']:>10} {cached['bytes']:>10} {full['p50_ms']:>8.2f}ms "
+              f"{cached['p50_ms']:>8.2f}ms {full['cpu_ms']:>8.2f}ms {cached['cpu_ms']:>8.2f}ms")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Latencia de `/deliveries/api/` según la profundidad de página: cursor vs. OFFSET.
+
+Uso:
+    python -m benchmarks.pagination_depth --rows 1000000 --depths 0,10000,100000,500000,990000
+
+Siembra `--rows` domicilios para un único domiciliario en una base de pruebas
+nueva y mide, para cada profundidad, la misma página de dos formas:
+
+- `cursor` / `offset`: la petición HTTP completa a `/deliveries/api/`, con el
+  cursor que apunta a esa posición o con `?limit=&offset=` (el listado se sirve
+  durante esa medición con `LimitOffsetPagination`, como antes del cursor);
+- `cursor_query` / `offset_query`: solo la consulta de la página (keyset
+  `created_at < posición` contra LIMIT/OFFSET), sin serializar ni contar.
+"""
+import argparse
+import datetime
+import json
+import uuid
+from unittest import mock
+from decimal import Decimal
+
+from benchmarks.common import benchmark_database, setup, summarize, timed
+
+
+def seed(rows, chunk_size=10000):
+    from django.utils import timezone
+    from deliveries.models import Delivery, DeliveryCategory
+    from deliveries.services.seeding import without_auto_now
+    from users.models import User
+
+    client = User.objects.create(userid='bench_client', role='client')
+    driver = User.objects.create(userid='bench_driver', role='delivery')
+    category = DeliveryCategory.objects.create(name='Benchmark')
+    start = timezone.now() - datetime.timedelta(seconds=rows)
+
+    with without_auto_now(Delivery, 'created_at', 'updated_at'):
+        for offset in range(0, rows, chunk_size):
+            batch = []
+            for i in range(offset, min(rows, offset + chunk_size)):
+                created = start + datetime.timedelta(seconds=i)
+                batch.append(Delivery(
+                    id=uuid.uuid4(),
+                    client=client,
+                    delivery_person=driver,
+                    pickup_address=f'Origen {i}',
+                    delivery_address=f'Destino {i}',
+                    category=category,
+                    final_price=Decimal('10000.00'),
+                    status='paid',
+                    created_at=created,
+                    updated_at=created,
+                ))
+            Delivery.objects.bulk_create(batch)
+    return driver
+
+
+def offset_pagination_class():
+    from rest_framework.pagination import LimitOffsetPagination
+
+    class CreatedAtOffsetPagination(LimitOffsetPagination):
+        """El paginador LIMIT/OFFSET con el mismo orden que el de cursor."""
+
+        def paginate_queryset(self, queryset, request, view=None):
+            return super().paginate_queryset(queryset.order_by('-created_at', '-id'), request, view)
+
+    return CreatedAtOffsetPagination
+
+
+def run(args):
+    from rest_framework.pagination import Cursor
+    from rest_framework.test import APIClient
+    from backend.pagination import CreatedAtCursorPagination
+    from deliveries.api import DeliveryViewSet
+    from deliveries.models import Delivery
+
+    driver = seed(args.rows)
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+
+    base_url = 'http://testserver/deliveries/api/?filter_by=delivery_person'
+    paginator = CreatedAtCursorPagination()
+    paginator.base_url = base_url
+    ordered = Delivery.objects.filter(delivery_person=driver).order_by('-created_at', '-id')
+
+    def fetch(url):
+        response = api_client.get(url)
+        assert response.status_code == 200, response.status_code
+        assert len(response.data['results']) == min(args.page_size, args.rows - depth)
+
+    results = []
+    for depth in args.depths:
+        if depth >= args.rows:
+            continue
+        cursor_url = f'{base_url}&page_size={args.page_size}'
+        cursor_page = ordered
+        if depth:
+            # Posición del último elemento de la página anterior (se calcula fuera de la medición)
+            position = ordered.values_list('created_at', flat=True)[depth - 1]
+            cursor_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(position)))
+            cursor_url = f'{cursor_url}&page_size={args.page_size}'
+            cursor_page = ordered.filter(created_at__lt=position)
+        offset_url = f'{base_url}&limit={args.page_size}&offset={depth}'
+
+        row = {'depth': depth, 'cursor': summarize(timed(lambda: fetch(cursor_url), args.repeat))}
+        with mock.patch.object(DeliveryViewSet, 'pagination_class', offset_pagination_class()):
+            row['offset'] = summarize(timed(lambda: fetch(offset_url), args.repeat))
+        row['cursor_query'] = summarize(timed(lambda: list(cursor_page[:args.page_size]), args.repeat))
+        row['offset_query'] = summarize(timed(lambda: list(ordered[depth:depth + args.page_size]), args.repeat))
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--depths', default='0,1000,10000,100000,500000,990000',
+                        type=lambda value: [int(v) for v in value.split(',')])
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--settings', default=None)
+    parser.add_argument('--keepdb', action='store_true')
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+
+    setup(args.settings)
+    with benchmark_database(keepdb=args.keepdb):
+        results = run(args)
+
+    columns = ('cursor', 'offset', 'cursor_query', 'offset_query')
+    print(f"{'depth':>10}" + ''.join(f"{name + ' p50':>19}" for name in columns))
+    for row in results:
+        print(f"{row['depth']:>10}" + ''.join(f"{row[name]['p50_ms']:>17.2f}ms" for name in columns))
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'rows': args.rows, 'page_size': args.page_size, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,496 @@
+"""Simulador determinista de un día del marketplace sobre la API y los consumidores reales.
+
+Uso:
+    python -m benchmarks.simulate --hours 24 --rate 20 --drivers 40 --seed 7
+    python -m benchmarks.simulate --strategies undercut=0.5,match=0.3,premium=0.2 --output sim.json
+
+Corre en proceso y con reloj virtual (`django.utils.timezone.now` devuelve la
+hora simulada mientras dura la corrida):
+
+- los clientes publican cotizaciones por `POST /deliveries/api/quotes/` con
+  llegadas de Poisson cuya tasa sigue un perfil diario (picos de almuerzo y
+  cena) escalado a `--rate` cotizaciones por hora en promedio;
+- cada domiciliario escucha `new_quotes` y `driver_deliveries` con un
+  `DeliveryConsumer` real y, si está libre, oferta según su estrategia;
+- el cliente escucha `user_quotes`, espera su paciencia tras la primera oferta
+  y acepta la más barata; el domiciliario avanza el estado hasta `paid`;
+- el expirador corre cada `--expirer-every` minutos virtuales.
+
+Todas las decisiones salen de generadores con semilla fija y los frames se
+procesan en orden estable tras cada evento, así que la misma semilla produce la
+misma corrida. Reporta throughput, consultas a la base de datos y operaciones
+de Redis (capa de Channels y caché compartida) por domicilio completado, el
+embudo de negocio y la etapa que más tiempo real consume (cuello de botella).
+"""
+import argparse
+import asyncio
+import datetime
+import heapq
+import itertools
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.common import benchmark_database, setup
+
+
+# Perfil relativo de llegadas por hora del día (0-23): picos de almuerzo y cena
+HOURLY_PROFILE = (
+    0.2, 0.1, 0.1, 0.1, 0.1, 0.3, 0.6, 0.9, 1.0, 1.0, 1.1, 1.6,
+    2.2, 2.0, 1.2, 0.9, 0.9, 1.1, 1.6, 2.1, 2.0, 1.4, 0.8, 0.4,
+)
+# Factor sobre el precio del cliente y probabilidad de ofertar de cada estrategia
+STRATEGIES = {
+    'undercut': ((0.90, 1.00), 0.8),
+    'match': ((1.00, 1.00), 0.6),
+    'premium': ((1.10, 1.35), 0.4),
+}
+# Minutos virtuales entre transiciones (rango uniforme)
+STATUS_DELAYS = {'picked_up': (5, 15), 'in_transit': (1, 5), 'delivered': (10, 30), 'paid': (1, 3)}
+
+
+class Clock:
+    """Cola de eventos con tiempo virtual en segundos desde `start`."""
+
+    def __init__(self, start):
+        self.start = start
+        self.now = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+
+    def at(self, delay, action, *args):
+        heapq.heappush(self._queue, (self.now + delay, next(self._seq), action, args))
+
+    def pop(self):
+        when, _, action, args = heapq.heappop(self._queue)
+        self.now = when
+        return action, args
+
+    def __bool__(self):
+        return bool(self._queue)
+
+    def datetime(self):
+        return self.start + datetime.timedelta(seconds=self.now)
+
+
+class CountingLayer:
+    """Envuelve la capa de Channels y cuenta sus operaciones (las que irían a Redis)."""
+
+    COUNTED = ('send', 'receive', 'new_channel', 'group_add', 'group_discard', 'group_send')
+
+    def __init__(self, layer):
+        self._layer = layer
+        self.ops = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._layer, name)
+        if name not in self.COUNTED:
+            return attr
+
+        async def counted(*args, **kwargs):
+            self.ops[name] += 1
+            return await attr(*args, **kwargs)
+        return counted
+
+    def idle(self):
+        channels = getattr(self._layer, 'channels', None)
+        if channels is None:
+            return True
+        return all(queue.empty() for queue in channels.values())
+
+
+class Socket:
+    def __init__(self, sim, owner, path, user):
+        from channels.testing import WebsocketCommunicator
+        self.sim = sim
+        self.owner = owner
+        self.communicator = WebsocketCommunicator(sim.application_for(user), path)
+        self.inbox = []
+        self.task = None
+
+    async def open(self):
+        connected, _ = await self.communicator.connect(timeout=30)
+        assert connected
+        self.task = asyncio.ensure_future(self.pump())
+
+    async def pump(self):
+        while True:
+            output = await self.communicator.receive_output(timeout=24 * 3600)
+            if output.get('type') != 'websocket.send':
+                return
+            self.inbox.append(json.loads(output.get('text') or '{}'))
+            self.sim.frames += 1
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        await self.communicator.disconnect()
+
+
+class Simulation:
+    def __init__(self, args, clients, drivers, category):
+        from rest_framework.test import APIClient
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.clock = Clock(datetime.datetime(2026, 1, 5, tzinfo=datetime.timezone.utc))
+        self.clients = clients
+        self.drivers = drivers
+        self.category = category
+        self.api = {}
+        for user in clients + drivers:
+            self.api[user.pk] = APIClient()
+            self.api[user.pk].force_authenticate(user=user)
+        self.frames = 0
+        self.sockets = []
+        self.driver_state = {}
+        self.open_quotes = {}  # quote_id -> {'client', 'offers': {offer_id: price}, 'socket', 'decision'}
+        self.funnel = Counter()
+        self.statuses = Counter()
+        self.times = defaultdict(list)
+        self.expirer_queries = 0
+        self.stage_wall = Counter()
+        self.stage_calls = Counter()
+
+    # --- infraestructura -------------------------------------------------
+
+    def application_for(self, user):
+        from channels.routing import URLRouter
+        from deliveries.routing import websocket_urlpatterns
+        router = URLRouter(websocket_urlpatterns)
+
+        async def application(scope, receive, send):
+            return await router({**scope, 'user': user}, receive, send)
+        return application
+
+    async def call(self, stage, fn):
+        from asgiref.sync import sync_to_async
+        start = time.perf_counter()
+        result = await sync_to_async(fn)()
+        self.stage_wall[stage] += time.perf_counter() - start
+        self.stage_calls[stage] += 1
+        return result
+
+    async def settle(self):
+        """Espera a que no queden mensajes en la capa ni frames en camino."""
+        from asgiref.sync import sync_to_async
+        while True:
+            before = self.frames
+            for _ in range(5):
+                await asyncio.sleep(0)
+            # Barrera: el hilo de la base de datos procesa en orden, así que esto
+            # termina después de los handlers de los consumidores ya encolados
+            await sync_to_async(lambda: None)()
+            for _ in range(5):
+                await asyncio.sleep(0)
+            if self.frames == before and self.sim_layer.idle():
+                return
+
+    async def open_socket(self, owner, path, user):
+        socket = Socket(self, owner, path, user)
+        start = time.perf_counter()
+        await socket.open()
+        self.stage_wall['ws_connect'] += time.perf_counter() - start
+        self.stage_calls['ws_connect'] += 1
+        self.sockets.append(socket)
+        await self.settle()
+        socket.inbox.clear()  # snapshot inicial
+        return socket
+
+    # --- agentes ---------------------------------------------------------
+
+    def arrival_gap(self):
+        hour = int(self.clock.now // 3600) % 24
+        rate = self.args.rate * HOURLY_PROFILE[hour] / (sum(HOURLY_PROFILE) / 24)
+        return self.rng.expovariate(rate / 3600) if rate else 3600
+
+    async def post_quote(self):
+        client = self.rng.choice(self.clients)
+        price = self.rng.randrange(6000, 40000, 500)
+        response = await self.call('quote_create', lambda: self.api[client.pk].post('/deliveries/api/quotes/', {
+            'client_id': client.pk,
+            'category_id': str(self.category.id),
+            'pickup_address': 'Origen simulado',
+            'delivery_address': 'Destino simulado',
+            'client_price': f'{price}.00',
+        }, format='json'))
+        assert response.status_code == 201, response.data
+        quote_id = str(response.data['id'])
+        self.funnel['quotes'] += 1
+        socket = await self.open_socket(('client', quote_id), f'/ws/deliveries/users/{client.pk}/quotes/', client)
+        self.open_quotes[quote_id] = {'client': client, 'offers': {}, 'socket': socket, 'decision': False,
+                                      'posted_at': self.clock.now, 'price': price}
+        self.clock.at(self.arrival_gap(), self.post_quote)
+
+    async def bid(self, driver, quote_id, price):
+        state = self.driver_state[driver.pk]
+        if state['busy'] or quote_id not in self.open_quotes:
+            return
+        response = await self.call('offer_create', lambda: self.api[driver.pk].post(
+            f'/deliveries/api/quotes/{quote_id}/offers/', {'proposed_price': f'{price:.2f}'}, format='json',
+        ))
+        self.funnel['offers' if response.status_code in (200, 201) else 'offers_rejected'] += 1
+
+    async def decide(self, quote_id):
+        quote = self.open_quotes.get(quote_id)
+        if not quote or not quote['offers']:
+            return
+        offer_id = min(quote['offers'], key=lambda key: (quote['offers'][key], key))
+        client = quote['client']
+        response = await self.call('offer_accept', lambda: self.api[client.pk].post(f'/deliveries/api/offers/{offer_id}/accept/'))
+        if response.status_code == 201:
+            self.funnel['accepted'] += 1
+            self.times['quote_to_accept_min'].append((self.clock.now - quote['posted_at']) / 60)
+        else:
+            self.funnel['accept_failed'] += 1
+            quote['decision'] = False
+            quote['offers'].pop(offer_id, None)
+
+    async def advance(self, driver, delivery_id):
+        response = await self.call('change_status', lambda: self.api[driver.pk].post(
+            f'/deliveries/api/{delivery_id}/change_status/', {}, format='json',
+        ))
+        assert response.status_code == 200, response.data
+        new_status = response.data['new_status']
+        self.statuses[new_status] += 1
+        state = self.driver_state[driver.pk]
+        if new_status == 'paid':
+            self.funnel['paid'] += 1
+            self.times['accept_to_paid_min'].append((self.clock.now - state['assigned_at']) / 60)
+            state['busy'] = False
+            return
+        from deliveries.models import Delivery
+        following = Delivery.STATUS_FLOW[new_status]
+        low, high = STATUS_DELAYS[following]
+        self.clock.at(state['rng'].uniform(low, high) * 60, self.advance, driver, delivery_id)
+
+    async def run_expirer(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from deliveries.services.expiration import expire_quotes_and_offers
+
+        def expire():
+            with CaptureQueriesContext(connection) as ctx:
+                result = expire_quotes_and_offers()
+            self.expirer_queries += len(ctx.captured_queries)
+            return result
+        await self.call('expirer', expire)
+        self.clock.at(self.args.expirer_every * 60, self.run_expirer)
+
+    # --- frames ------------------------------------------------------------
+
+    async def dispatch_frames(self):
+        """Procesa los frames recibidos en orden estable (socket, llegada)."""
+        for socket in list(self.sockets):
+            frames, socket.inbox = socket.inbox, []
+            role, key = socket.owner
+            for frame in frames:
+                if role == 'driver':
+                    await self.on_driver_frame(key, socket, frame)
+                else:
+                    await self.on_client_frame(key, frame)
+
+    async def on_driver_frame(self, driver_pk, socket, frame):
+        state = self.driver_state[driver_pk]
+        driver = state['user']
+        kind, data = frame.get('type'), frame.get('data') or {}
+        if kind == 'quote_created' and not state['busy']:
+            (low, high), probability = STRATEGIES[state['strategy']]
+            rng = state['rng']
+            if rng.random() < probability:
+                price = float(data.get('client_price') or 0) * rng.uniform(low, high)
+                self.clock.at(rng.uniform(20, 120), self.bid, driver, str(data['id']), round(price, -2))
+        elif kind == 'delivery_assigned':
+            state['busy'] = True
+            state['assigned_at'] = self.clock.now
+            low, high = STATUS_DELAYS['picked_up']
+            self.clock.at(state['rng'].uniform(low, high) * 60, self.advance, driver, str(data['id']))
+
+    async def on_client_frame(self, quote_id, frame):
+        quote = self.open_quotes.get(quote_id)
+        if quote is None:
+            return
+        kind, data = frame.get('type'), frame.get('data') or {}
+        related = str((data.get('quote') or {}).get('id') or data.get('quote_id') or data.get('id'))
+        if related != quote_id:
+            return  # Frame de otra cotización del mismo cliente
+        if kind in ('offer_made', 'offer_updated') and data.get('status') == 'pending':
+            quote['offers'][str(data['id'])] = float(data['proposed_price'])
+            if not quote['decision']:
+                quote['decision'] = True
+                self.clock.at(self.rng.uniform(60, self.args.patience * 60), self.decide, quote_id)
+        elif kind == 'offer_expired':
+            quote['offers'].pop(str(data['id']), None)
+        elif kind in ('quote_accepted', 'quote_expired'):
+            if kind == 'quote_expired':
+                self.funnel['expired'] += 1
+            self.open_quotes.pop(quote_id)
+            self.sockets.remove(quote['socket'])
+            await quote['socket'].close()
+
+    # --- corrida -----------------------------------------------------------
+
+    async def run(self):
+        from channels.layers import get_channel_layer
+        layer = get_channel_layer()
+        self.sim_layer = CountingLayer(layer)
+        from channels.layers import channel_layers
+        channel_layers.backends['default'] = self.sim_layer
+
+        strategies = [name for name, _ in self.args.strategies]
+        weights = [weight for _, weight in self.args.strategies]
+        for driver in self.drivers:
+            rng = random.Random(f'{self.args.seed}:{driver.pk}')
+            self.driver_state[driver.pk] = {
+                'user': driver, 'busy': False, 'rng': rng, 'assigned_at': None,
+                'strategy': rng.choices(strategies, weights)[0],
+            }
+            await self.open_socket(('driver', driver.pk), '/ws/deliveries/new-quotes/', driver)
+            await self.open_socket(('driver', driver.pk), f'/ws/deliveries/drivers/{driver.pk}/deliveries/', driver)
+
+        self.clock.at(self.arrival_gap(), self.post_quote)
+        self.clock.at(self.args.expirer_every * 60, self.run_expirer)
+        horizon = self.args.hours * 3600
+        started = time.perf_counter()
+        while self.clock:
+            action, args = self.clock.pop()
+            if self.clock.now > horizon:
+                break
+            await action(*args)
+            await self.settle()
+            await self.dispatch_frames()
+        wall = time.perf_counter() - started
+
+        for socket in self.sockets:
+            await socket.close()
+        return wall
+
+
+def parse_strategies(value):
+    pairs = []
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in STRATEGIES:
+            raise argparse.ArgumentTypeError(f'Estrategia desconocida: {name} ({", ".join(STRATEGIES)})')
+        pairs.append((name, float(weight or 1)))
+    return pairs
+
+
+def report(sim, wall, http_before, ws_before, cache_ops):
+    from backend.metrics import registry
+
+    def delta(name, before):
+        after = registry.totals(name)
+        return {labels: (total - before.get(labels, (0, 0))[0], count - before.get(labels, (0, 0))[1])
+                for labels, (total, count) in after.items()}
+
+    http_queries = delta('http_request_db_queries', http_before['queries'])
+    http_time = delta('http_request_duration_seconds', http_before['time'])
+    ws_queries = delta('ws_request_db_queries', ws_before['queries'])
+    ws_time = delta('ws_request_duration_seconds', ws_before['time'])
+
+    stages = {}
+    for labels, (seconds, count) in itertools.chain(http_time.items(), ws_time.items()):
+        if not count:
+            continue
+        queries = int((http_queries.get(labels) or ws_queries.get(labels) or (0, 0))[0])
+        stages[':'.join(map(str, labels))] = {'calls': count, 'wall_seconds': seconds, 'db_queries': queries}
+    stages['expirer'] = {'calls': sim.stage_calls['expirer'], 'wall_seconds': sim.stage_wall['expirer'],
+                         'db_queries': sim.expirer_queries}
+
+    paid = sim.funnel['paid']
+    total_queries = sum(stage['db_queries'] for stage in stages.values())
+    layer_ops = sum(sim.sim_layer.ops.values())
+    bottleneck = max(stages.items(), key=lambda item: item[1]['wall_seconds'])[0] if stages else None
+    return {
+        'virtual_hours': sim.args.hours,
+        'wall_seconds': wall,
+        'funnel': dict(sim.funnel),
+        'throughput': {
+            'paid_per_virtual_hour': paid / sim.args.hours if sim.args.hours else None,
+            'paid_per_wall_second': paid / wall if wall else None,
+        },
+        'per_completed_delivery': {
+            'db_queries': total_queries / paid if paid else None,
+            'channel_layer_ops': layer_ops / paid if paid else None,
+            'shared_cache_ops': cache_ops / paid if paid else None,
+        },
+        'channel_layer_ops': dict(sim.sim_layer.ops),
+        'shared_cache_ops': cache_ops,
+        'virtual_minutes': {name: {'p50': statistics.median(values), 'max': max(values)}
+                            for name, values in sim.times.items() if values},
+        'stages': stages,
+        'bottleneck': bottleneck,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--rate', type=float, default=20, help='Cotizaciones por hora (promedio del día)')
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--drivers', type=int, default=40)
+    parser.add_argument('--strategies', type=parse_strategies, default=parse_strategies('undercut=0.4,match=0.4,premium=0.2'))
+    parser.add_argument('--patience', type=float, default=4, help='Minutos máximos que el cliente espera más ofertas')
+    parser.add_argument('--expirer-every', type=float, default=1, help='Minutos virtuales entre corridas del expirador')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--settings', default=None)
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+
+    setup(args.settings)
+    from django.utils import timezone
+    from backend import cache as backend_cache
+    from backend.metrics import registry
+    from deliveries.models import DeliveryCategory
+    from deliveries.services.seeding import SeedOptions, seed_marketplace
+    from users.models import User
+
+    with benchmark_database():
+        seeded = seed_marketplace(SeedOptions(
+            clients=args.clients, drivers=args.drivers, pending_quotes=0, deliveries=0,
+            seed=args.seed, prefix='sim',
+        ))
+        clients = list(User.objects.filter(pk__in=seeded.client_ids).order_by('pk'))
+        drivers = list(User.objects.filter(pk__in=seeded.driver_ids).order_by('pk'))
+        category = DeliveryCategory.objects.order_by('name').first()
+        sim = Simulation(args, clients, drivers, category)
+
+        # Reloj virtual y conteo de operaciones de la caché compartida durante la corrida
+        real_now, real_l2_call = timezone.now, backend_cache.TwoTierCache._l2_call
+        cache_ops = Counter()
+
+        def counted_l2_call(self, method, *a, **kw):
+            cache_ops[method] += 1
+            return real_l2_call(self, method, *a, **kw)
+
+        timezone.now = sim.clock.datetime
+        backend_cache.TwoTierCache._l2_call = counted_l2_call
+        http_before = {'queries': registry.totals('http_request_db_queries'),
+                       'time': registry.totals('http_request_duration_seconds')}
+        ws_before = {'queries': registry.totals('ws_request_db_queries'),
+                     'time': registry.totals('ws_request_duration_seconds')}
+        try:
+            wall = asyncio.run(sim.run())
+        finally:
+            timezone.now = real_now
+            backend_cache.TwoTierCache._l2_call = real_l2_call
+        result = report(sim, wall, http_before, ws_before, sum(cache_ops.values()))
+
+    print(f"{args.hours:g} h virtuales en {result['wall_seconds']:.1f} s reales; embudo: {result['funnel']}")
+    per = result['per_completed_delivery']
+    if per['db_queries'] is not None:
+        print(f"por domicilio pagado: {per['db_queries']:.1f} consultas, {per['channel_layer_ops']:.1f} ops de capa, "
+              f"{per['shared_cache_ops']:.1f} ops de caché compartida")
+    for name, stage in sorted(result['stages'].items(), key=lambda item: -item[1]['wall_seconds']):
+        print(f"{name:<45} llamadas={stage['calls']:>6} tiempo={stage['wall_seconds']:>8.2f}s consultas={stage['db_queries']:>7}")
+    print(f"cuello de botella: {result['bottleneck']}")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'args': {**vars(args), 'strategies': args.strategies}, **result}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
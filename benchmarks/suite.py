@@ -0,0 +1,414 @@
+"""Suite de benchmarks de las rutas calientes sobre un marketplace sembrado.
+
+Uso:
+    python -m benchmarks.suite --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare base.json nuevo.json
+
+Siembra el dataset de `seed_marketplace` (mismo generador y semilla) en una base
+de pruebas nueva y mide, para cada caso, ops/s y latencias p50/p99:
+
+- creación de cotizaciones y de ofertas, aceptación de ofertas y transiciones
+  de estado (peticiones HTTP reales con `APIClient`);
+- páginas del listado de domicilios y la acción `history`;
+- el snapshot inicial de cada tipo de grupo de `DeliveryConsumer`;
+- `expire_quotes_and_offers` con varios tamaños de backlog;
+- la representación de `--page-size` instancias con el serializer de cada modelo.
+
+El resultado es un JSON con metadatos (commit, motor de base de datos,
+parámetros) y un resumen por caso, pensado para `benchmarks.compare`.
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import time
+from decimal import Decimal
+
+from benchmarks.common import ROOT, benchmark_database, setup, summarize, timed
+
+
+CASES = {}
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    """Datos compartidos por los casos: resultado de la siembra y clientes HTTP."""
+
+    def __init__(self, args, seeded):
+        from rest_framework.test import APIClient
+        from users.models import User
+
+        self.args = args
+        self.seeded = seeded
+        self.clients = list(User.objects.filter(pk__in=seeded.client_ids[:50]))
+        self.drivers = list(User.objects.filter(pk__in=seeded.driver_ids).select_related('current_vehicle'))
+        self._api_clients = {}
+        self._api_client_class = APIClient
+
+    def api(self, user):
+        api_client = self._api_clients.get(user.pk)
+        if api_client is None:
+            api_client = self._api_clients[user.pk] = self._api_client_class()
+            api_client.force_authenticate(user=user)
+        return api_client
+
+    def pick(self, users, i):
+        return users[i % len(users)]
+
+
+def _expect(response, *codes):
+    assert response.status_code in codes, (response.status_code, getattr(response, 'data', None))
+    return response
+
+
+def _new_quote(client, category, i):
+    from deliveries.models import DeliveryQuote
+    return DeliveryQuote.objects.create(
+        client=client,
+        pickup_address=f'Origen bench {i}',
+        delivery_address=f'Destino bench {i}',
+        category=category,
+        client_price=Decimal('10000.00'),
+    )
+
+
+@case('quote_create')
+def bench_quote_create(ctx):
+    from deliveries.models import DeliveryCategory
+    category_id = str(DeliveryCategory.objects.order_by('name').values_list('id', flat=True).first())
+    counter = iter(range(10 ** 9))
+
+    def op():
+        i = next(counter)
+        client = ctx.pick(ctx.clients, i)
+        _expect(ctx.api(client).post('/deliveries/api/quotes/', {
+            'client_id': client.pk,
+            'category_id': category_id,
+            'pickup_address': f'Origen {i}',
+            'delivery_address': f'Destino {i}',
+            'client_price': '9000.00',
+        }, format='json'), 201)
+    return summarize(timed(op, ctx.args.repeat))
+
+
+@case('offer_create')
+def bench_offer_create(ctx):
+    from deliveries.models import DeliveryCategory
+    category = DeliveryCategory.objects.order_by('name').first()
+    quotes = [_new_quote(ctx.pick(ctx.clients, i), category, i) for i in range(ctx.args.repeat)]
+    counter = iter(range(10 ** 9))
+
+    def op():
+        i = next(counter)
+        _expect(ctx.api(ctx.pick(ctx.drivers, i)).post(
+            f'/deliveries/api/quotes/{quotes[i].id}/offers/', {'proposed_price': '11000.00'}, format='json',
+        ), 201)
+    return summarize(timed(op, ctx.args.repeat))
+
+
+@case('offer_accept')
+def bench_offer_accept(ctx):
+    from deliveries.models import DeliveryCategory, DeliveryOffer
+    category = DeliveryCategory.objects.order_by('name').first()
+    offers = []
+    for i in range(ctx.args.repeat):
+        quote = _new_quote(ctx.pick(ctx.clients, i), category, i)
+        driver = ctx.pick(ctx.drivers, i)
+        offers.append(DeliveryOffer.objects.create(
+            delivery_person=driver, quote=quote, proposed_price=Decimal('11000.00'), vehicle=driver.current_vehicle,
+        ))
+    counter = iter(range(10 ** 9))
+
+    def op():
+        offer = offers[next(counter)]
+        _expect(ctx.api(offer.quote.client).post(f'/deliveries/api/offers/{offer.id}/accept/'), 201)
+    return summarize(timed(op, ctx.args.repeat))
+
+
+@case('status_transition')
+def bench_status_transition(ctx):
+    from deliveries.models import Delivery
+    deliveries = list(
+        Delivery.objects.filter(status__in=['assigned', 'picked_up', 'in_transit', 'delivered'])
+        .select_related('delivery_person')[:ctx.args.repeat]
+    )
+    if not deliveries:
+        return None
+    counter = iter(range(10 ** 9))
+
+    def op():
+        delivery = deliveries[next(counter) % len(deliveries)]
+        # Tras `paid` ya no hay siguiente estado: se mide igual (respuesta 400 barata)
+        _expect(ctx.api(delivery.delivery_person).post(f'/deliveries/api/{delivery.id}/change_status/', {}, format='json'),
+                200, 400)
+    return summarize(timed(op, ctx.args.repeat))
+
+
+def _busiest(field):
+    from django.db.models import Count
+    from deliveries.models import Delivery
+    from users.models import User
+    row = Delivery.objects.values(field).annotate(n=Count('id')).order_by('-n').first()
+    return User.objects.get(pk=row[field])
+
+
+@case('delivery_list_first_page')
+def bench_delivery_list(ctx):
+    client = _busiest('client')
+    url = f'/deliveries/api/?page_size={ctx.args.page_size}'
+    return summarize(timed(lambda: _expect(ctx.api(client).get(url), 200), ctx.args.repeat))
+
+
+@case('delivery_list_next_page')
+def bench_delivery_list_next(ctx):
+    driver = _busiest('delivery_person')
+    api_client = ctx.api(driver)
+    first = _expect(api_client.get(f'/deliveries/api/?filter_by=delivery_person&page_size={ctx.args.page_size}'), 200)
+    next_url = first.data.get('next')
+    if not next_url:
+        return None
+    return summarize(timed(lambda: _expect(api_client.get(next_url), 200), ctx.args.repeat))
+
+
+@case('delivery_history')
+def bench_history(ctx):
+    from django.core.cache import cache
+    from deliveries.models import Delivery
+    deliveries = list(Delivery.objects.select_related('client')[:ctx.args.repeat])
+    cache.clear()
+    counter = iter(range(10 ** 9))
+
+    def op():
+        delivery = deliveries[next(counter) % len(deliveries)]
+        _expect(ctx.api(delivery.client).get(f'/deliveries/api/{delivery.id}/history/'), 200)
+    return summarize(timed(op, ctx.args.repeat))
+
+
+SNAPSHOT_ROUTES = {
+    'new_quotes': lambda ctx: ('/ws/deliveries/new-quotes/', ctx.drivers[0]),
+    'quote': lambda ctx: _quote_route(ctx),
+    'person_stats': lambda ctx: (f'/ws/deliveries/person/{_busiest("delivery_person").pk}/stats/', ctx.drivers[0]),
+    'user_quotes': lambda ctx: (f'/ws/deliveries/users/{_quote_owner(ctx).pk}/quotes/', _quote_owner(ctx)),
+    'user_deliveries': lambda ctx: _user_route(ctx, 'client', 'users'),
+    'driver_deliveries': lambda ctx: _user_route(ctx, 'delivery_person', 'drivers'),
+}
+
+
+def _quote_owner(ctx):
+    from deliveries.models import DeliveryQuote
+    return DeliveryQuote.objects.live().filter(status='pending').select_related('client').first().client
+
+
+def _quote_route(ctx):
+    from deliveries.models import DeliveryQuote
+    quote = DeliveryQuote.objects.live().filter(status='pending', offers__isnull=False).first()
+    return f'/ws/deliveries/quotes/{quote.id}/', quote.client
+
+
+def _user_route(ctx, field, segment):
+    user = _busiest(field)
+    return f'/ws/deliveries/{segment}/{user.pk}/deliveries/', user
+
+
+def _with_user(app, user):
+    async def application(scope, receive, send):
+        return await app({**scope, 'user': user}, receive, send)
+    return application
+
+
+def _snapshot_case(group_type):
+    def bench(ctx):
+        from asgiref.sync import async_to_sync
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from deliveries.routing import websocket_urlpatterns
+
+        path, user = SNAPSHOT_ROUTES[group_type](ctx)
+        application = _with_user(URLRouter(websocket_urlpatterns), user)
+
+        async def connect_and_receive():
+            communicator = WebsocketCommunicator(application, path)
+            connected, _ = await communicator.connect()
+            assert connected, path
+            await communicator.receive_json_from(timeout=10)
+            await communicator.disconnect()
+
+        return summarize(timed(async_to_sync(connect_and_receive), ctx.args.snapshot_repeat))
+    return bench
+
+
+for _group_type in SNAPSHOT_ROUTES:
+    case(f'ws_snapshot_{_group_type}')(_snapshot_case(_group_type))
+
+
+@case('expire_quotes_and_offers')
+def bench_expiration(ctx):
+    from django.utils import timezone
+    from deliveries.models import DeliveryCategory, DeliveryOffer, DeliveryQuote
+    from deliveries.services.expiration import expire_quotes_and_offers
+
+    category = DeliveryCategory.objects.order_by('name').first()
+    past = timezone.now() - datetime.timedelta(hours=1)
+    results = {}
+    for size in ctx.args.backlogs:
+        samples = []
+        for attempt in range(ctx.args.expire_repeat):
+            quotes = DeliveryQuote.objects.bulk_create([
+                DeliveryQuote(
+                    client=ctx.pick(ctx.clients, i), pickup_address='Origen', delivery_address='Destino',
+                    category=category, client_price=Decimal('10000.00'), expires_at=past,
+                )
+                for i in range(size)
+            ])
+            DeliveryOffer.objects.bulk_create([
+                DeliveryOffer(
+                    delivery_person=ctx.pick(ctx.drivers, i), quote=quote,
+                    proposed_price=Decimal('11000.00'), expires_at=past,
+                )
+                for i, quote in enumerate(quotes)
+            ])
+            start = time.perf_counter()
+            expired_quotes, _ = expire_quotes_and_offers()
+            samples.append(time.perf_counter() - start)
+            assert expired_quotes >= size, (expired_quotes, size)
+        result = summarize(samples)
+        result['rows_per_sec'] = size / result['p50_ms'] * 1000 if result['p50_ms'] else None
+        results[str(size)] = result
+    return results
+
+
+SERIALIZED_MODELS = (
+    ('Delivery', 'deliveries.models', 'deliveries.serializers', 'DeliverySerializer', ('client', 'delivery_person', 'category')),
+    ('DeliveryQuote', 'deliveries.models', 'deliveries.serializers', 'DeliveryQuoteSerializer', ('client', 'category')),
+    ('DeliveryOffer', 'deliveries.models', 'deliveries.serializers', 'DeliveryOfferSerializer', ('delivery_person', 'quote', 'vehicle')),
+    ('DeliveryHistory', 'deliveries.models', 'deliveries.serializers', 'DeliveryHistorySerializer', ('changed_by',)),
+    ('DeliveryCategory', 'deliveries.models', 'deliveries.serializers', 'DeliveryCategorySerializer', ()),
+    ('User', 'users.models', 'users.serializers', 'UserSerializer', ('current_vehicle',)),
+    ('UserRating', 'users.models', 'users.serializers', 'UserRatingSerializer', ('rater', 'ratee')),
+    ('Vehicle', 'vehicles.models', 'vehicles.serializers', 'VehicleSerializer', ('type',)),
+    ('VehicleType', 'vehicles.models', 'vehicles.serializers', 'VehicleTypeSerializer', ()),
+    ('Address', 'addresses.models', 'addresses.serializers', 'AddressSerializer', ()),
+)
+
+
+@case('serializers')
+def bench_serializers(ctx):
+    import importlib
+    from addresses.models import Address
+
+    if not Address.objects.exists():
+        Address.objects.bulk_create([
+            Address(userId=ctx.pick(ctx.clients, i), name=f'Casa {i}', type='casa', address=f'Calle {i}', city='Bogotá')
+            for i in range(ctx.args.page_size)
+        ])
+    results = {}
+    for model_name, models_module, serializers_module, serializer_name, related in SERIALIZED_MODELS:
+        model = getattr(importlib.import_module(models_module), model_name)
+        serializer_class = getattr(importlib.import_module(serializers_module), serializer_name)
+        instances = list(model.objects.select_related(*related)[:ctx.args.page_size])
+        if not instances:
+            continue
+        result = summarize(timed(lambda: serializer_class(instances, many=True).data, ctx.args.serializer_repeat))
+        result['instances'] = len(instances)
+        results[model_name] = result
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from django.db import connection
+    from deliveries.services.seeding import SeedOptions, seed_marketplace
+
+    options = SeedOptions(
+        clients=args.clients, drivers=args.drivers, pending_quotes=args.pending_quotes,
+        deliveries=args.deliveries, seed=args.seed, prefix='bench',
+        until=datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc),
+    )
+    started = time.perf_counter()
+    seeded = seed_marketplace(options)
+    seed_seconds = time.perf_counter() - started
+    ctx = Context(args, seeded)
+
+    results = {}
+    for name, fn in CASES.items():
+        if args.only and name not in args.only:
+            continue
+        print(f'... {name}', flush=True)
+        result = fn(ctx)
+        if result is not None:
+            results[name] = result
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'seed_seconds': seed_seconds,
+            'dataset': seeded.counts,
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'settings')},
+        },
+        'results': results,
+    }
+
+
+def flatten(results):
+    """{'caso' o 'caso/subcaso': resumen} a partir de los resultados anidados."""
+    flat = {}
+    for name, value in results.items():
+        if 'p50_ms' in value:
+            flat[name] = value
+        else:
+            for sub, summary in value.items():
+                flat[f'{name}/{sub}'] = summary
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--drivers', type=int, default=300)
+    parser.add_argument('--pending-quotes', type=int, default=1000)
+    parser.add_argument('--deliveries', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=200, help='Repeticiones de los casos HTTP')
+    parser.add_argument('--snapshot-repeat', type=int, default=50)
+    parser.add_argument('--serializer-repeat', type=int, default=200)
+    parser.add_argument('--expire-repeat', type=int, default=3)
+    parser.add_argument('--backlogs', default='100,1000,5000', type=lambda value: [int(v) for v in value.split(',')])
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--only', default=None, type=lambda value: set(value.split(',')),
+                        help=f"Casos a correr, separados por coma ({', '.join(CASES)})")
+    parser.add_argument('--settings', default=None)
+    parser.add_argument('--keepdb', action='store_true')
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+
+    setup(args.settings)
+    with benchmark_database(keepdb=args.keepdb):
+        report = run(args)
+
+    print(f"{'caso':<40} {'p50':>10} {'p99':>10} {'ops/s':>10}")
+    for name, summary in flatten(report['results']).items():
+        print(f"{name:<40} {summary['p50_ms']:>8.2f}ms {summary['p99_ms']:>8.2f}ms {summary['ops_per_sec'] or 0:>10.1f}")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
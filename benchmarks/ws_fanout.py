@@ -0,0 +1,263 @@
+"""Carga de fan-out de WebSockets: miles de `DeliveryConsumer` en proceso.
+
+Uso:
+    python -m benchmarks.ws_fanout --drivers 2000 --quotes 50 --offers 3
+    python -m benchmarks.ws_fanout --layer redis --redis-url redis://127.0.0.1:6379/2
+    python -m benchmarks.ws_fanout --layer hybrid --redis-url redis://127.0.0.1:6379/2
+
+Abre `--drivers` conexiones a `/ws/deliveries/new-quotes/` (más las del
+cliente en sus grupos `user_quotes` y `user_deliveries`) con
+`channels.testing.WebsocketCommunicator` y ejecuta en secuencia, por cada
+cotización: crearla, recibir `--offers` ofertas y aceptar una por HTTP. Mide:
+
+- latencia de fan-out por tipo de evento: desde justo antes de la operación
+  (p. ej. el `save()` que dispara `on_quote_created`) hasta que cada socket
+  recibe el frame;
+- tiempo de connect (incluye el snapshot inicial) y memoria por conexión
+  (RSS del proceso antes y después de conectar);
+- mensajes perdidos: frames esperados que no llegaron antes de `--timeout`
+  (p. ej. por la capacidad de la capa, `--capacity`).
+
+Los consumidores síncronos comparten un único hilo (`database_sync_to_async`),
+igual que en un worker de Daphne, así que la latencia incluye esa cola.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import time
+import uuid
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from benchmarks.common import benchmark_database, setup, summarize
+
+
+# Frames que cada grupo de oyentes debe recibir por operación
+EXPECTED = {
+    'quote': {'drivers': ['quote_created'], 'client_quotes': ['quote_created']},
+    'offer': {'client_quotes': ['offer_made']},
+    'accept': {'drivers': ['quote_accepted'], 'client_deliveries': ['delivery_created']},
+}
+
+
+def rss_bytes():
+    """RSS actual del proceso (Linux); en otros sistemas, el máximo alcanzado."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Recorder:
+    """Marca de tiempo de la operación en curso y latencias por tipo de frame."""
+
+    def __init__(self):
+        self.t0 = None
+        self.latencies = defaultdict(list)
+        self.counts = Counter()
+
+    def record(self, frame_type, now):
+        self.counts[frame_type] += 1
+        if self.t0 is not None:
+            self.latencies[frame_type].append(now - self.t0)
+
+
+class Listener:
+    def __init__(self, role, communicator, recorder):
+        self.role = role
+        self.communicator = communicator
+        self.recorder = recorder
+        self.received = Counter()
+        self.task = None
+
+    async def pump(self):
+        while True:
+            output = await self.communicator.receive_output(timeout=24 * 3600)
+            if output.get('type') != 'websocket.send':
+                return
+            now = time.perf_counter()
+            frame_type = json.loads(output.get('text') or '{}').get('type')
+            self.received[frame_type] += 1
+            self.recorder.record(frame_type, now)
+
+
+def seed(args):
+    from deliveries.services.seeding import SeedOptions, seed_marketplace
+    from users.models import User
+
+    seeded = seed_marketplace(SeedOptions(
+        clients=1, drivers=max(args.offers, 1), pending_quotes=args.pending_quotes, offers_per_quote=0,
+        ratings_per_driver=1, deliveries=0, prefix='fanout',
+    ))
+    client = User.objects.get(pk=seeded.client_ids[0])
+    bidders = list(User.objects.filter(pk__in=seeded.driver_ids).select_related('current_vehicle'))
+    return client, bidders
+
+
+async def run_async(args, client, bidders):
+    from asgiref.sync import sync_to_async
+    from channels.routing import URLRouter
+    from channels.testing import WebsocketCommunicator
+    from rest_framework.test import APIClient
+    from deliveries.models import DeliveryCategory, DeliveryQuote
+    from deliveries.routing import websocket_urlpatterns
+    from deliveries.services.offers import upsert_offer
+
+    router = URLRouter(websocket_urlpatterns)
+
+    async def application(scope, receive, send):
+        # Usuario ya autenticado (como tras AuthMiddlewareStack) para las rutas por usuario
+        return await router({**scope, 'user': client}, receive, send)
+
+    recorder = Recorder()
+    listeners = []
+
+    async def open_listener(role, path):
+        communicator = WebsocketCommunicator(application, path)
+        start = time.perf_counter()
+        connected, _ = await communicator.connect(timeout=args.timeout)
+        assert connected, path
+        # Descartar el snapshot inicial antes de empezar a medir fan-out
+        await communicator.receive_output(timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        listener = Listener(role, communicator, recorder)
+        listener.task = asyncio.ensure_future(listener.pump())
+        listeners.append(listener)
+        return elapsed
+
+    rss_before = rss_bytes()
+    connect_samples = [
+        await open_listener('client_quotes', f'/ws/deliveries/users/{client.pk}/quotes/'),
+        await open_listener('client_deliveries', f'/ws/deliveries/users/{client.pk}/deliveries/'),
+    ]
+    for start in range(0, args.drivers, args.connect_concurrency):
+        batch = min(args.connect_concurrency, args.drivers - start)
+        connect_samples.extend(await asyncio.gather(*[
+            open_listener('drivers', '/ws/deliveries/new-quotes/') for _ in range(batch)
+        ]))
+    rss_after = rss_bytes()
+
+    by_role = Counter(listener.role for listener in listeners)
+    expected_per_listener = defaultdict(Counter)
+
+    async def operation(kind, fn):
+        """Ejecuta `fn` en el hilo de la base de datos y espera los frames esperados."""
+        targets = Counter()
+        for role, frame_types in EXPECTED[kind].items():
+            for frame_type in frame_types:
+                expected_per_listener[role][frame_type] += 1
+                targets[frame_type] += by_role[role]
+        baseline = Counter(recorder.counts)
+        recorder.t0 = time.perf_counter()
+        result = await sync_to_async(fn)()
+        deadline = time.perf_counter() + args.timeout
+        while time.perf_counter() < deadline:
+            if all(recorder.counts[t] - baseline[t] >= n for t, n in targets.items()):
+                break
+            await asyncio.sleep(0.001)
+        return result
+
+    category = await sync_to_async(lambda: DeliveryCategory.objects.order_by('name').first())()
+    api_client = APIClient()
+    api_client.force_authenticate(user=client)
+
+    phase_started = time.perf_counter()
+    for i in range(args.quotes):
+        quote_id = uuid.uuid4()
+        quote = await operation('quote', lambda: DeliveryQuote.objects.create(
+            id=quote_id, client=client, pickup_address=f'Origen {i}', delivery_address=f'Destino {i}',
+            category=category, client_price=Decimal('10000.00'),
+        ))
+        offers = []
+        for bidder in bidders[:args.offers]:
+            offer, _ = await operation('offer', lambda: upsert_offer(
+                quote, bidder, proposed_price=Decimal('11000.00'), vehicle=bidder.current_vehicle,
+            ))
+            offers.append(offer)
+        if offers and not args.no_accept:
+            response = await operation('accept', lambda: api_client.post(f'/deliveries/api/offers/{offers[0].id}/accept/'))
+            assert response.status_code == 201, response.status_code
+    phase_seconds = time.perf_counter() - phase_started
+
+    # Dar margen a los frames rezagados antes de contar pérdidas
+    await asyncio.sleep(min(args.timeout, 0.5))
+    dropped = Counter()
+    for listener in listeners:
+        for frame_type, expected in expected_per_listener[listener.role].items():
+            dropped[frame_type] += max(0, expected - listener.received[frame_type])
+
+    for listener in listeners:
+        listener.task.cancel()
+    await asyncio.gather(*(listener.task for listener in listeners), return_exceptions=True)
+    for listener in listeners:
+        await listener.communicator.disconnect()
+
+    return {
+        'connections': len(listeners),
+        'connect': summarize(connect_samples),
+        'rss_per_connection_bytes': (rss_after - rss_before) / len(listeners),
+        'rss_delta_bytes': rss_after - rss_before,
+        'operations_seconds': phase_seconds,
+        'fanout_latency': {frame_type: summarize(samples) for frame_type, samples in recorder.latencies.items()},
+        'frames_received': dict(recorder.counts),
+        'dropped': dict(dropped),
+    }
+
+
+def configure_layer(args):
+    from channels.layers import channel_layers
+    from django.conf import settings
+
+    if args.layer in ('redis', 'hybrid'):
+        settings.CHANNEL_LAYERS = {'default': {
+            'BACKEND': {
+                'redis': 'channels_redis.core.RedisChannelLayer',
+                'hybrid': 'backend.channel_layers.HybridRedisChannelLayer',
+            }[args.layer],
+            'CONFIG': {'hosts': [args.redis_url], 'capacity': args.capacity},
+        }}
+    else:
+        settings.CHANNEL_LAYERS = {'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {'capacity': args.capacity},
+        }}
+    channel_layers.backends = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drivers', type=int, default=1000, help='Conexiones a new_quotes')
+    parser.add_argument('--quotes', type=int, default=20)
+    parser.add_argument('--offers', type=int, default=3, help='Ofertas por cotización')
+    parser.add_argument('--no-accept', action='store_true')
+    parser.add_argument('--pending-quotes', type=int, default=20, help='Tamaño del snapshot inicial de new_quotes')
+    parser.add_argument('--connect-concurrency', type=int, default=100)
+    parser.add_argument('--layer', choices=('memory', 'redis', 'hybrid'), default='memory')
+    parser.add_argument('--redis-url', default=os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/2'))
+    parser.add_argument('--capacity', type=int, default=100, help='Capacidad por canal de la capa')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--settings', default=None)
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida')
+    args = parser.parse_args()
+
+    setup(args.settings, inmemory_channel_layer=False)
+    configure_layer(args)
+    with benchmark_database():
+        client, bidders = seed(args)
+        result = asyncio.run(run_async(args, client, bidders))
+
+    print(f"conexiones={result['connections']} connect p50={result['connect']['p50_ms']:.2f}ms "
+          f"p99={result['connect']['p99_ms']:.2f}ms  RSS/conexión={result['rss_per_connection_bytes'] / 1024:.1f} KiB")
+    for frame_type, summary in sorted(result['fanout_latency'].items()):
+        print(f"{frame_type:<20} n={summary['n']:>8} p50={summary['p50_ms']:>8.2f}ms p99={summary['p99_ms']:>8.2f}ms "
+              f"perdidos={result['dropped'].get(frame_type, 0)}")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'args': vars(args), **result}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,42 @@
 from rest_framework import permissions, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from backend.conditional import conditional_response, digest_etag, latest
+from backend.pagination import CreatedAtCursorPagination
+from backend.parsers import NDJSONParser
 from .models import DeliveryQuote, DeliveryOffer, DeliveryCategory, Delivery, DeliveryHistory
+from deliveries.services import delivery_cache, group_registry
+from deliveries.services.archive import archive_quotes
+from deliveries.services.catalog import CatalogViewSetMixin, catalog_version
+from deliveries.services.broadcasts import broadcast, live_targets
 from deliveries.services.expiration import _broadcast
+from deliveries.services.offers import upsert_offer
+from deliveries.services.quote_ingest import QuoteIngestError, ingest_quotes
+from deliveries.services.transitions import TransitionConflict, bulk_transition, transition
 from .serializers import DeliveryQuoteSerializer, DeliveryOfferSerializer, DeliveryCategorySerializer, DeliverySerializer, DeliveryHistorySerializer
-from django.db.models import Q
+from users.models import UserRating
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, Sum
 from django.utils import timezone
+from decimal import Decimal
 import datetime
+import zoneinfo
+from collections.abc import Iterator
 
-class DeliveryCategoryViewSet(viewsets.ModelViewSet):
+class DeliveryCategoryViewSet(CatalogViewSetMixin, viewsets.ModelViewSet):
     queryset = DeliveryCategory.objects.all()
+    catalog_name = 'categories'
     serializer_class = DeliveryCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
 class DeliveryViewSet(viewsets.ModelViewSet):
     serializer_class = DeliverySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         """
@@ -57,39 +78,157 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         if status_filter:
             qs = qs.filter(status=status_filter)
 
-        # Filtrar por mes (query param `month` 1-12). Si se pasa `year` lo usa,
-        # sino asume el año actual.
-        month = self.request.query_params.get('month')
+        # Filtrar por rango de fechas (`month`/`year` o `from`/`to`) como rango semiabierto
+        # sobre `created_at`, para que la consulta pueda usar los índices compuestos.
+        date_range = self._date_range()
+        if date_range:
+            start, end = date_range
+            if start:
+                qs = qs.filter(created_at__gte=start)
+            if end:
+                qs = qs.filter(created_at__lt=end)
+
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        """Listado paginado. Si se filtra por fechas incluye `summary` con conteos y totales.
+
+        Soporta GET condicional: el ETag sale de conteo y máximos de `updated_at`
+        del conjunto filtrado (domicilios, participantes y vehículo del domiciliario)
+        y de las reseñas recibidas por los participantes, que el cuerpo muestra como
+        `rating_average`/`rating_count`. Con `If-None-Match` vigente se responde 304.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = queryset.aggregate(
+            count=Count('id'),
+            updated=Max('updated_at'),
+            client_updated=Max('client__updated_at'),
+            person_updated=Max('delivery_person__updated_at'),
+            vehicle_updated=Max('delivery_person__current_vehicle__updated_at'),
+        )
+        validators.update(UserRating.objects.filter(
+            Q(ratee__in=queryset.values('client_id')) | Q(ratee__in=queryset.values('delivery_person_id'))
+        ).aggregate(rating_count=Count('id'), rating_updated=Max('updated_at')))
+        etag = digest_etag('deliveries', catalog_version(), *validators.values())
+        last_modified = latest(
+            validators['updated'], validators['client_updated'], validators['person_updated'],
+            validators['vehicle_updated'], validators['rating_updated'],
+        )
+
+        def build():
+            response = super(DeliveryViewSet, self).list(request, *args, **kwargs)
+            if self._date_range():
+                response.data['summary'] = self._summary(queryset)
+            return response
+        return conditional_response(request, etag, last_modified, build)
+
+    def _cached_record(self):
+        """Registro cacheado del domicilio de la URL; 404 si el usuario no participa en él."""
+        record = delivery_cache.get_record(self.kwargs.get('pk'))
+        user = self.request.user
+        if record is None or not (user.is_staff or user.pk in (record['client_id'], record['delivery_person_id'])):
+            raise Http404
+        return record
+
+    def retrieve(self, request, *args, **kwargs):
+        """Detalle desde el registro cacheado del domicilio, con GET condicional.
+
+        La autorización, el ETag y el cuerpo salen del registro, así que en el caso
+        habitual no se consulta la base de datos.
+        """
+        record = self._cached_record()
+        etag = digest_etag(
+            'delivery', kwargs.get('pk'), catalog_version(), record['updated_at'], record['version'],
+            record['client_updated_at'], record['delivery_person_updated_at'], record['vehicle_updated_at'],
+            record.get('ratings'),
+        )
+        last_modified = latest(
+            record['updated_at'], record['client_updated_at'], record['delivery_person_updated_at'],
+            record['vehicle_updated_at'],
+        )
+        return conditional_response(request, etag, last_modified, lambda: Response(record['data']))
+
+    def _request_timezone(self):
+        """Zona horaria del usuario (`?tz=America/Bogota`); por defecto la del proyecto."""
+        tz_name = self.request.query_params.get('tz')
+        if tz_name:
+            try:
+                return zoneinfo.ZoneInfo(tz_name)
+            except (zoneinfo.ZoneInfoNotFoundError, ValueError, OSError):
+                # Nombres que no son zonas: `America` (un directorio), demasiado largos, etc.
+                pass
+        return timezone.get_current_timezone()
+
+    def _date_range(self):
+        """
+        Devuelve (inicio, fin) como datetimes con zona horaria, con fin exclusivo, o None.
+        - `month` (1-12) y opcionalmente `year` (por defecto el año actual en la zona del usuario).
+        - `from` / `to` en formato YYYY-MM-DD; `to` es inclusivo (se toma hasta el día siguiente).
+        Los valores inválidos se ignoran.
+        """
+        params = self.request.query_params
+        tz = self._request_timezone()
+
+        month = params.get('month')
         if month:
             try:
                 month_i = int(month)
                 if 1 <= month_i <= 12:
-                    year = self.request.query_params.get('year')
-                    if year:
-                        year_i = int(year)
+                    year = params.get('year')
+                    year_i = int(year) if year else timezone.localtime(timezone.now(), tz).year
+                    start = datetime.datetime(year_i, month_i, 1, tzinfo=tz)
+                    if month_i == 12:
+                        end = datetime.datetime(year_i + 1, 1, 1, tzinfo=tz)
                     else:
-                        year_i = timezone.now().year
-
-                    # Usar lookups de mes/año para evitar problemas de zonas horarias
-                    qs = qs.filter(created_at__month=month_i, created_at__year=year_i)
+                        end = datetime.datetime(year_i, month_i + 1, 1, tzinfo=tz)
+                    return start, end
             except (TypeError, ValueError):
                 # si month no es válido, ignorar el filtro
                 pass
 
-        return qs
+        start = end = None
+        try:
+            if params.get('from'):
+                start = datetime.datetime.combine(datetime.date.fromisoformat(params['from']), datetime.time.min, tzinfo=tz)
+        except ValueError:
+            start = None
+        try:
+            if params.get('to'):
+                to_date = datetime.date.fromisoformat(params['to']) + datetime.timedelta(days=1)
+                end = datetime.datetime.combine(to_date, datetime.time.min, tzinfo=tz)
+        except ValueError:
+            end = None
+
+        if start or end:
+            return start, end
+        return None
+
+    def _summary(self, queryset):
+        """Conteos y totales del rango filtrado, calculados en una sola consulta agregada."""
+        completed = Q(status__in=['delivered', 'paid'])
+        totals = queryset.order_by().aggregate(
+            count=Count('id'),
+            total=Sum('final_price'),
+            completed_count=Count('id', filter=completed),
+            completed_total=Sum('final_price', filter=completed),
+            cancelled_count=Count('id', filter=Q(status='cancelled')),
+        )
+        for key in ('total', 'completed_total'):
+            totals[key] = str((totals[key] or Decimal('0')).quantize(Decimal('0.01')))
+        return totals
 
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
         """Obtener el domicilio con todo su historial de eventos"""
-        delivery = self.get_object()
+        record = self._cached_record()
         
         # Obtener el historial usando el history_id
         history_events = DeliveryHistory.objects.filter(
-            history_id=delivery.history_id
+            history_id=record['history_id']
         ).order_by('created_at')
         
-        # Serializar
-        delivery_data = DeliverySerializer(delivery).data
+        # Serializar (el domicilio ya viene renderizado en el registro cacheado)
+        delivery_data = record['data']
         history_data = DeliveryHistorySerializer(history_events, many=True).data
         
         return Response({
@@ -97,24 +236,33 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             'history': history_data
         })
 
+    def _stale_version(self, request, delivery):
+        """True si el cliente envió `version` y no coincide con la de la fila leída."""
+        version = request.data.get('version')
+        return version is not None and str(version) != str(delivery.version)
+
+    def _conflict(self, delivery):
+        """Respuesta 409 con el estado actual, para que el cliente refresque su vista."""
+        current = Delivery.objects.filter(pk=delivery.pk).values('status', 'version').first() or {}
+        return Response({
+            'detail': 'El domicilio cambió mientras se procesaba la solicitud',
+            'current_status': current.get('status'),
+            'version': current.get('version'),
+        }, status=status.HTTP_409_CONFLICT)
+
     @action(detail=True, methods=['post'])
     def change_status(self, request, pk=None):
         """
         Avanzar automáticamente al siguiente estado del flujo del domicilio.
         Flujo: assigned -> picked_up -> in_transit -> delivered -> paid
         No permite avanzar a 'cancelled' (usar endpoint /cancel/ para eso)
+
+        El cambio es un UPDATE condicional sobre el estado leído: si otra petición
+        cambió el domicilio entretanto se responde 409. Opcionalmente se puede
+        enviar `version` para exigir que el domicilio no haya cambiado desde que
+        el cliente lo cargó.
         """
         delivery = self.get_object()
-        
-        # Definir el flujo de estados (sin incluir cancelled)
-        STATUS_FLOW = {
-            'assigned': 'picked_up',
-            'picked_up': 'in_transit',
-            'in_transit': 'delivered',
-            'delivered': 'paid',
-            'paid': None,  # Estado final, no hay siguiente
-        }
-        
         current_status = delivery.status
         
         # Validar que no esté cancelado
@@ -124,26 +272,28 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Obtener el siguiente estado
-        next_status = STATUS_FLOW.get(current_status)
+        next_status = Delivery.STATUS_FLOW.get(current_status)
         
         if next_status is None:
             return Response({
                 'detail': f'El domicilio ya está en el estado final: {delivery.get_status_display()}',
                 'current_status': current_status
             }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Actualizar al siguiente estado
+
+        if self._stale_version(request, delivery):
+            return self._conflict(delivery)
+
+        # Actualizar al siguiente estado y registrar en el historial
         old_status = delivery.status
-        delivery.status = next_status
-        delivery.save()
-        
-        # Registrar en el historial
-        DeliveryHistory.objects.create(
-            history_id=delivery.history_id,
-            event_type='status_changed',
-            description=f'Estado cambiado de {old_status} a {next_status}',
-            changed_by=request.user
-        )
+        with transaction.atomic():
+            if not transition(delivery, next_status):
+                return self._conflict(delivery)
+            DeliveryHistory.objects.create(
+                history_id=delivery.history_id,
+                event_type='status_changed',
+                description=f'Estado cambiado de {old_status} a {next_status}',
+                changed_by=request.user
+            )
         
         # Serializar el domicilio actualizado
         serialized = DeliverySerializer(delivery, context={'request': request}).data
@@ -153,22 +303,18 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         client_id = delivery.client_id
         delivery_person_id = delivery.delivery_person_id
         
-        payload = {'type': 'delivery_status_changed', 'data': serialized}
-        
         # Broadcast a grupos específicos
-        _broadcast(f'delivery_{delivery_id}', payload)
-        
-        if client_id:
-            _broadcast(f'user_deliveries_{client_id}', payload)
-        
-        if delivery_person_id:
-            _broadcast(f'driver_deliveries_{delivery_person_id}', payload)
+        broadcast([
+            f'delivery_{delivery_id}',
+            f'user_deliveries_{client_id}' if client_id else None,
+            f'driver_deliveries_{delivery_person_id}' if delivery_person_id else None,
+        ], 'delivery_status_changed', serialized)
         
         return Response({
             'message': f'Estado actualizado de {old_status} a {next_status}',
             'old_status': old_status,
             'new_status': next_status,
-            'next_status': STATUS_FLOW.get(next_status),
+            'next_status': Delivery.STATUS_FLOW.get(next_status),
             'delivery': serialized
         }, status=status.HTTP_200_OK)
 
@@ -178,10 +324,13 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         delivery = self.get_object()
         
         # Validar que el domicilio no esté ya en un estado final
-        if delivery.status in ['delivered', 'paid', 'cancelled']:
+        if delivery.status not in Delivery.CANCELLABLE_STATUSES:
             return Response({
                 'error': f'No se puede cancelar un domicilio en estado "{delivery.get_status_display()}"'
             }, status=status.HTTP_400_BAD_REQUEST)
+
+        if self._stale_version(request, delivery):
+            return self._conflict(delivery)
         
         # Guardar datos antes de actualizar para los broadcasts
         delivery_id = str(delivery.id)
@@ -189,119 +338,259 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         delivery_person_id = delivery.delivery_person_id
         old_status = delivery.status
         
-        # Actualizar estado a cancelado
-        delivery.status = 'cancelled'
-        delivery.save()  # Esto también actualizará cancelled_at mediante el método save() del modelo
-        
-        # Registrar en el historial
-        DeliveryHistory.objects.create(
-            history_id=delivery.history_id,
-            event_type='cancelled',
-            description=f'Domicilio cancelado (estado anterior: {old_status})',
-            changed_by=request.user
-        )
+        # Actualizar estado a cancelado (también fija cancelled_at) y registrar en el historial
+        with transaction.atomic():
+            if not transition(delivery, 'cancelled'):
+                return self._conflict(delivery)
+            DeliveryHistory.objects.create(
+                history_id=delivery.history_id,
+                event_type='cancelled',
+                description=f'Domicilio cancelado (estado anterior: {old_status})',
+                changed_by=request.user
+            )
         
         # Serializar el domicilio actualizado
         serialized = DeliverySerializer(delivery, context={'request': request}).data
         
-        # Broadcasts a todos los grupos relevantes
-        payload = {'type': 'delivery_cancelled', 'data': serialized}
-        
-        # 1. Grupo específico del domicilio
-        _broadcast(f'delivery_{delivery_id}', payload)
-        
-        # 2. Grupo del cliente (user_deliveries) - el domicilio desaparece de su lista
-        if client_id:
-            _broadcast(f'user_deliveries_{client_id}', payload)
-        
-        # 3. Grupo del domiciliario (driver_deliveries) - el domicilio desaparece de su lista
-        if delivery_person_id:
-            _broadcast(f'driver_deliveries_{delivery_person_id}', payload)
+        # Broadcasts a todos los grupos relevantes: el del domicilio, y los del
+        # cliente y el domiciliario, de cuyas listas desaparece
+        broadcast([
+            f'delivery_{delivery_id}',
+            f'user_deliveries_{client_id}' if client_id else None,
+            f'driver_deliveries_{delivery_person_id}' if delivery_person_id else None,
+        ], 'delivery_cancelled', serialized)
         
         return Response({
             'message': 'Domicilio cancelado exitosamente',
             'delivery': serialized
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def bulk_change_status(self, request):
+        """
+        Aplicar varias transiciones de estado en una sola petición.
+
+        Cuerpo: {"items": [{"id": "<uuid>", "status": "<estado destino>"}, ...]}
+        El destino debe ser el siguiente estado del flujo o 'cancelled' si el
+        domicilio aún es cancelable. Todo se valida junto y se aplica en una
+        transacción (todo o nada); los broadcasts se agrupan por grupo.
+        """
+        # Un cuerpo JSON que no es objeto (una lista, un número) no trae "items"
+        items = request.data.get('items') if isinstance(request.data, dict) else None
+        max_items = getattr(settings, 'DELIVERIES_BULK_MAX_ITEMS', 100)
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Debe enviar "items" como una lista no vacía'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_items:
+            return Response({'detail': f'Se permiten como máximo {max_items} domicilios por solicitud'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        targets = {}
+        for item in items:
+            if not isinstance(item, dict) or not item.get('id') or not item.get('status'):
+                return Response({'detail': 'Cada item debe tener "id" y "status"'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            targets[str(item['id'])] = item['status']
+        if len(targets) != len(items):
+            return Response({'detail': 'Hay domicilios repetidos en la solicitud'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        try:
+            deliveries = list(
+                Delivery.objects.filter(Q(client=user) | Q(delivery_person=user), id__in=list(targets))
+                .select_related('client', 'delivery_person', 'category')
+            )
+        except DjangoValidationError:
+            return Response({'detail': 'Identificadores de domicilio inválidos'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Validar todas las transiciones antes de tocar la base de datos
+        found = {str(delivery.id): delivery for delivery in deliveries}
+        errors = {}
+        changes = []
+        for delivery_id, target in targets.items():
+            delivery = found.get(delivery_id)
+            if delivery is None:
+                errors[delivery_id] = 'No encontrado'
+            elif target == 'cancelled':
+                if delivery.status not in Delivery.CANCELLABLE_STATUSES:
+                    errors[delivery_id] = f'No se puede cancelar un domicilio en estado "{delivery.get_status_display()}"'
+                else:
+                    changes.append((delivery, target))
+            elif Delivery.STATUS_FLOW.get(delivery.status) != target:
+                errors[delivery_id] = f'Transición no permitida de {delivery.status} a {target}'
+            else:
+                changes.append((delivery, target))
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        old_statuses = {delivery.pk: delivery.status for delivery, _ in changes}
+        try:
+            with transaction.atomic():
+                bulk_transition(changes)
+                DeliveryHistory.objects.bulk_create([
+                    DeliveryHistory(
+                        history_id=delivery.history_id,
+                        event_type='cancelled' if new_status == 'cancelled' else 'status_changed',
+                        description=(
+                            f'Domicilio cancelado (estado anterior: {old_statuses[delivery.pk]})'
+                            if new_status == 'cancelled'
+                            else f'Estado cambiado de {old_statuses[delivery.pk]} a {new_status}'
+                        ),
+                        changed_by=user,
+                    )
+                    for delivery, new_status in changes
+                ])
+        except TransitionConflict:
+            return Response({'detail': 'Algún domicilio cambió mientras se procesaba la solicitud; no se aplicó ningún cambio'},
+                            status=status.HTTP_409_CONFLICT)
+
+        # Un solo mensaje por grupo: el evento individual si hay uno, o un lote.
+        # Solo se serializan los domicilios con algún grupo suscrito.
+        groups_by_delivery = {}
+        for delivery, _ in changes:
+            groups = [f'delivery_{delivery.id}', f'user_deliveries_{delivery.client_id}']
+            if delivery.delivery_person_id:
+                groups.append(f'driver_deliveries_{delivery.delivery_person_id}')
+            groups_by_delivery[delivery.pk] = groups
+        live = group_registry.live_groups([group for groups in groups_by_delivery.values() for group in groups])
+        events_by_group = {}
+        results = []
+        for delivery, new_status in changes:
+            event_type = 'delivery_cancelled' if new_status == 'cancelled' else 'delivery_status_changed'
+            targets = live_targets(groups_by_delivery[delivery.pk], event_type, live)
+            if targets:
+                payload = {'type': event_type, 'data': DeliverySerializer(delivery, context={'request': request}).data}
+                for group in targets:
+                    events_by_group.setdefault(group, []).append(payload)
+            results.append({
+                'id': str(delivery.id),
+                'old_status': old_statuses[delivery.pk],
+                'new_status': new_status,
+                'next_status': Delivery.STATUS_FLOW.get(new_status),
+                'version': delivery.version,
+            })
+
+        with group_registry.assume_live(events_by_group):
+            for group, events in events_by_group.items():
+                _broadcast(group, events[0] if len(events) == 1 else {'type': 'deliveries_batch', 'data': events})
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
 
 class DeliveryOfferViewSet(viewsets.ModelViewSet):
     queryset = DeliveryOffer.objects.all()
     serializer_class = DeliveryOfferSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        """Excluir ofertas vencidas aunque el expirador aún no las haya eliminado."""
+        return super().get_queryset().live()
 
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
-        """Aceptar una oferta y crear el domicilio permanente"""
+        """
+        Aceptar una oferta y crear el domicilio permanente.
+        Todo el flujo corre en una transacción con la cotización bloqueada
+        (`select_for_update`), de modo que dos aceptaciones simultáneas no pueden
+        crear dos domicilios. Los broadcasts se emiten solo después del commit.
+        """
         offer = self.get_object()
-        
+
         if offer.status != 'pending':
             return Response({'error': 'Solo se pueden aceptar ofertas pendientes'}, 
                            status=status.HTTP_400_BAD_REQUEST)
-        
-        # Crear el domicilio permanente
-        delivery = Delivery.objects.create(
-            client=offer.quote.client,
-            delivery_person=offer.delivery_person,
-            pickup_address=offer.quote.pickup_address,
-            delivery_address=offer.quote.delivery_address,
-            category=offer.quote.category,
-            description=offer.quote.description,
-            observations=offer.quote.observations,
-            estimated_weight=offer.quote.estimated_weight,
-            estimated_size=offer.quote.estimated_size,
-            final_price=offer.proposed_price,
-            status='assigned'
-        )
-        
-        # Actualizar estados
-        offer.status = 'accepted'
-        offer.save()
-        
-        offer.quote.status = 'accepted'
-        offer.quote.save()
-        
-        # Registrar eventos en el historial
-        DeliveryHistory.objects.create(
-            history_id=offer.quote.history_id,
-            event_type='offer_accepted',
-            description=f'Oferta aceptada por {offer.delivery_person} con precio ${offer.proposed_price}',
-            changed_by=request.user
-        )
-        
-        # Asignar el mismo history_id al delivery para mantener la continuidad
-        delivery.history_id = offer.quote.history_id
-        delivery.save()
-        
-        DeliveryHistory.objects.create(
-            history_id=delivery.history_id,
-            event_type='offer_accepted',
-            description=f'Domicilio creado a partir de oferta aceptada',
-            changed_by=request.user
-        )
 
-        # Serializar antes de eliminar
-        quote_payload = DeliveryQuoteSerializer(offer.quote, context={'request': request}).data
-        delivery_payload = DeliverySerializer(delivery, context={'request': request}).data
-        
-        # Guardar IDs antes de eliminar
-        quote_id = str(offer.quote.id)
-        client_id = offer.quote.client_id
-        
-        # Broadcasts para notificar que la cotización fue aceptada y se eliminará
-        _broadcast(f'quote_{quote_id}', {'type': 'quote_accepted', 'data': quote_payload})
-        _broadcast(f'user_quotes_{client_id}', {'type': 'quote_accepted', 'data': quote_payload})
-        _broadcast(f'new_quotes', {'type': 'quote_accepted', 'data': quote_payload})
-        
-        # Notificar creación del domicilio
-        _broadcast(f'user_deliveries_{delivery.client_id}', {'type': 'delivery_created', 'data': delivery_payload})
-        
-        # Notificar al domiciliario asignado
-        if delivery.delivery_person_id:
-            _broadcast(f'driver_deliveries_{delivery.delivery_person_id}', {'type': 'delivery_assigned', 'data': delivery_payload})
-        
-        # Eliminar la cotización y todas sus ofertas (cascade)
-        offer.quote.delete()  # Esto también elimina todas las ofertas relacionadas por cascade
-        
+        now = timezone.now()
+        with transaction.atomic():
+            # Solo cotizaciones vigentes: una vencida que el expirador aún no
+            # archivó no se puede aceptar
+            quote = (
+                DeliveryQuote.objects.live(now).select_for_update()
+                .select_related('client', 'category')
+                .filter(pk=offer.quote_id)
+                .first()
+            )
+            # Reclamar la cotización con un UPDATE condicional: si otra petición ya
+            # la aceptó (o la canceló, o venció) no se actualiza ninguna fila.
+            claimed = DeliveryQuote.objects.live(now).filter(pk=offer.quote_id, status='pending').update(status='accepted')
+            if quote is None or not claimed:
+                return Response({'error': 'La cotización ya no está disponible'},
+                                status=status.HTTP_409_CONFLICT)
+            if not DeliveryOffer.objects.live(now).filter(pk=offer.pk, status='pending').update(status='accepted', updated_at=now):
+                transaction.set_rollback(True)
+                return Response({'error': 'Solo se pueden aceptar ofertas pendientes'},
+                                status=status.HTTP_409_CONFLICT)
+            quote.status = 'accepted'
+            offer.status = 'accepted'
+
+            # Crear el domicilio permanente con el history_id de la cotización para mantener la continuidad
+            delivery = Delivery.objects.create(
+                client=quote.client,
+                delivery_person=offer.delivery_person,
+                pickup_address=quote.pickup_address,
+                delivery_address=quote.delivery_address,
+                category=quote.category,
+                description=quote.description,
+                observations=quote.observations,
+                estimated_weight=quote.estimated_weight,
+                estimated_size=quote.estimated_size,
+                final_price=offer.proposed_price,
+                status='assigned',
+                history_id=quote.history_id,
+            )
+
+            # Registrar eventos en el historial
+            DeliveryHistory.objects.bulk_create([
+                DeliveryHistory(
+                    history_id=quote.history_id,
+                    event_type='offer_accepted',
+                    description=f'Oferta aceptada por {offer.delivery_person} con precio ${offer.proposed_price}',
+                    changed_by=request.user
+                ),
+                DeliveryHistory(
+                    history_id=quote.history_id,
+                    event_type='offer_accepted',
+                    description='Domicilio creado a partir de oferta aceptada',
+                    changed_by=request.user
+                ),
+            ])
+
+            quote_id = str(quote.id)
+            client_id = quote.client_id
+            delivery_person_id = delivery.delivery_person_id
+            offer_groups = [f'quote_{quote_id}', f'user_quotes_{client_id}']
+            quote_groups = offer_groups + ['new_quotes']
+            driver_groups = [f'driver_deliveries_{delivery_person_id}'] if delivery_person_id else []
+            live = group_registry.live_groups(quote_groups + [f'user_deliveries_{client_id}'] + driver_groups)
+
+            # Serializar antes de archivar, solo lo que algún grupo va a recibir
+            quote_payload = offer_payload = None
+            if set(quote_groups) & set(live):
+                quote_payload = DeliveryQuoteSerializer(quote, context={'request': request}).data
+            if set(offer_groups) & set(live):
+                offer_payload = DeliveryOfferSerializer(offer, context={'request': request}).data
+            delivery_payload = DeliverySerializer(delivery, context={'request': request}).data
+
+            # Mover la cotización y todas sus ofertas al archivo
+            archive_quotes([quote.id], 'accepted')
+
+            def send_broadcasts():
+                # La oferta se reclama con `.update()` (no pasa por `on_offer_saved`):
+                # emitir aquí los eventos de oferta aceptada
+                broadcast(offer_groups, 'offer_updated', offer_payload, live)
+                broadcast(offer_groups, 'offer.accepted', offer_payload, live)
+                # Notificar que la cotización fue aceptada y archivada
+                broadcast(quote_groups, 'quote_accepted', quote_payload, live)
+                # Notificar creación del domicilio
+                broadcast([f'user_deliveries_{client_id}'], 'delivery_created', delivery_payload, live)
+                # Notificar al domiciliario asignado
+                broadcast(driver_groups, 'delivery_assigned', delivery_payload, live)
+
+            transaction.on_commit(send_broadcasts)
+
         return Response({
             'message': 'Oferta aceptada y domicilio creado',
             'delivery_id': str(delivery.id),
@@ -329,14 +618,13 @@ class DeliveryOfferViewSet(viewsets.ModelViewSet):
             changed_by=request.user
         )
 
-        offer_payload = DeliveryOfferSerializer(offer, context={'request': request}).data
-        # Notificar a los grupos relevantes: el quote y el cliente
-        _broadcast(f'quote_{str(offer.quote.id)}', {'type': 'offer_rejected', 'data': offer_payload})
-        _broadcast(f'user_quotes_{offer.quote.client_id}', {'type': 'offer_rejected', 'data': offer_payload})
-
-        # Notificar también al domiciliario (si está presente) para que reciba la actualización
-        if offer.delivery_person_id:
-            _broadcast(f'driver_offers_{offer.delivery_person_id}', {'type': 'offer_rejected', 'data': offer_payload})
+        # Notificar a los grupos relevantes: el quote, el cliente y el domiciliario
+        # (si está presente); sin suscriptores no se serializa la oferta
+        broadcast([
+            f'quote_{offer.quote_id}',
+            f'user_quotes_{offer.quote.client_id}',
+            f'driver_offers_{offer.delivery_person_id}' if offer.delivery_person_id else None,
+        ], 'offer_rejected', lambda: DeliveryOfferSerializer(offer, context={'request': request}).data)
 
         return Response({'status': 'Oferta rechazada'})
 
@@ -345,6 +633,7 @@ class DeliveryQuoteViewSet(viewsets.ModelViewSet):
     queryset = DeliveryQuote.objects.all()
     serializer_class = DeliveryQuoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def perform_update(self, serializer):
         """Guardar y emitir broadcasts cuando se actualice una cotización.
@@ -354,22 +643,39 @@ class DeliveryQuoteViewSet(viewsets.ModelViewSet):
         la actualización.
         """
         quote = serializer.save()
-        serialized = DeliveryQuoteSerializer(quote, context={'request': self.request}).data
-        quote_id = str(quote.id)
         client_id = quote.client_id
-        payload = {'type': 'quote_updated', 'data': serialized}
-
-        # Grupo específico de la quote
-        _broadcast(f'quote_{quote_id}', payload)
-        # Grupo del cliente que contiene sus quotes
-        if client_id:
-            _broadcast(f'user_quotes_{client_id}', payload)
-        # Opcional: notificar lista global de nuevas quotes si sigue siendo pending
+        broadcast([
+            # Grupo específico de la quote
+            f'quote_{quote.id}',
+            # Grupo del cliente que contiene sus quotes
+            f'user_quotes_{client_id}' if client_id else None,
+            # Lista global de nuevas quotes si sigue siendo pending
+            'new_quotes' if quote.status == 'pending' else None,
+        ], 'quote_updated', lambda: DeliveryQuoteSerializer(quote, context={'request': self.request}).data)
+
+    @action(detail=False, methods=['post'], url_path='batch', parser_classes=[JSONParser, NDJSONParser])
+    def batch(self, request):
+        """Crear varias cotizaciones del usuario autenticado en una sola petición.
+
+        Acepta una lista JSON (o {"quotes": [...]}) o un cuerpo `application/x-ndjson`
+        con una cotización por línea, que se procesa por lotes a medida que se lee.
+        Es todo o nada: con cualquier fila inválida responde 400 con los errores por índice.
+        """
+        rows = request.data
+        if isinstance(rows, dict):
+            rows = rows.get('quotes')
+        # Una lista JSON o el generador de NDJSONParser; un escalar (`5`, `true`) no es iterable
+        if not isinstance(rows, (list, Iterator)):
+            return Response({'detail': 'Debe enviar una lista de cotizaciones'},
+                            status=status.HTTP_400_BAD_REQUEST)
         try:
-            if quote.status == 'pending':
-                _broadcast('new_quotes', payload)
-        except Exception:
-            pass
+            created = ingest_quotes(request.user, rows)
+        except QuoteIngestError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'created': len(created),
+            'ids': [str(quote.id) for quote in created],
+        }, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
         """Limit access so users only see their own quotes unless staff."""
@@ -379,7 +685,8 @@ class DeliveryQuoteViewSet(viewsets.ModelViewSet):
         if user is None or not user.is_authenticated:
             return qs.none()
 
-        return qs
+        # Las cotizaciones vencidas no se devuelven aunque el expirador no haya corrido
+        return qs.live()
 
     @action(detail=True, methods=['get','post'], url_path='offers')
     def offers(self, request, pk=None):
@@ -387,52 +694,47 @@ class DeliveryQuoteViewSet(viewsets.ModelViewSet):
         quote = self.get_object()
 
         if request.method == 'GET':
-            qs = quote.offers.all()
+            qs = quote.offers.live()
             status_filter = request.query_params.get('status')
             if status_filter:
                 qs = qs.filter(status=status_filter)
-            serializer = DeliveryOfferSerializer(qs, many=True, context={'request': request})
-            return Response(serializer.data)
+            page = self.paginate_queryset(qs)
+            serializer = DeliveryOfferSerializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
 
         if request.method == 'POST':
             if quote.status != 'pending':
                 return Response({'error': 'No se pueden hacer ofertas sobre cotizaciones no pendientes'},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            existing = DeliveryOffer.objects.filter(quote=quote, delivery_person=request.user).first()
-            data = request.data.copy()
-            data['quote'] = str(quote.id)
-
-            if existing:
-                # actualizar campos permitidos
-                serializer = DeliveryOfferSerializer(existing, data=data, partial=True, context={'request': request})
-                if serializer.is_valid():
-                    offer = serializer.save()
-                    return Response(DeliveryOfferSerializer(offer, context={'request': request}).data,
-                                    status=status.HTTP_200_OK)
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-            # crear nueva oferta
-            DeliveryHistory.objects.create(
-                history_id=quote.history_id,
-                event_type='offer_made',
-                description='Nueva oferta creada por domiciliario',
-                changed_by=request.user
-            )
-
+            # La cotización y el domiciliario salen de la URL y del usuario autenticado
             data = request.data.copy()
-            data['quote'] = str(quote.id)
+            data['quote_id'] = str(quote.id)
+            data['delivery_person_id'] = request.user.pk
             serializer = DeliveryOfferSerializer(data=data, context={'request': request})
+            # La unicidad (domiciliario, cotización) la resuelve el upsert, no una consulta previa
+            serializer.validators = []
             if serializer.is_valid():
-                offer = serializer.save(delivery_person=request.user)
+                try:
+                    offer, created = upsert_offer(
+                        quote,
+                        request.user,
+                        proposed_price=serializer.validated_data['proposed_price'],
+                        estimated_delivery_time=serializer.validated_data.get('estimated_delivery_time'),
+                        vehicle=serializer.validated_data.get('vehicle'),
+                    )
+                except IntegrityError:
+                    # La cotización se aceptó o archivó mientras se procesaba la oferta
+                    return Response({'error': 'La cotización ya no admite ofertas'},
+                                    status=status.HTTP_409_CONFLICT)
                 return Response(DeliveryOfferSerializer(offer, context={'request': request}).data,
-                                status=status.HTTP_201_CREATED)
+                                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
-        """Cancelar una cotización y eliminar objetos relacionados"""
+        """Cancelar una cotización y archivarla junto con sus ofertas"""
         quote = self.get_object()
         
         if quote.status != 'pending':
@@ -441,7 +743,7 @@ class DeliveryQuoteViewSet(viewsets.ModelViewSet):
 
         quote.status = 'cancelled'
 
-        # Registrar en el historial antes de eliminar
+        # Registrar en el historial antes de archivar
         DeliveryHistory.objects.create(
             history_id=quote.history_id,
             event_type='cancelled',
@@ -451,18 +753,15 @@ class DeliveryQuoteViewSet(viewsets.ModelViewSet):
 
         serialized = DeliveryQuoteSerializer(quote, context={'request': request}).data
 
-        # Guardar identificadores antes de eliminar definitivamente el registro
+        # Guardar identificadores antes de archivar el registro
         quote_id = str(quote.id)
         client_id = quote.client_id
 
-        # Eliminar la cotización (y sus ofertas relacionadas vía cascade)
-        quote.delete()
+        # Mover la cotización (y sus ofertas relacionadas) al archivo
+        archive_quotes([quote.id], 'cancelled')
 
         # Emitir broadcast para que clientes conectados actualicen UI
-        payload = {'type': 'quote_expired', 'data': serialized}
-        _broadcast('new_quotes', payload)
-        _broadcast(f'quote_{quote_id}', payload)
-        _broadcast(f'user_quotes_{client_id}', payload)
+        broadcast(['new_quotes', f'quote_{quote_id}', f'user_quotes_{client_id}'], 'quote_expired', serialized)
 
         return Response(serialized, status=status.HTTP_200_OK)
 
@@ -3,9 +3,17 @@ from asgiref.sync import async_to_sync
 from django.contrib.auth.models import AnonymousUser
 from .models import DeliveryQuote, DeliveryOffer, Delivery
 from .serializers import DeliveryQuoteSerializer, DeliveryOfferSerializer, DeliverySerializer
+from .services import group_registry
+from backend.backpressure import BackpressureConsumerMixin
+from backend.metrics import InstrumentedConsumerMixin
+from backend.profiling import ProfiledConsumerMixin
+from backend.slow_queries import SlowQueryConsumerMixin
 import json
+import logging
 import urllib.parse
 
+logger = logging.getLogger(__name__)
+
 # Authentication helpers: try to support DRF Token and SimpleJWT if available
 try:
     from rest_framework.authtoken.models import Token as DRFToken
@@ -20,7 +28,8 @@ except Exception:
 IN_PROGRESS_STATUSES = {'assigned', 'picked_up', 'in_transit'}
 
 
-class DeliveryConsumer(JsonWebsocketConsumer):
+class DeliveryConsumer(BackpressureConsumerMixin, InstrumentedConsumerMixin, ProfiledConsumerMixin,
+                       SlowQueryConsumerMixin, JsonWebsocketConsumer):
     def connect(self):
         # Intentar autenticar usando token pasado como subprotocol ('Bearer <token>')
         import re
@@ -208,6 +217,8 @@ class DeliveryConsumer(JsonWebsocketConsumer):
             self.close()
             return
 
+        group_registry.join(self.group_name)
+        self._group_registered = True
         async_to_sync(self.channel_layer.group_add)(self.group_name, self.channel_name)
         # Para que el navegador complete el handshake correctamente, si el cliente
         # envió subprotocols debemos devolver uno en la respuesta. Si hay un
@@ -233,7 +244,7 @@ class DeliveryConsumer(JsonWebsocketConsumer):
         if self.group_type == 'new_quotes':
             # Domiciliarios viendo lista de quotes - NO mostrar offers de otros domiciliarios
             try:
-                qs = DeliveryQuote.objects.filter(status="pending")
+                qs = DeliveryQuote.objects.live().filter(status="pending")
                 initial_quotes = DeliveryQuoteSerializer(qs, many=True).data
                 
                 # NO agregar offers aquí - vulnerabilidad de seguridad
@@ -279,14 +290,14 @@ class DeliveryConsumer(JsonWebsocketConsumer):
             # Cliente viendo su cotización específica - SÍ mostrar todas las offers
             try:
                 # Obtener solo el quote específico que está viendo
-                qs = DeliveryQuote.objects.filter(id=quote_id, status="pending")
+                qs = DeliveryQuote.objects.live().filter(id=quote_id, status="pending")
                 initial_quotes = DeliveryQuoteSerializer(qs, many=True).data
                 
                 # Para este quote específico, agregar sus offers (el cliente debe verlas todas)
                 for quote_data in initial_quotes:
                     quote_id_data = quote_data.get('id')
                     if quote_id_data:
-                        offers = DeliveryOffer.objects.filter(quote_id=quote_id_data, status='pending')
+                        offers = DeliveryOffer.objects.live().filter(quote_id=quote_id_data, status='pending')
                         quote_data['offers'] = DeliveryOfferSerializer(offers, many=True, context={'request': self.scope}).data
                 
                 # Asegurar que los tipos no serializables por JSON (Decimal, UUID) se conviertan a str
@@ -356,12 +367,12 @@ class DeliveryConsumer(JsonWebsocketConsumer):
                     pass
         elif self.group_type == 'user_quotes':
             try:
-                qs = DeliveryQuote.objects.filter(client_id=self.user_id).order_by('-created_at')
+                qs = DeliveryQuote.objects.live().filter(client_id=self.user_id).order_by('-created_at')
                 initial_quotes = DeliveryQuoteSerializer(qs, many=True).data
                 for quote_data in initial_quotes:
                     quote_id_data = quote_data.get('id')
                     if quote_id_data:
-                        offers = DeliveryOffer.objects.filter(quote_id=quote_id_data)
+                        offers = DeliveryOffer.objects.live().filter(quote_id=quote_id_data)
                         quote_data['offers'] = DeliveryOfferSerializer(offers, many=True).data
                 safe_initial = json.loads(json.dumps(initial_quotes, default=str))
                 self.send_json({"type": "user_quotes.initial", "quotes": safe_initial})
@@ -373,42 +384,37 @@ class DeliveryConsumer(JsonWebsocketConsumer):
         elif self.group_type == 'user_deliveries':
             try:
                 deliveries = Delivery.objects.filter(client_id=self.user_id, status__in=IN_PROGRESS_STATUSES)
-                print(f"[user_deliveries] Buscando domicilios para client_id={self.user_id}")
-                print(f"[user_deliveries] Encontrados {deliveries.count()} domicilios en proceso")
                 deliveries_data = DeliverySerializer(deliveries, many=True).data
                 safe_initial = json.loads(json.dumps(deliveries_data, default=str))
-                print(f"[user_deliveries] Enviando {len(safe_initial)} domicilios al cliente")
+                logger.debug("[user_deliveries] Enviando %d domicilios al cliente %s", len(safe_initial), self.user_id)
                 self.send_json({"type": "user_deliveries.initial", "deliveries": safe_initial})
-            except Exception as e:
-                print(f"[user_deliveries] ERROR: {e}")
-                import traceback
-                traceback.print_exc()
+            except Exception:
+                logger.exception("[user_deliveries] Error enviando el estado inicial")
 
         elif self.group_type == 'driver_deliveries':
             # Entregas asignadas al domiciliario (delivery_person_id)
             try:
                 deliveries = Delivery.objects.filter(delivery_person_id=self.user_id, status__in=IN_PROGRESS_STATUSES)
-                print(f"[driver_deliveries] Buscando domicilios para delivery_person_id={self.user_id}")
-                print(f"[driver_deliveries] Encontrados {deliveries.count()} domicilios en proceso")
                 deliveries_data = DeliverySerializer(deliveries, many=True).data
                 safe_initial = json.loads(json.dumps(deliveries_data, default=str))
-                print(f"[driver_deliveries] Enviando {len(safe_initial)} domicilios al domiciliario")
+                logger.debug("[driver_deliveries] Enviando %d domicilios al domiciliario %s", len(safe_initial), self.user_id)
                 self.send_json({"type": "driver_deliveries.initial", "deliveries": safe_initial})
-            except Exception as e:
-                print(f"[driver_deliveries] ERROR: {e}")
-                import traceback
-                traceback.print_exc()
+            except Exception:
+                logger.exception("[driver_deliveries] Error enviando el estado inicial")
 
     def disconnect(self, close_code):
         if hasattr(self, 'group_name'):
             async_to_sync(self.channel_layer.group_discard)(self.group_name, self.channel_name)
+        if getattr(self, '_group_registered', False):
+            self._group_registered = False
+            group_registry.leave(self.group_name)
 
     def receive_json(self, content, **kwargs):
         pass
 
     def broadcast(self, event):
         data = event.get('data', {})
-        self.send_json(data)
+        self.send_coalesced(data)
 
     def _owns_resource(self, auth_user_id, requested_id):
         if not auth_user_id or not requested_id:
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from deliveries.services.query_plans import explain_hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Muestra el plan (EXPLAIN) de las consultas calientes y verifica que usen índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--markdown', action='store_true', help='Imprimir en formato Markdown para EXPLAIN_REPORT.md')
+        parser.add_argument('--strict', action='store_true', help='Terminar con error si alguna consulta no usa índice')
+
+    def handle(self, *args, **options):
+        results = explain_hot_queries()
+        vendor = connection.vendor
+
+        if options['markdown']:
+            self.stdout.write(f'## {vendor}\n\n')
+            for name, origin, plan, indexed in results:
+                self.stdout.write(f"### `{name}` ({origin}) — {'índice' if indexed else 'SIN ÍNDICE'}\n\n")
+                self.stdout.write('```\n' + plan + '\n```\n\n')
+        else:
+            for name, origin, plan, indexed in results:
+                style = self.style.SUCCESS if indexed else self.style.ERROR
+                self.stdout.write(style(f"[{'OK' if indexed else 'SIN ÍNDICE'}] {name} ({origin})"))
+                self.stdout.write(plan)
+
+        missing = [name for name, _, _, indexed in results if not indexed]
+        if missing and options['strict']:
+            raise CommandError(f'Consultas sin índice en {vendor}: {", ".join(missing)}')
@@ -0,0 +1,65 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from deliveries.services.seeding import SeedOptions, seed_marketplace
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Siembra un marketplace sintético (clientes, domiciliarios, cotizaciones, ofertas y domicilios) para benchmarks'
+
+    def add_arguments(self, parser):
+        defaults = SeedOptions()
+        parser.add_argument('--clients', type=int, default=defaults.clients)
+        parser.add_argument('--drivers', type=int, default=defaults.drivers, help='Cada uno con vehículo y calificaciones')
+        parser.add_argument('--pending-quotes', type=int, default=defaults.pending_quotes)
+        parser.add_argument('--offers-per-quote', type=int, default=defaults.offers_per_quote, help='Máximo de ofertas por cotización pendiente')
+        parser.add_argument('--ratings-per-driver', type=int, default=defaults.ratings_per_driver)
+        parser.add_argument('--deliveries', type=int, default=defaults.deliveries)
+        parser.add_argument('--years', type=float, default=defaults.years, help='Años de historia de los domicilios')
+        parser.add_argument('--until', default=None, help='Fecha final (YYYY-MM-DD, UTC); por defecto hoy')
+        parser.add_argument('--no-history', action='store_true', help='No generar DeliveryHistory')
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--prefix', default=defaults.prefix, help='Prefijo de los userid sembrados')
+        parser.add_argument('--chunk-size', type=int, default=defaults.chunk_size)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(userid__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Ya existen usuarios con el prefijo "{prefix}_"; use otro --prefix o una base nueva.')
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError('--until debe tener el formato YYYY-MM-DD')
+
+        seed_options = SeedOptions(
+            clients=options['clients'],
+            drivers=options['drivers'],
+            pending_quotes=options['pending_quotes'],
+            offers_per_quote=options['offers_per_quote'],
+            ratings_per_driver=options['ratings_per_driver'],
+            deliveries=options['deliveries'],
+            years=options['years'],
+            with_history=not options['no_history'],
+            seed=options['seed'],
+            prefix=prefix,
+            chunk_size=options['chunk_size'],
+            until=until,
+        )
+        started = time.perf_counter()
+
+        def progress(model, total):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {model._meta.model_name}: {total} ({time.perf_counter() - started:.1f} s)')
+
+        result = seed_marketplace(seed_options, progress=progress)
+        elapsed = time.perf_counter() - started
+        for name, total in result.counts.items():
+            self.stdout.write(f'{name}: {total}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Marketplace sembrado en {elapsed:.1f} s ({sum(result.counts.values())} filas, semilla {seed_options.seed})'
+        ))
@@ -0,0 +1,42 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.slow_queries import load
+
+
+class Command(BaseCommand):
+    help = 'Muestra el top de consultas lentas y repetidas (N+1) registradas en SLOW_QUERY_LOG_FILE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Archivo de hallazgos (por defecto SLOW_QUERY_LOG_FILE)')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--kind', choices=('slow', 'repeated'), default=None)
+        parser.add_argument('--json', action='store_true', help='Imprimir los hallazgos en JSON')
+
+    def handle(self, *args, **options):
+        path = options['file'] or getattr(settings, 'SLOW_QUERY_LOG_FILE', '')
+        if not path:
+            raise CommandError('Define SLOW_QUERY_LOG_FILE o usa --file')
+        entries = load(path, top_n=options['limit']).top(options['limit'], options['kind'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(entries, indent=2, default=str))
+            return
+        if not entries:
+            self.stdout.write('Sin hallazgos.')
+            return
+        for entry in entries:
+            if entry['kind'] == 'slow':
+                title = f"LENTA  {entry['total_ms']:.1f} ms en {entry['occurrences']} ejecuciones (máx {entry['max_ms']:.1f} ms)"
+            else:
+                title = (f"N+1    {entry['executions']} ejecuciones en {entry['occurrences']} peticiones, "
+                         f"{entry['total_ms']:.1f} ms en total")
+            style = self.style.ERROR if entry['full_scan'] else self.style.WARNING
+            self.stdout.write(style(f"{title}  {entry['site']}{'  [RECORRIDO COMPLETO]' if entry['full_scan'] else ''}"))
+            self.stdout.write(f"  rutas: {', '.join(entry['labels'])}")
+            self.stdout.write(f"  {entry['fingerprint']}")
+            if entry['plan']:
+                for line in entry['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
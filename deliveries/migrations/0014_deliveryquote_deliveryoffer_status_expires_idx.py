@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0013_add_observations_to_delivery'),
+        ('vehicles', '0004_alter_vehicle_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliveryoffer',
+            index=models.Index(fields=['status', 'expires_at'], name='deliveries__status_ef73c0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(fields=['status', 'expires_at'], name='deliveries__status_a5ab31_idx'),
+        ),
+    ]
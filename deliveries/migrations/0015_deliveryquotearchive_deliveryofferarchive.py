@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0014_deliveryquote_deliveryoffer_status_expires_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryOfferArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('bucket', models.DateField()),
+                ('quote_id', models.UUIDField()),
+                ('delivery_person_id', models.CharField(max_length=255)),
+                ('vehicle_id', models.UUIDField(blank=True, null=True)),
+                ('proposed_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('estimated_delivery_time', models.DurationField(blank=True, null=True)),
+                ('outcome', models.CharField(choices=[('accepted', 'Aceptada'), ('rejected', 'Rechazada'), ('expired', 'Expirada'), ('closed', 'Cotización cerrada')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Oferta Archivada',
+                'verbose_name_plural': 'Ofertas Archivadas',
+                'indexes': [models.Index(fields=['bucket', 'outcome'], name='deliveries__bucket_cdc227_idx'), models.Index(fields=['quote_id'], name='deliveries__quote_i_cb1366_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeliveryQuoteArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('bucket', models.DateField()),
+                ('client_id', models.CharField(max_length=255)),
+                ('category_id', models.UUIDField()),
+                ('vehicle_type_id', models.UUIDField(blank=True, null=True)),
+                ('history_id', models.UUIDField()),
+                ('client_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_method', models.CharField(max_length=20)),
+                ('outcome', models.CharField(choices=[('accepted', 'Aceptada'), ('cancelled', 'Cancelada'), ('expired', 'Expirada')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Cotización Archivada',
+                'verbose_name_plural': 'Cotizaciones Archivadas',
+                'indexes': [models.Index(fields=['bucket', 'outcome'], name='deliveries__bucket_70eb6a_idx'), models.Index(fields=['history_id'], name='deliveries__history_731593_idx')],
+            },
+        ),
+    ]
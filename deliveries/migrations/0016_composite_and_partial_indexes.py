@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0015_deliveryquotearchive_deliveryofferarchive'),
+        ('vehicles', '0004_alter_vehicle_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='delivery',
+            name='deliveries__client__5f82f7_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='delivery',
+            name='deliveries__deliver_f6cb7b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='deliveryhistory',
+            name='deliveries__history_7d4257_idx',
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['client', 'status', 'created_at'], name='deliveries__client__d48748_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivery_person', 'status'], name='deliveries__deliver_aa2c12_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryhistory',
+            index=models.Index(fields=['history_id', 'created_at'], name='deliveries__history_ea746d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryoffer',
+            index=models.Index(fields=['quote', 'status'], name='deliveries__quote_i_0a4db3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryoffer',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expires_at'], name='offer_pending_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(fields=['client', 'status', 'created_at'], name='deliveries__client__add871_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expires_at'], name='quote_pending_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='quote_pending_created_idx'),
+        ),
+    ]
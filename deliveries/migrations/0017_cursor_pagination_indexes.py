@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0016_composite_and_partial_indexes'),
+        ('vehicles', '0004_alter_vehicle_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['client', 'created_at', 'id'], name='deliveries__client__2c563f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivery_person', 'created_at', 'id'], name='deliveries__deliver_ba8513_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryoffer',
+            index=models.Index(fields=['created_at', 'id'], name='deliveries__created_692d15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(fields=['created_at', 'id'], name='deliveries__created_c0017d_idx'),
+        ),
+    ]
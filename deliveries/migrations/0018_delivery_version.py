@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0017_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
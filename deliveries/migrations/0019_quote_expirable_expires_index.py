@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0018_delivery_version'),
+        ('vehicles', '0005_vehicle_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='deliveryquote',
+            name='quote_pending_expires_idx',
+        ),
+        migrations.AddIndex(
+            model_name='deliveryquote',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'cancelled'])), fields=['expires_at'], name='quote_expirable_expires_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from datetime import timedelta
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 import uuid
 from users.models import User
@@ -26,6 +27,26 @@ class DeliveryCategory(models.Model):
         return self.name
 
 
+class ExpiringQuerySet(models.QuerySet):
+    """
+    QuerySet para modelos con `expires_at`. `live()` excluye en la propia consulta
+    los registros vencidos, sin depender de que el expirador ya los haya eliminado.
+    """
+
+    def live(self, now=None):
+        now = now or timezone.now()
+        return self.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+
+    def expired(self, now=None):
+        now = now or timezone.now()
+        return self.filter(expires_at__isnull=False, expires_at__lte=now)
+
+
+# Estados que barre el expirador; el índice parcial `quote_expirable_expires_idx`
+# usa la misma condición para que el planificador pueda usarlo en esa consulta.
+EXPIRABLE_QUOTE_STATUSES = ['pending', 'cancelled']
+
+
 class DeliveryQuote(models.Model):
     """
     Modelo para solicitudes de entrega de clientes con gestión de ciclo de vida
@@ -59,21 +80,35 @@ class DeliveryQuote(models.Model):
 
     history_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)  # ID único para todo el ciclo de vida
 
+    objects = ExpiringQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Cotización de Entrega"
         verbose_name_plural = "Cotizaciones de Entrega"
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['client', 'status', 'created_at']),
+            models.Index(fields=['created_at', 'id']),  # Paginación por cursor
+            # Índices parciales para el expirador y el snapshot de new_quotes.
+            # En motores sin soporte de índices parciales Django los omite.
+            models.Index(fields=['expires_at'], condition=Q(status__in=EXPIRABLE_QUOTE_STATUSES),
+                         name='quote_expirable_expires_idx'),
+            models.Index(fields=['created_at'], condition=Q(status='pending'), name='quote_pending_created_idx'),
         ]
 
     def __str__(self):
         return f"Cotización {self.id} - {self.client}"
 
+    @staticmethod
+    def default_expires_at(now=None):
+        ttl_minutes = getattr(settings, 'DELIVERIES_QUOTE_TTL_MINUTES', 10)
+        return (now or timezone.now()) + timedelta(minutes=ttl_minutes)
+
     def save(self, *args, **kwargs):
         if not self.expires_at:
-            ttl_minutes = getattr(settings, 'DELIVERIES_QUOTE_TTL_MINUTES', 10)
-            self.expires_at = timezone.now() + timedelta(minutes=ttl_minutes)
+            self.expires_at = self.default_expires_at()
         super().save(*args, **kwargs)
 
     def extend_expiration(self, minutes):
@@ -109,22 +144,32 @@ class DeliveryOffer(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
+    objects = ExpiringQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Oferta de Domiciliario"
         verbose_name_plural = "Ofertas de Domiciliario"
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['quote', 'status']),
+            models.Index(fields=['created_at', 'id']),  # Paginación por cursor
+            models.Index(fields=['expires_at'], condition=Q(status='pending'), name='offer_pending_expires_idx'),
         ]
         unique_together = ['delivery_person', 'quote']  # Un domiciliario solo una oferta por cotización
 
     def __str__(self):
         return f"Oferta {self.id} - {self.delivery_person}"
 
+    @staticmethod
+    def default_expires_at(now=None):
+        ttl_minutes = getattr(settings, 'DELIVERIES_OFFER_TTL_MINUTES', 4)
+        return (now or timezone.now()) + timedelta(minutes=ttl_minutes)
+
     def save(self, *args, **kwargs):
         if not self.expires_at:
-            ttl_minutes = getattr(settings, 'DELIVERIES_OFFER_TTL_MINUTES', 4)
-            self.expires_at = timezone.now() + timedelta(minutes=ttl_minutes)
+            self.expires_at = self.default_expires_at()
         super().save(*args, **kwargs)
 
     def extend_expiration(self, minutes):
@@ -151,6 +196,16 @@ class Delivery(models.Model):
         ('paid', 'Pagado'),
         ('cancelled', 'Cancelado'),
     ]
+
+    # Flujo de estados (sin incluir cancelled, que tiene su propio endpoint)
+    STATUS_FLOW = {
+        'assigned': 'picked_up',
+        'picked_up': 'in_transit',
+        'in_transit': 'delivered',
+        'delivered': 'paid',
+        'paid': None,  # Estado final, no hay siguiente
+    }
+    CANCELLABLE_STATUSES = ['assigned', 'picked_up', 'in_transit']
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deliveries')
@@ -176,6 +231,7 @@ class Delivery(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
     history_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)  # ID único para todo el ciclo de vida
+    version = models.PositiveIntegerField(default=0)  # Se incrementa en cada transición de estado
 
     class Meta:
         verbose_name = "Domicilio"
@@ -183,8 +239,11 @@ class Delivery(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status']),
-            models.Index(fields=['client']),
-            models.Index(fields=['delivery_person']),
+            models.Index(fields=['client', 'status', 'created_at']),
+            models.Index(fields=['delivery_person', 'status']),
+            # Paginación por cursor de los listados de cliente y domiciliario
+            models.Index(fields=['client', 'created_at', 'id']),
+            models.Index(fields=['delivery_person', 'created_at', 'id']),
         ]
 
     def __str__(self):
@@ -225,9 +284,80 @@ class DeliveryHistory(models.Model):
         verbose_name_plural = "Historiales de Domicilio"
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['history_id']),
+            models.Index(fields=['history_id', 'created_at']),
             models.Index(fields=['event_type']),
         ]
 
     def __str__(self):
         return f"Historial {self.id} - {self.get_event_type_display()}"
+
+
+class DeliveryQuoteArchive(models.Model):
+    """
+    Archivo de solo inserción para cotizaciones finalizadas (aceptadas, canceladas o expiradas).
+    Conserva solo las columnas útiles para analítica y se agrupa por mes en `bucket`.
+    """
+    OUTCOME_CHOICES = [
+        ('accepted', 'Aceptada'),
+        ('cancelled', 'Cancelada'),
+        ('expired', 'Expirada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, editable=False)  # Mismo id de la cotización original
+    bucket = models.DateField()  # Primer día del mes de creación
+    client_id = models.CharField(max_length=255)
+    category_id = models.UUIDField()
+    vehicle_type_id = models.UUIDField(null=True, blank=True)
+    history_id = models.UUIDField()
+    client_price = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=20)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Cotización Archivada"
+        verbose_name_plural = "Cotizaciones Archivadas"
+        indexes = [
+            models.Index(fields=['bucket', 'outcome']),
+            models.Index(fields=['history_id']),
+        ]
+
+    def __str__(self):
+        return f"Cotización archivada {self.id} - {self.get_outcome_display()}"
+
+
+class DeliveryOfferArchive(models.Model):
+    """
+    Archivo de solo inserción para ofertas de cotizaciones finalizadas u ofertas expiradas.
+    """
+    OUTCOME_CHOICES = [
+        ('accepted', 'Aceptada'),
+        ('rejected', 'Rechazada'),
+        ('expired', 'Expirada'),
+        ('closed', 'Cotización cerrada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, editable=False)  # Mismo id de la oferta original
+    bucket = models.DateField()  # Primer día del mes de creación
+    quote_id = models.UUIDField()
+    delivery_person_id = models.CharField(max_length=255)
+    vehicle_id = models.UUIDField(null=True, blank=True)
+    proposed_price = models.DecimalField(max_digits=10, decimal_places=2)
+    estimated_delivery_time = models.DurationField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Oferta Archivada"
+        verbose_name_plural = "Ofertas Archivadas"
+        indexes = [
+            models.Index(fields=['bucket', 'outcome']),
+            models.Index(fields=['quote_id']),
+        ]
+
+    def __str__(self):
+        return f"Oferta archivada {self.id} - {self.get_outcome_display()}"
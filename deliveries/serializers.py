@@ -1,20 +1,39 @@
 from rest_framework import serializers
+from backend.metrics import TimedRepresentationMixin
 from .models import DeliveryCategory, DeliveryQuote, DeliveryOffer, Delivery, DeliveryHistory
 from users.serializers import UserSerializer
 from users.models import User
 from vehicles.models import VehicleType, Vehicle
+from .services.catalog import CatalogPrimaryKeyRelatedField, CatalogStringField, lookup
 from django.utils import timezone
 
-class DeliveryCategorySerializer(serializers.ModelSerializer):
+class DeliveryCategorySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = DeliveryCategory
         fields = '__all__'
 
 
-class DeliveryQuoteSerializer(serializers.ModelSerializer):
+class QuoteValidationMixin:
+    """Validaciones de cotización compartidas por el alta individual y la carga por lotes"""
+
+    def validate(self, data):
+        """Validación personalizada para la cotización"""
+        if data.get('client_price') <= 0:
+            raise serializers.ValidationError("El precio debe ser mayor a cero")
+        
+        # Validar que pickup y delivery sean direcciones diferentes
+        pickup_address = (data.get('pickup_address') or '').strip()
+        delivery_address = (data.get('delivery_address') or '').strip()
+        if pickup_address and delivery_address and pickup_address == delivery_address:
+            raise serializers.ValidationError("Las direcciones de recogida y entrega deben ser diferentes")
+        
+        return data
+
+
+class DeliveryQuoteSerializer(QuoteValidationMixin, TimedRepresentationMixin, serializers.ModelSerializer):
     """Serializer para cotizaciones de entrega con campos de solo lectura"""
     client = UserSerializer(read_only=True)
-    category = serializers.StringRelatedField(read_only=True)
+    category = CatalogStringField('categories', source='category_id')
 
     
     
@@ -24,7 +43,8 @@ class DeliveryQuoteSerializer(serializers.ModelSerializer):
         source='client', 
         write_only=True
     )
-    category_id = serializers.PrimaryKeyRelatedField(
+    category_id = CatalogPrimaryKeyRelatedField(
+        'categories',
         queryset=DeliveryCategory.objects.all(), 
         source='category', 
         write_only=True
@@ -42,25 +62,28 @@ class DeliveryQuoteSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['status', 'history_id', 'expires_at']
 
-    def validate(self, data):
-        """Validación personalizada para la cotización"""
-        if data.get('client_price') <= 0:
-            raise serializers.ValidationError("El precio debe ser mayor a cero")
-        
-        # Validar que pickup y delivery sean direcciones diferentes
-        pickup_address = (data.get('pickup_address') or '').strip()
-        delivery_address = (data.get('delivery_address') or '').strip()
-        if pickup_address and delivery_address and pickup_address == delivery_address:
-            raise serializers.ValidationError("Las direcciones de recogida y entrega deben ser diferentes")
-        
-        return data
 
+class DeliveryQuoteBatchItemSerializer(QuoteValidationMixin, TimedRepresentationMixin, serializers.ModelSerializer):
+    """Valida una cotización de una carga por lotes sin consultar la base de datos.
+
+    El cliente es siempre el usuario autenticado y `category_id` se recibe como
+    UUID; las categorías se resuelven una sola vez para todo el lote.
+    """
+    category_id = serializers.UUIDField()
+    observations = serializers.ListField(child=serializers.CharField(), required=False, allow_empty=True)
+
+    class Meta:
+        model = DeliveryQuote
+        fields = [
+            'pickup_address', 'delivery_address', 'category_id', 'description', 'observations',
+            'estimated_weight', 'estimated_size', 'client_price', 'payment_method',
+        ]
 
-class DeliverySerializer(serializers.ModelSerializer):
+class DeliverySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Serializer para domicilios permanentes"""
     client = UserSerializer(read_only=True)
     delivery_person = UserSerializer(read_only=True)
-    category = serializers.StringRelatedField(read_only=True)
+    category = CatalogStringField('categories', source='category_id')
     # Tipo de vehículo: nombre del VehicleType (string) desde delivery_person.current_vehicle o quote original
     vehicle_type = serializers.SerializerMethodField(read_only=True)
     
@@ -76,7 +99,8 @@ class DeliverySerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    category_id = serializers.PrimaryKeyRelatedField(
+    category_id = CatalogPrimaryKeyRelatedField(
+        'categories',
         queryset=DeliveryCategory.objects.all(), 
         source='category', 
         write_only=True
@@ -96,11 +120,11 @@ class DeliverySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'client', 'delivery_person', 'pickup_address', 'delivery_address', 'category',
             'description', 'observations', 'estimated_weight', 'estimated_size', 'final_price', 'status',
-            'created_at', 'updated_at', 'completed_at', 'cancelled_at',
+            'created_at', 'updated_at', 'completed_at', 'cancelled_at', 'version',
             'vehicle_type',
             'client_id', 'delivery_person_id', 'category_id', 'vehicle_id'
         ]
-        read_only_fields = ['status', 'created_at', 'updated_at', 'completed_at', 'cancelled_at']
+        read_only_fields = ['status', 'created_at', 'updated_at', 'completed_at', 'cancelled_at', 'version']
 
     def validate(self, data):
         """Validación personalizada para el domicilio"""
@@ -128,7 +152,7 @@ class DeliverySerializer(serializers.ModelSerializer):
             if dp:
                 cv = getattr(dp, 'current_vehicle', None)
                 if cv:
-                    vt = getattr(cv, 'type', None)
+                    vt = lookup('vehicle_types', cv.type_id)
                     if vt:
                         return vt.name
 
@@ -136,7 +160,7 @@ class DeliverySerializer(serializers.ModelSerializer):
             from .models import DeliveryQuote
             quote = DeliveryQuote.objects.filter(history_id=obj.history_id).first()
             if quote:
-                vt = getattr(quote, 'vehicle_type', None)
+                vt = lookup('vehicle_types', quote.vehicle_type_id) if quote.vehicle_type_id else None
                 if vt:
                     return vt.name
 
@@ -145,7 +169,7 @@ class DeliverySerializer(serializers.ModelSerializer):
             return None
 
 
-class DeliveryHistorySerializer(serializers.ModelSerializer):
+class DeliveryHistorySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Serializer para historial de domicilios"""
     quote = DeliveryQuoteSerializer(read_only=True)
     delivery = DeliverySerializer(read_only=True)
@@ -160,7 +184,7 @@ class DeliveryHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class DeliveryOfferSerializer(serializers.ModelSerializer):
+class DeliveryOfferSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Serializer para ofertas de domiciliarios"""
     delivery_person = UserSerializer(read_only=True)
     quote = DeliveryQuoteSerializer(read_only=True)
@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.utils import timezone
+
+from deliveries.models import DeliveryOffer, DeliveryOfferArchive, DeliveryQuote, DeliveryQuoteArchive
+
+
+QUOTE_ARCHIVE_FIELDS = (
+    'id', 'client_id', 'category_id', 'vehicle_type_id', 'history_id',
+    'client_price', 'payment_method', 'created_at', 'expires_at',
+)
+OFFER_ARCHIVE_FIELDS = (
+    'id', 'quote_id', 'delivery_person_id', 'vehicle_id', 'proposed_price',
+    'estimated_delivery_time', 'status', 'created_at', 'expires_at',
+)
+
+
+def _bucket(value):
+    """Primer día del mes (en la zona horaria del proyecto) al que pertenece `value`."""
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def _offer_outcome(status, quote_outcome):
+    if status in ('accepted', 'rejected'):
+        return status
+    return 'expired' if quote_outcome == 'expired' else 'closed'
+
+
+def archive_quotes(quote_ids, outcome):
+    """Mueve cotizaciones y sus ofertas a las tablas de archivo.
+
+    Todo se hace con sentencias por lote dentro de una transacción: una lectura
+    por tabla, un `bulk_create` por tabla de archivo y un DELETE por tabla, en
+    lugar del borrado en cascada fila por fila. Devuelve la cantidad de
+    cotizaciones archivadas.
+    """
+    quote_ids = list(quote_ids)
+    if not quote_ids:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        quote_rows = list(DeliveryQuote.objects.filter(id__in=quote_ids).values(*QUOTE_ARCHIVE_FIELDS))
+        offer_rows = list(DeliveryOffer.objects.filter(quote_id__in=quote_ids).values(*OFFER_ARCHIVE_FIELDS))
+
+        DeliveryQuoteArchive.objects.bulk_create(
+            [
+                DeliveryQuoteArchive(bucket=_bucket(row['created_at']), outcome=outcome, archived_at=now, **row)
+                for row in quote_rows
+            ],
+            ignore_conflicts=True,
+        )
+        _insert_offer_rows(offer_rows, lambda status: _offer_outcome(status, outcome), now)
+
+        DeliveryOffer.objects.filter(quote_id__in=quote_ids).delete()
+        DeliveryQuote.objects.filter(id__in=quote_ids).delete()
+    return len(quote_rows)
+
+
+def archive_offers(offer_ids, outcome):
+    """Mueve ofertas sueltas (p. ej. expiradas) a la tabla de archivo. Devuelve la cantidad archivada."""
+    offer_ids = list(offer_ids)
+    if not offer_ids:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        offer_rows = list(DeliveryOffer.objects.filter(id__in=offer_ids).values(*OFFER_ARCHIVE_FIELDS))
+        _insert_offer_rows(offer_rows, lambda status: outcome, now)
+        DeliveryOffer.objects.filter(id__in=offer_ids).delete()
+    return len(offer_rows)
+
+
+def _insert_offer_rows(offer_rows, outcome_for, now):
+    archived = []
+    for row in offer_rows:
+        status = row.pop('status')
+        archived.append(DeliveryOfferArchive(
+            bucket=_bucket(row['created_at']),
+            outcome=outcome_for(status),
+            archived_at=now,
+            **row
+        ))
+    DeliveryOfferArchive.objects.bulk_create(archived, ignore_conflicts=True)
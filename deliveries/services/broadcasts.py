@@ -0,0 +1,62 @@
+from django.db import transaction
+
+from backend.metrics import broadcast_skipped, timed_render
+from deliveries.services import group_registry
+from deliveries.services.expiration import _broadcast
+
+
+def live_targets(groups, event_type, live=None):
+    """Los grupos de `groups` con suscriptores; los demás cuentan como descartados.
+
+    `live` es el resultado de un `group_registry.live_groups` previo que ya cubre
+    estos grupos: así una operación que emite a varios grupos consulta el
+    registro una sola vez.
+    """
+    groups = [group for group in groups if group]
+    targets = group_registry.live_groups(groups) if live is None else [group for group in groups if group in live]
+    for group in groups:
+        if group not in targets:
+            broadcast_skipped(event_type, group)
+    return targets
+
+
+def broadcast(groups, event_type, data, live=None):
+    """Emitir el evento ya a los grupos con suscriptores.
+
+    `data` puede ser una función que arma el payload: sin grupos vivos no se
+    serializa nada.
+    """
+    targets = live_targets(groups, event_type, live)
+    if not targets:
+        return
+    payload = data() if callable(data) else data
+    with group_registry.assume_live(targets):
+        for group in targets:
+            _broadcast(group, {'type': event_type, 'data': payload})
+
+
+def broadcast_on_commit(groups, event_type, data):
+    """Emitir el evento a cada grupo cuando la transacción actual haga commit.
+
+    Fuera de una transacción `on_commit` ejecuta el envío de inmediato. Dentro de
+    una (p. ej. al aceptar una oferta) evita notificar cambios que luego se revierten.
+
+    `data` puede ser una función que arma el payload: solo se llama si algún
+    grupo tiene suscriptores (`group_registry`). Si alguno los tiene ya al
+    guardar se serializa en ese momento, para que el payload refleje el estado
+    guardado y no uno posterior de la misma transacción.
+    """
+    def send():
+        broadcast(groups, event_type, data)
+
+    if callable(data) and transaction.get_connection().in_atomic_block and group_registry.live_groups(groups):
+        data = data()
+    transaction.on_commit(send)
+
+
+def render(event_type, serializer_class, instance):
+    """Payload perezoso para `broadcast_on_commit`, con su tiempo de render medido."""
+    def build():
+        with timed_render(event_type):
+            return serializer_class(instance).data
+    return build
@@ -0,0 +1,186 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from backend.conditional import etag_matches, make_etag, not_modified, set_validators
+
+
+# Cada proceso guarda en memoria una instantánea del catálogo (categorías y tipos
+# de vehículo) asociada a un token de versión que vive en la caché de Django.
+# Guardar o borrar un elemento del catálogo genera un token nuevo y la siguiente
+# lectura, en cualquier proceso, recarga la instantánea con dos consultas.
+VERSION_KEY = 'deliveries:catalog_version'
+
+_snapshot = None
+_lock = threading.Lock()
+# Token propio del proceso, usado solo si la caché compartida no responde
+_local_version = uuid.uuid4().hex[:12]
+
+
+def catalog_version():
+    """Token de versión actual; si la caché lo perdió se genera uno nuevo."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex[:12], None)
+        version = cache.get(VERSION_KEY)
+    return version if version is not None else _local_version
+
+
+def bump_version():
+    """Invalida la instantánea de todos los procesos.
+
+    Se cambia el token de inmediato (el proceso actual ve sus propios cambios aún
+    dentro de la transacción) y otra vez al hacer commit, para que ningún otro
+    proceso se quede con una recarga hecha antes de que los datos fueran visibles.
+    """
+    global _snapshot, _local_version
+
+    def bump():
+        cache.set(VERSION_KEY, uuid.uuid4().hex[:12], None)
+
+    _snapshot = None
+    _local_version = uuid.uuid4().hex[:12]
+    bump()
+    transaction.on_commit(bump)
+
+
+def _load(version):
+    from deliveries.models import DeliveryCategory
+    from vehicles.models import VehicleType
+
+    return {
+        'version': version,
+        'categories': {category.pk: category for category in DeliveryCategory.objects.all()},
+        'vehicle_types': {
+            vehicle_type.pk: vehicle_type
+            for vehicle_type in VehicleType.objects.prefetch_related('delivery_categories')
+        },
+        'memo': {},
+        'loaded_at': time.monotonic(),
+    }
+
+
+def _outdated(snapshot, version, max_age):
+    if snapshot is None or snapshot['version'] != version:
+        return True
+    return max_age is not None and time.monotonic() - snapshot['loaded_at'] >= max_age
+
+
+def _current(max_age=None):
+    """Instantánea de la versión actual; con `max_age`, además no más vieja que eso."""
+    global _snapshot
+    version = catalog_version()
+    snapshot = _snapshot
+    if _outdated(snapshot, version, max_age):
+        with _lock:
+            snapshot = _snapshot
+            if _outdated(snapshot, version, max_age):
+                snapshot = _snapshot = _load(version)
+    return snapshot
+
+
+def get_catalog(name):
+    """Diccionario pk -> instancia de `categories` o `vehicle_types`.
+
+    Las instancias se comparten entre peticiones: no deben modificarse.
+    """
+    return _current()[name]
+
+
+def lookup(name, pk):
+    """Instancia del catálogo por pk, o None.
+
+    Los cambios llegan por el token de versión. Solo si la caché compartida
+    perdió el cambio un pk nuevo no estaría en la instantánea: ante un fallo se
+    recarga, pero como mucho una vez cada `DELIVERIES_CATALOG_MISS_RELOAD_SECONDS`
+    por versión, para que pks inexistentes no recarguen el catálogo en cada petición.
+    """
+    obj = get_catalog(name).get(pk)
+    if obj is None:
+        obj = _current(max_age=getattr(settings, 'DELIVERIES_CATALOG_MISS_RELOAD_SECONDS', 30))[name].get(pk)
+    return obj
+
+
+def memoized(key, builder):
+    """Resultado de `builder()` cacheado mientras no cambie la versión del catálogo."""
+    memo = _current()['memo']
+    if key not in memo:
+        memo[key] = builder()
+    return memo[key]
+
+
+def catalog_etag(*parts):
+    return make_etag('catalog', catalog_version(), *parts)
+
+
+class CatalogPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """`PrimaryKeyRelatedField` que resuelve el pk contra el catálogo en memoria."""
+
+    def __init__(self, catalog, **kwargs):
+        self.catalog = catalog
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = data if isinstance(data, uuid.UUID) else uuid.UUID(str(data))
+        except (TypeError, ValueError, AttributeError):
+            self.fail('does_not_exist', pk_value=data)
+        obj = lookup(self.catalog, pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class CatalogStringField(serializers.Field):
+    """Campo de solo lectura con `str()` de la instancia del catálogo (p. ej. `source='category_id'`)."""
+
+    def __init__(self, catalog, **kwargs):
+        self.catalog = catalog
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if value is None:
+            return None
+        obj = lookup(self.catalog, value)
+        return str(obj) if obj is not None else None
+
+
+class CatalogViewSetMixin:
+    """`list`/`retrieve` servidos desde el catálogo en memoria, con ETag y 304.
+
+    El ETag es el token de versión del catálogo: un cliente que ya tiene la lista
+    recibe un 304 sin que se toque la base de datos ni se serialice nada.
+    """
+    catalog_name = None
+
+    def list(self, request, *args, **kwargs):
+        etag = catalog_etag(self.catalog_name)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        data = memoized((self.catalog_name, 'list'), lambda: list(
+            self.get_serializer(list(get_catalog(self.catalog_name).values()), many=True).data
+        ))
+        return set_validators(Response(data), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = uuid.UUID(str(kwargs.get(self.lookup_url_kwarg or self.lookup_field)))
+        except ValueError:
+            raise Http404
+        instance = lookup(self.catalog_name, pk)
+        if instance is None:
+            raise Http404
+        etag = catalog_etag(self.catalog_name, pk)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return set_validators(Response(self.get_serializer(instance).data), etag)
@@ -0,0 +1,121 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from deliveries.models import Delivery
+from deliveries.serializers import DeliverySerializer
+from deliveries.services.catalog import catalog_version
+
+
+def _key(delivery_id):
+    """Clave normalizada del registro (el pk puede llegar de la URL con otro formato)."""
+    try:
+        delivery_id = uuid.UUID(str(delivery_id))
+    except ValueError:
+        return None
+    # La versión del catálogo forma parte de la clave porque la representación
+    # incluye el nombre de la categoría y del tipo de vehículo
+    return f'deliveries:detail:{delivery_id}:{catalog_version()}'
+
+
+def _participant_key(user_id):
+    return f'deliveries:participant:{user_id}'
+
+
+def _participant_stamps(client_id, delivery_person_id):
+    """Tokens actuales del cliente y del domiciliario (None si nunca cambiaron)."""
+    keys = [_participant_key(user_id) for user_id in (client_id, delivery_person_id) if user_id]
+    stamps = cache.get_many(keys)
+    return [stamps.get(key) for key in keys]
+
+
+def _ratings(data):
+    users = (data.get('client'), data.get('delivery_person'))
+    return tuple((user['rating_average'], user['rating_count']) if user else None for user in users)
+
+
+def get_record(delivery_id):
+    """Registro cacheado (read-through) de un domicilio, o None si no existe.
+
+    Contiene lo necesario para autorizar y responder sin tocar la base de
+    datos: `client_id`, `delivery_person_id`, `status`, `version`, `history_id`,
+    los `updated_at` del domicilio, de sus participantes y del vehículo actual
+    del domiciliario y las reseñas mostradas de ambos (para el ETag) y `data`
+    (la representación de `DeliverySerializer`).
+
+    La representación incluye al cliente y al domiciliario (con sus reseñas y
+    vehículo), así que el registro guarda los tokens de ambos
+    (`touch_participant`) y se reconstruye si alguno cambió. Los tokens se leen antes que la fila: un cambio que llegue en medio
+    deja el registro con un token viejo y la siguiente lectura lo descarta.
+    """
+    key = _key(delivery_id)
+    if key is None:
+        return None
+    record = cache.get(key)
+    if record is not None:
+        participants = (record['client_id'], record['delivery_person_id'])
+        stamps = _participant_stamps(*participants)
+        if record.get('participant_stamps') == stamps:
+            return record
+    else:
+        participants = Delivery.objects.filter(pk=delivery_id).values_list('client_id', 'delivery_person_id').first()
+        if participants is None:
+            return None
+        stamps = _participant_stamps(*participants)
+    delivery = (
+        Delivery.objects.select_related('client', 'delivery_person__current_vehicle', 'category')
+        .filter(pk=delivery_id).first()
+    )
+    if delivery is None:
+        return None
+    data = DeliverySerializer(delivery).data
+    if (delivery.client_id, delivery.delivery_person_id) != tuple(participants):
+        # Cambió el domiciliario entre las dos lecturas: `invalidate` ya descarta el registro
+        stamps = None
+    record = {
+        'client_id': delivery.client_id,
+        'delivery_person_id': delivery.delivery_person_id,
+        'status': delivery.status,
+        'version': delivery.version,
+        'history_id': delivery.history_id,
+        'updated_at': delivery.updated_at,
+        'client_updated_at': delivery.client.updated_at,
+        'delivery_person_updated_at': getattr(delivery.delivery_person, 'updated_at', None),
+        'vehicle_updated_at': getattr(getattr(delivery.delivery_person, 'current_vehicle', None), 'updated_at', None),
+        # Las reseñas no cambian el `updated_at` del usuario: el ETag usa lo que se muestra
+        'ratings': _ratings(data),
+        'participant_stamps': stamps,
+        'data': data,
+    }
+    cache.set(key, record, getattr(settings, 'DELIVERIES_DETAIL_CACHE_TIMEOUT', 60))
+    return record
+
+
+def invalidate(delivery_id):
+    """Descarta el registro ahora y otra vez al hacer commit.
+
+    El segundo borrado evita que otra petición que leyó la fila antes del
+    commit deje en caché la versión anterior.
+    """
+    def delete():
+        key = _key(delivery_id)
+        if key is not None:
+            cache.delete(key)
+
+    delete()
+    transaction.on_commit(delete)
+
+
+def touch_participant(user_id):
+    """Descarta los registros de los domicilios donde participa `user_id`.
+
+    Se cambia su token ahora y otra vez al hacer commit, por la misma razón que
+    en `invalidate`.
+    """
+    def touch():
+        cache.set(_participant_key(user_id), uuid.uuid4().hex[:12], None)
+
+    touch()
+    transaction.on_commit(touch)
@@ -1,32 +1,83 @@
+import json
+import time
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.conf import settings
 from django.utils import timezone
 
-from deliveries.models import DeliveryOffer, DeliveryQuote
+from backend.metrics import (
+    broadcast_event, broadcast_failed, broadcast_skipped, observe_broadcast, record_broadcast,
+)
+from deliveries.models import EXPIRABLE_QUOTE_STATUSES, DeliveryOffer, DeliveryQuote
 from deliveries.serializers import DeliveryOfferSerializer, DeliveryQuoteSerializer
+from deliveries.services import group_registry
+from deliveries.services.archive import archive_offers, archive_quotes
 
 
 def _broadcast(group_name, payload):
+    """Envía `payload` al grupo, salvo que el registro de grupos lo sepa vacío."""
     channel_layer = get_channel_layer()
     if not channel_layer or not group_name:
         return
 
-
-    import json
+    event = broadcast_event(payload)
+    if not group_registry.is_live(group_name):
+        broadcast_skipped(event, group_name)
+        return
+    start = time.perf_counter()
     try:
-        safe_payload = json.loads(json.dumps(payload, default=str))
+        encoded = json.dumps(payload, default=str)
+        safe_payload = json.loads(encoded)
     except Exception:
+        broadcast_failed(event, group_name, 'serialize')
         try:
-            safe_payload = str(payload)
+            safe_payload = encoded = str(payload)
         except Exception:
-            safe_payload = {}
+            safe_payload, encoded = {}, '{}'
+    size = len(encoded.encode())
+    serialized = time.perf_counter()
+
+    record_broadcast(size)
+
+    try:
+        # `ts` permite al consumidor medir su atraso (backend.backpressure)
+        async_to_sync(channel_layer.group_send)(group_name, {'type': 'broadcast', 'data': safe_payload})
+    except Exception:
+        broadcast_failed(event, group_name, 'send')
+        raise
+    observe_broadcast(event, group_name, size, serialized - start, time.perf_counter() - serialized)
 
-    async_to_sync(channel_layer.group_send)(group_name, {'type': 'broadcast', 'data': safe_payload})
+
+def _live_events(event_type, serializer_class, instances, groups_for):
+    """[(grupos, evento)] de las instancias con algún grupo suscrito.
+
+    Una sola consulta al registro de grupos por lote; las instancias sin
+    suscriptores (la mayoría de los `quote_<id>` que expiran) no se serializan.
+    """
+    groups = {instance.pk: groups_for(instance) for instance in instances}
+    live = set(group_registry.live_groups([group for names in groups.values() for group in names]))
+    events = []
+    for instance in instances:
+        targets = [group for group in groups[instance.pk] if group in live]
+        for group in groups[instance.pk]:
+            if group not in live:
+                broadcast_skipped(event_type, group)
+        if targets:
+            events.append((targets, {'type': event_type, 'data': serializer_class(instance).data}))
+    return events
+
+
+def _send_events(events):
+    with group_registry.assume_live({group for targets, _ in events for group in targets}):
+        for targets, event in events:
+            for group in targets:
+                _broadcast(group, event)
 
 
 def expire_quotes_and_offers():
-    """Elimina cotizaciones y ofertas pendientes que hayan superado su fecha de expiración.
-    También limpia quotes aceptadas (ya convertidas en Delivery) para evitar huérfanos."""
+    """Archiva cotizaciones y ofertas pendientes que hayan superado su fecha de expiración.
+    También archiva quotes aceptadas (ya convertidas en Delivery) para evitar huérfanos."""
     expired_quotes = _collect_expired_quotes()
     accepted_quotes = _cleanup_accepted_quotes()
     expired_offers = _collect_expired_offers()
@@ -34,46 +85,58 @@ def expire_quotes_and_offers():
 
 
 def _cleanup_accepted_quotes():
-    """Elimina quotes con status 'accepted' ya que ya generaron un Delivery permanente."""
+    """Archiva quotes con status 'accepted' ya que ya generaron un Delivery permanente."""
     queryset = DeliveryQuote.objects.filter(status='accepted')
-    count = queryset.count()
-    if count:
-        queryset.delete()  # CASCADE eliminará también las ofertas relacionadas
+    count = 0
+    while True:
+        quote_ids = list(queryset.values_list('id', flat=True)[:_batch_size()])
+        if not quote_ids:
+            break
+        count += archive_quotes(quote_ids, 'accepted')
     return count
 
 
+def _batch_size():
+    return getattr(settings, 'DELIVERIES_EXPIRER_BATCH_SIZE', 500)
+
+
 def _collect_expired_quotes():
+    # Las lecturas ya filtran con `.live()`, así que el barrido puede correr con
+    # poca frecuencia y procesar lotes grandes sin afectar la corrección.
     now = timezone.now()
-    queryset = DeliveryQuote.objects.filter(status__in=['pending', 'cancelled'], expires_at__isnull=False, expires_at__lte=now)
-
-    payloads = []
-    for quote in queryset:
-        payloads.append((quote.id, quote.client_id, DeliveryQuoteSerializer(quote).data))
-
-    count = queryset.count()
-    if count:
-        queryset.delete()
-        for quote_id, client_id, payload in payloads:
-            event = {'type': 'quote_expired', 'data': payload}
-            _broadcast('new_quotes', event)
-            _broadcast(f'quote_{quote_id}', event)
-            _broadcast(f'user_quotes_{client_id}', event)
+    queryset = DeliveryQuote.objects.expired(now).filter(status__in=EXPIRABLE_QUOTE_STATUSES)
+
+    count = 0
+    while True:
+        batch = list(queryset.order_by('expires_at')[:_batch_size()])
+        if not batch:
+            break
+
+        events = _live_events(
+            'quote_expired', DeliveryQuoteSerializer, batch,
+            lambda quote: ['new_quotes', f'quote_{quote.id}', f'user_quotes_{quote.client_id}'],
+        )
+        archive_quotes([quote.id for quote in batch], 'expired')
+        count += len(batch)
+        _send_events(events)
     return count
 
 
 def _collect_expired_offers():
     now = timezone.now()
-    queryset = DeliveryOffer.objects.filter(status='pending', expires_at__isnull=False, expires_at__lte=now)
-
-    payloads = []
-    for offer in queryset.select_related('quote'):
-        payloads.append((offer.quote_id, offer.quote.client_id, DeliveryOfferSerializer(offer).data))
-
-    count = queryset.count()
-    if count:
-        queryset.delete()
-        for quote_id, client_id, payload in payloads:
-            event = {'type': 'offer_expired', 'data': payload}
-            _broadcast(f'quote_{quote_id}', event)
-            _broadcast(f'user_quotes_{client_id}', event)
+    queryset = DeliveryOffer.objects.expired(now).filter(status='pending')
+
+    count = 0
+    while True:
+        batch = list(queryset.select_related('quote').order_by('expires_at')[:_batch_size()])
+        if not batch:
+            break
+
+        events = _live_events(
+            'offer_expired', DeliveryOfferSerializer, batch,
+            lambda offer: [f'quote_{offer.quote_id}', f'user_quotes_{offer.quote.client_id}'],
+        )
+        archive_offers([offer.id for offer in batch], 'expired')
+        count += len(batch)
+        _send_events(events)
     return count
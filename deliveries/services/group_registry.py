@@ -0,0 +1,206 @@
+"""Registro de suscriptores vivos por grupo de Channels, compartido entre workers.
+
+Muchos broadcasts van a grupos sin nadie escuchando (`quote_<id>` cuando el
+cliente ya salió de la pantalla, `driver_offers_<id>`, que ninguna ruta
+suscribe, `delivery_<id>` de domicilios terminados). Con este registro el
+publicador los descarta antes de serializar y de hacer `group_send`.
+
+Cada proceso lleva la cuenta local de sockets por grupo (`join`/`leave` desde el
+connect y el disconnect del consumidor) y la vuelca en la caché compartida en
+claves por época de `DELIVERIES_GROUP_HEARTBEAT_SECONDS`:
+`deliveries:ws_group:<grupo>:<época>`. Un hilo de latido repite el volcado al
+inicio de cada media época (alineado al reloj, no a lo que tardó el volcado
+anterior) y lo envía en un solo pipeline, así que un worker que muere deja de
+contar como mucho dos épocas después sin que nadie tenga que limpiar. Un grupo
+está vivo si tiene sockets en este proceso o si su clave de la época actual o de
+la anterior es positiva: un latido que llega tarde dentro de la época nunca hace
+que un grupo con suscriptores parezca vacío.
+
+Ante la duda se envía: si ningún worker ha latido en las dos últimas épocas (la
+caché se vació, Redis no responde o todavía no hay consumidores) todos los
+grupos se consideran vivos.
+"""
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'deliveries:ws_group'
+MARKER_PREFIX = 'deliveries:ws_group_registry'
+# Margen tras el inicio de cada media época antes de latir
+BEAT_OFFSET = 0.05
+
+_lock = threading.Lock()
+_local = Counter()
+_written = {}  # grupo -> época en la que este proceso ya volcó su cuenta
+_heartbeat_thread = None
+_clock = time.time
+_assumed_live = contextvars.ContextVar('deliveries_group_registry_assumed_live', default=frozenset())
+
+
+def enabled():
+    return getattr(settings, 'DELIVERIES_GROUP_REGISTRY_ENABLED', True)
+
+
+def _period():
+    return getattr(settings, 'DELIVERIES_GROUP_HEARTBEAT_SECONDS', 30)
+
+
+def _epoch(now=None):
+    return int((_clock() if now is None else now) // _period())
+
+
+def _key(group_name, epoch):
+    return f'{KEY_PREFIX}:{group_name}:{epoch}'
+
+
+def _add(key, delta):
+    """Suma `delta` a la clave (creándola con la expiración de tres épocas)."""
+    if not cache.add(key, delta, _period() * 3):
+        cache.incr(key, delta)
+
+
+def _safe(action, *args):
+    # Un fallo de la caché nunca debe impedir conectar: a lo sumo el grupo se
+    # considera vivo (ver `live_groups`)
+    try:
+        action(*args)
+    except Exception:
+        logger.warning('Registro de grupos no disponible', exc_info=True)
+
+
+def _write(group_name, delta):
+    """Vuelca en la época actual la cuenta local (la primera vez) o el cambio."""
+    epoch = _epoch()
+    with _lock:
+        if _written.get(group_name) != epoch:
+            delta = _local[group_name]
+            _written[group_name] = epoch
+        if not delta:
+            return
+    _safe(_add, _key(group_name, epoch), delta)
+
+
+def join(group_name):
+    if not enabled():
+        return
+    with _lock:
+        _local[group_name] += 1
+    _write(group_name, 1)
+    _ensure_heartbeat()
+
+
+def leave(group_name):
+    if not enabled():
+        return
+    with _lock:
+        _local[group_name] -= 1
+        if _local[group_name] <= 0:
+            del _local[group_name]
+    _write(group_name, -1)
+
+
+def _add_many(deltas):
+    incr_many = getattr(cache, 'incr_many', None)
+    if incr_many is None:
+        for key, delta in deltas.items():
+            _add(key, delta)
+    else:
+        incr_many(deltas, _period() * 3)
+
+
+def heartbeat():
+    """Vuelca las cuentas locales que aún no están en la época actual y marca el latido."""
+    epoch = _epoch()
+    with _lock:
+        pending = {name: count for name, count in _local.items() if count > 0 and _written.get(name) != epoch}
+        for name in pending:
+            _written[name] = epoch
+        for name in list(_written):
+            if name not in _local:
+                del _written[name]
+    if pending:
+        _safe(_add_many, {_key(name, epoch): count for name, count in pending.items()})
+    _safe(cache.set, f'{MARKER_PREFIX}:{epoch}', 1, _period() * 3)
+
+
+def _until_next_beat(now=None):
+    """Segundos hasta el próximo inicio de media época (más `BEAT_OFFSET`)."""
+    half = max(_period() / 2, 0.1)
+    now = _clock() if now is None else now
+    return half - now % half + BEAT_OFFSET
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(_until_next_beat())
+        heartbeat()
+
+
+def _ensure_heartbeat():
+    global _heartbeat_thread
+    if _heartbeat_thread is not None:
+        return
+    with _lock:
+        if _heartbeat_thread is not None:
+            return
+        _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name='group-registry-heartbeat', daemon=True)
+        _heartbeat_thread.start()
+    heartbeat()
+
+
+def live_groups(group_names):
+    """Subconjunto (en el mismo orden) de `group_names` con suscriptores vivos."""
+    group_names = [name for name in group_names if name]
+    if not enabled() or not group_names:
+        return group_names
+    assumed = _assumed_live.get()
+    with _lock:
+        remote = [name for name in group_names if not _local.get(name) and name not in assumed]
+    if not remote:
+        return group_names
+
+    epoch = _epoch()
+    keys = [f'{MARKER_PREFIX}:{epoch}', f'{MARKER_PREFIX}:{epoch - 1}']
+    for name in remote:
+        keys.append(_key(name, epoch))
+        keys.append(_key(name, epoch - 1))
+    try:
+        values = cache.get_many(keys)
+    except Exception:
+        logger.warning('Registro de grupos no disponible', exc_info=True)
+        return group_names
+    if not values.get(keys[0]) and not values.get(keys[1]):
+        return group_names
+
+    def live(name):
+        if name not in remote:
+            return True
+        # Ante la duda se envía: cuenta también la época anterior
+        return (values.get(_key(name, epoch)) or 0) > 0 or (values.get(_key(name, epoch - 1)) or 0) > 0
+    return [name for name in group_names if live(name)]
+
+
+def is_live(group_name):
+    return bool(live_groups([group_name]))
+
+
+@contextlib.contextmanager
+def assume_live(group_names):
+    """Dentro del bloque, `group_names` cuentan como vivos sin consultar la caché.
+
+    Para no repetir la consulta cuando el llamador ya filtró los grupos.
+    """
+    token = _assumed_live.set(_assumed_live.get() | frozenset(group_names))
+    try:
+        yield
+    finally:
+        _assumed_live.reset(token)
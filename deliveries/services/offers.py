@@ -0,0 +1,63 @@
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from deliveries.models import DeliveryHistory, DeliveryOffer
+from deliveries.serializers import DeliveryOfferSerializer
+from deliveries.services.broadcasts import broadcast_on_commit, render
+
+
+# `expires_at` también: volver a pujar renueva la vigencia, aunque la oferta ya
+# hubiera vencido sin que el barrido la archivara
+UPSERT_UPDATE_FIELDS = ['proposed_price', 'estimated_delivery_time', 'vehicle', 'expires_at', 'updated_at']
+
+
+def upsert_offer(quote, delivery_person, proposed_price, estimated_delivery_time=None, vehicle=None):
+    """Crea o actualiza la oferta de `delivery_person` sobre `quote` con una sola sentencia.
+
+    Usa `INSERT ... ON CONFLICT (delivery_person_id, quote_id) DO UPDATE` sobre la
+    restricción única, así dos pujas simultáneas del mismo domiciliario no chocan
+    con `IntegrityError`. El id generado solo sobrevive si la fila se insertó, lo
+    que permite distinguir la creación para registrar el historial en la misma
+    transacción. Devuelve (oferta, creada).
+    """
+    now = timezone.now()
+    candidate = DeliveryOffer(
+        id=uuid.uuid4(),
+        quote=quote,
+        delivery_person=delivery_person,
+        proposed_price=proposed_price,
+        estimated_delivery_time=estimated_delivery_time,
+        vehicle=vehicle if vehicle is not None else delivery_person.current_vehicle,
+        expires_at=DeliveryOffer.default_expires_at(now),
+    )
+
+    with transaction.atomic():
+        DeliveryOffer.objects.bulk_create(
+            [candidate],
+            update_conflicts=True,
+            unique_fields=['delivery_person', 'quote'],
+            update_fields=UPSERT_UPDATE_FIELDS,
+        )
+        offer = (
+            DeliveryOffer.objects.select_related('quote', 'delivery_person', 'vehicle')
+            .get(quote=quote, delivery_person=delivery_person)
+        )
+        created = offer.id == candidate.id
+        if created:
+            DeliveryHistory.objects.create(
+                history_id=quote.history_id,
+                event_type='offer_made',
+                description='Nueva oferta creada por domiciliario',
+                changed_by=delivery_person
+            )
+
+        # bulk_create no dispara post_save: emitir aquí lo que emitiría la señal
+        event_type = 'offer_made' if created else 'offer_updated'
+        broadcast_on_commit(
+            [f'quote_{quote.id}', f'user_quotes_{quote.client_id}'],
+            event_type,
+            render(event_type, DeliveryOfferSerializer, offer),
+        )
+    return offer, created
@@ -0,0 +1,77 @@
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from deliveries.models import (
+    EXPIRABLE_QUOTE_STATUSES, Delivery, DeliveryHistory, DeliveryOffer, DeliveryQuote,
+)
+
+
+IN_PROGRESS_STATUSES = ['assigned', 'picked_up', 'in_transit']
+
+# Marcadores que indican, por motor, que el plan usa un índice sobre la tabla
+INDEX_MARKERS = {
+    'sqlite': ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY'),
+    'postgresql': ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan'),
+}
+
+
+def hot_queries(user_id='user_explain', object_id=None, now=None):
+    """Consultas calientes de la app con parámetros de ejemplo, en el mismo orden del reporte.
+
+    Cada entrada es (nombre, origen en el código, queryset).
+    """
+    object_id = object_id or uuid.uuid4()
+    now = now or timezone.now()
+    return [
+        ('expirer_quotes', 'services/expiration.py:_collect_expired_quotes',
+         DeliveryQuote.objects.expired(now).filter(status__in=EXPIRABLE_QUOTE_STATUSES).order_by('expires_at')),
+        ('expirer_offers', 'services/expiration.py:_collect_expired_offers',
+         DeliveryOffer.objects.expired(now).filter(status='pending').order_by('expires_at')),
+        ('new_quotes_snapshot', 'consumers.py:new_quotes',
+         DeliveryQuote.objects.live(now).filter(status='pending')),
+        ('user_quotes', 'consumers.py:user_quotes',
+         DeliveryQuote.objects.live(now).filter(client_id=user_id).order_by('-created_at')),
+        ('user_quotes_pending', 'api.py:DeliveryQuoteViewSet',
+         DeliveryQuote.objects.filter(client_id=user_id, status='pending').order_by('-created_at')),
+        ('user_deliveries', 'consumers.py:user_deliveries',
+         Delivery.objects.filter(client_id=user_id, status__in=IN_PROGRESS_STATUSES)),
+        ('user_deliveries_by_status', 'api.py:DeliveryViewSet.get_queryset',
+         Delivery.objects.filter(client_id=user_id, status='delivered').order_by('-created_at')),
+        ('driver_deliveries', 'consumers.py:driver_deliveries',
+         Delivery.objects.filter(delivery_person_id=user_id, status__in=IN_PROGRESS_STATUSES)),
+        ('person_stats', 'consumers.py:person_stats',
+         Delivery.objects.filter(delivery_person_id=user_id, status__in=['delivered', 'paid'])),
+        ('quote_offers', 'api.py:DeliveryQuoteViewSet.offers',
+         DeliveryOffer.objects.live(now).filter(quote_id=object_id, status='pending')),
+        ('monthly_earnings', 'api.py:DeliveryViewSet._date_range',
+         Delivery.objects.filter(delivery_person_id=user_id, created_at__gte=now - timedelta(days=31),
+                                 created_at__lt=now).order_by('-created_at', '-id')),
+        ('delivery_history', 'api.py:DeliveryViewSet.history',
+         DeliveryHistory.objects.filter(history_id=object_id).order_by('created_at')),
+    ]
+
+
+def uses_index(plan, vendor=None):
+    vendor = vendor or connection.vendor
+    return any(marker in plan for marker in INDEX_MARKERS.get(vendor, ()))
+
+
+def explain_hot_queries(**kwargs):
+    """Devuelve [(nombre, origen, plan, usa_indice)] para el motor de la conexión actual.
+
+    En PostgreSQL se desactiva `enable_seqscan` dentro de una transacción: con
+    tablas pequeñas el planificador prefiere un Seq Scan aunque exista un
+    índice adecuado, y lo que se quiere demostrar es que el índice es utilizable.
+    """
+    results = []
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, origin, queryset in hot_queries(**kwargs):
+            plan = queryset.explain()
+            results.append((name, origin, plan, uses_index(plan)))
+    return results
@@ -0,0 +1,90 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from deliveries.models import DeliveryQuote
+from deliveries.serializers import DeliveryQuoteBatchItemSerializer, DeliveryQuoteSerializer
+from deliveries.services.catalog import lookup
+from deliveries.services.expiration import _broadcast
+
+
+# Errores reportados como máximo antes de dejar de validar el resto de la carga
+MAX_REPORTED_ERRORS = 50
+
+
+class QuoteIngestError(Exception):
+    """La carga tiene filas inválidas; no se creó ninguna cotización."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest_quotes(client, rows, batch_size=None, max_items=None):
+    """Crea las cotizaciones de `rows` (iterable de dicts) para `client` en una transacción.
+
+    Las filas se consumen por lotes de `batch_size`: cada lote se valida sin
+    consultas por fila, las categorías se resuelven contra el catálogo en memoria
+    (`services.catalog`) y las cotizaciones se insertan con `bulk_create` (que no
+    dispara `post_save`). Al hacer commit se publica un único evento
+    `quotes_created`. Si alguna fila es inválida se lanza `QuoteIngestError` con
+    los errores por índice y no se crea nada.
+    """
+    batch_size = batch_size or getattr(settings, 'DELIVERIES_QUOTE_INGEST_BATCH_SIZE', 500)
+    max_items = max_items or getattr(settings, 'DELIVERIES_QUOTE_INGEST_MAX_ITEMS', 5000)
+    now = timezone.now()
+    expires_at = DeliveryQuote.default_expires_at(now)
+    created = []
+    errors = {}
+    index = 0
+
+    with transaction.atomic():
+        for chunk in _chunks(rows, batch_size):
+            validated = []
+            for row in chunk:
+                if index >= max_items:
+                    errors['detail'] = f'Se permiten como máximo {max_items} cotizaciones por carga'
+                    break
+                serializer = DeliveryQuoteBatchItemSerializer(data=row)
+                if serializer.is_valid():
+                    validated.append((index, serializer.validated_data))
+                else:
+                    errors[index] = serializer.errors
+                index += 1
+            if 'detail' in errors or len(errors) >= MAX_REPORTED_ERRORS:
+                break
+
+            quotes = []
+            for row_index, data in validated:
+                category = lookup('categories', data.pop('category_id'))
+                if category is None:
+                    errors[row_index] = {'category_id': ['Categoría no encontrada']}
+                    continue
+                quotes.append(DeliveryQuote(client=client, category=category, expires_at=expires_at, **data))
+            if errors:
+                # Seguir validando para reportar todo, pero sin insertar nada más
+                continue
+            created.extend(DeliveryQuote.objects.bulk_create(quotes))
+
+        if errors:
+            raise QuoteIngestError(errors)
+
+        if created:
+            payload = {'type': 'quotes_created', 'data': DeliveryQuoteSerializer(created, many=True).data}
+
+            def send():
+                for group in ('new_quotes', f'user_quotes_{client.pk}'):
+                    _broadcast(group, payload)
+            transaction.on_commit(send)
+    return created
@@ -0,0 +1,304 @@
+import contextlib
+import hashlib
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from deliveries.models import (
+    Delivery, DeliveryCategory, DeliveryHistory, DeliveryOffer, DeliveryQuote,
+)
+from users.models import User, UserRating
+from vehicles.models import Vehicle, VehicleType
+
+
+# Mezcla de estados finales de los domicilios históricos (más de un día de antigüedad)
+FINAL_STATUS_WEIGHTS = (('paid', 80), ('delivered', 6), ('cancelled', 14))
+# Mezcla de estados de los domicilios del último día
+RECENT_STATUS_WEIGHTS = (
+    ('assigned', 15), ('picked_up', 10), ('in_transit', 15), ('delivered', 20), ('paid', 30), ('cancelled', 10),
+)
+# Estado desde el que se canceló un domicilio cancelado
+CANCELLED_FROM_WEIGHTS = (('assigned', 60), ('picked_up', 25), ('in_transit', 15))
+
+STREETS = ('Calle', 'Carrera', 'Avenida', 'Transversal', 'Diagonal')
+BRANDS = (('Yamaha', 'NMAX'), ('Honda', 'CB 125'), ('AKT', 'NKD'), ('Chevrolet', 'Spark'), ('Renault', 'Kwid'))
+COLORS = ('Rojo', 'Negro', 'Blanco', 'Azul', 'Gris')
+
+
+@dataclass
+class SeedOptions:
+    clients: int = 1000
+    drivers: int = 200
+    pending_quotes: int = 500
+    offers_per_quote: int = 3
+    ratings_per_driver: int = 5
+    deliveries: int = 10000
+    years: float = 2.0
+    with_history: bool = True
+    seed: int = 42
+    prefix: str = 'seed'
+    chunk_size: int = 5000
+    until: datetime = None
+
+
+@dataclass
+class SeedResult:
+    counts: dict = field(default_factory=dict)
+    client_ids: list = field(default_factory=list)
+    driver_ids: list = field(default_factory=list)
+
+
+@contextlib.contextmanager
+def without_auto_now(model, *field_names):
+    """Permite fijar `created_at`/`updated_at` históricos en `bulk_create`."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _plate_tag(prefix):
+    # Del prefijo completo: dos prefijos con el mismo comienzo no comparten placas ni VIN
+    return hashlib.sha1(prefix.encode()).hexdigest()[:6].upper()
+
+
+class _Generator:
+    """Genera las filas a partir de un `random.Random` con semilla fija."""
+
+    def __init__(self, options, categories, vehicle_types):
+        self.options = options
+        self.rng = random.Random(f'{options.prefix}:{options.seed}')
+        self.plate_tag = _plate_tag(options.prefix)
+        self.categories = categories
+        self.vehicle_types = vehicle_types
+        until = options.until or datetime.combine(timezone.now().date(), time.min, tzinfo=dt_timezone.utc)
+        self.until = until
+        self.since = until - timedelta(days=365 * options.years)
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def choice_weighted(self, weights):
+        return self.rng.choices([value for value, _ in weights], [weight for _, weight in weights])[0]
+
+    def address(self):
+        return f'{self.rng.choice(STREETS)} {self.rng.randint(1, 200)} # {self.rng.randint(1, 99)}-{self.rng.randint(1, 99)}'
+
+    def price(self):
+        return Decimal(self.rng.randrange(5000, 60000, 500))
+
+    def users(self, role, count):
+        kind = 'client' if role == 'client' else 'driver'
+        for i in range(count):
+            yield User(
+                userid=f'{self.options.prefix}_{kind}_{i:07d}',
+                role=role,
+                first_name=f'{kind.capitalize()} {i}',
+                username=f'{self.options.prefix}_{kind}_{i:07d}',
+                is_online=role == 'delivery' and self.rng.random() < 0.3,
+                is_available=role == 'delivery' and self.rng.random() < 0.2,
+            )
+
+    def vehicle(self, driver_id, index):
+        brand, model = self.rng.choice(BRANDS)
+        return Vehicle(
+            vehicleId=self.uuid(),
+            userId_id=driver_id,
+            type=self.rng.choice(self.vehicle_types),
+            brand=brand,
+            model=model,
+            year=self.rng.randint(2010, self.until.year),
+            licensePlate=f'{self.plate_tag}{index:07d}',
+            vin=f'{self.plate_tag}{index:011d}',
+            color=self.rng.choice(COLORS),
+            isVerified=True,
+        )
+
+    def created_at(self):
+        span = (self.until - self.since).total_seconds()
+        return self.since + timedelta(seconds=self.rng.random() * span)
+
+    def delivery(self, client_id, driver_id, vehicle_id):
+        created = self.created_at()
+        recent = self.until - created < timedelta(days=1)
+        status = self.choice_weighted(RECENT_STATUS_WEIGHTS if recent else FINAL_STATUS_WEIGHTS)
+        path = ['assigned']
+        cancelled_from = None
+        if status == 'cancelled':
+            cancelled_from = self.choice_weighted(CANCELLED_FROM_WEIGHTS)
+            target = cancelled_from
+        else:
+            target = status
+        while path[-1] != target:
+            path.append(Delivery.STATUS_FLOW[path[-1]])
+
+        # Cada transición ocurre entre 3 y 25 minutos después de la anterior
+        moments = [created]
+        for _ in range(len(path) - 1 + (1 if cancelled_from else 0)):
+            moments.append(moments[-1] + timedelta(minutes=self.rng.randint(3, 25)))
+
+        delivery = Delivery(
+            id=self.uuid(),
+            client_id=client_id,
+            delivery_person_id=driver_id,
+            vehicle_id=vehicle_id,
+            pickup_address=self.address(),
+            delivery_address=self.address(),
+            category=self.rng.choice(self.categories),
+            final_price=self.price(),
+            status=status,
+            created_at=created,
+            updated_at=moments[-1],
+            completed_at=moments[path.index('delivered')] if 'delivered' in path and status != 'cancelled' else None,
+            cancelled_at=moments[-1] if cancelled_from else None,
+            history_id=self.uuid(),
+            version=len(moments) - 1,
+        )
+        return delivery, path, moments, cancelled_from
+
+    def history(self, delivery, path, moments, cancelled_from):
+        client_id, driver_id = delivery.client_id, delivery.delivery_person_id
+        before = delivery.created_at - timedelta(minutes=self.rng.randint(1, 5))
+        rows = [
+            (before - timedelta(minutes=1), 'quote_created', 'Cotización creada', client_id),
+            (before, 'offer_made', 'Oferta realizada', driver_id),
+            (delivery.created_at, 'offer_accepted', 'Oferta aceptada', client_id),
+        ]
+        for previous, current, moment in zip(path, path[1:], moments[1:]):
+            rows.append((moment, 'status_changed', f'Estado cambiado de {previous} a {current}', driver_id))
+        if cancelled_from:
+            rows.append((moments[-1], 'cancelled', f'Domicilio cancelado desde {cancelled_from}', client_id))
+        elif 'delivered' in path:
+            rows.append((delivery.completed_at, 'completed', 'Domicilio completado', driver_id))
+        for created, event_type, description, changed_by in rows:
+            yield DeliveryHistory(
+                id=self.uuid(),
+                history_id=delivery.history_id,
+                event_type=event_type,
+                description=description,
+                changed_by_id=changed_by,
+                created_at=created,
+            )
+
+
+def _ensure_catalog():
+    """Categorías y tipos de vehículo de los comandos de catálogo (idempotente)."""
+    if not DeliveryCategory.objects.exists():
+        call_command('create_delivery_categories', stdout=StringIO())
+    if not VehicleType.objects.exists():
+        call_command('create_vehicle_types', stdout=StringIO())
+    return list(DeliveryCategory.objects.order_by('name')), list(VehicleType.objects.order_by('name'))
+
+
+def seed_marketplace(options, progress=None):
+    """Siembra un marketplace sintético y determinista (misma semilla y prefijo, mismos datos).
+
+    Usa `bulk_create` por lotes, así que no se disparan señales: no hay broadcasts
+    ni invalidaciones de caché. Las cotizaciones y ofertas pendientes vencen
+    relativas a la hora actual para que sigan vivas; el resto de fechas se
+    reparten en los `years` años anteriores a `until` (por defecto, hoy 00:00 UTC).
+    """
+    categories, vehicle_types = _ensure_catalog()
+    gen = _Generator(options, categories, vehicle_types)
+    rng = gen.rng
+    chunk = options.chunk_size
+    result = SeedResult()
+
+    def insert(model, rows):
+        model.objects.bulk_create(rows, batch_size=chunk)
+        result.counts[model._meta.model_name] = result.counts.get(model._meta.model_name, 0) + len(rows)
+        if progress:
+            progress(model, result.counts[model._meta.model_name])
+
+    with transaction.atomic():
+        clients = list(gen.users('client', options.clients))
+        insert(User, clients)
+        result.client_ids = [client.pk for client in clients]
+        del clients
+
+        drivers = list(gen.users('delivery', options.drivers))
+        vehicles = [gen.vehicle(driver.pk, i) for i, driver in enumerate(drivers)]
+        for driver, vehicle in zip(drivers, vehicles):
+            # La FK es diferida (se valida al hacer commit): el vehículo se inserta después
+            driver.current_vehicle_id = vehicle.pk
+        insert(User, drivers)
+        insert(Vehicle, vehicles)
+        result.driver_ids = [driver.pk for driver in drivers]
+        vehicle_by_driver = {vehicle.userId_id: vehicle.pk for vehicle in vehicles}
+        if not result.client_ids or not result.driver_ids:
+            return result
+
+        with without_auto_now(UserRating, 'created_at'):
+            insert(UserRating, [
+                UserRating(
+                    id=gen.uuid(),
+                    ratee_id=driver_id,
+                    rater_id=rng.choice(result.client_ids),
+                    rating=rng.choices(range(11), weights=(1, 0, 0, 1, 1, 2, 4, 8, 14, 20, 25))[0],
+                    created_at=gen.created_at(),
+                )
+                for driver_id in result.driver_ids
+                for _ in range(options.ratings_per_driver)
+            ])
+
+        now = timezone.now()
+        quotes, offers = [], []
+        for _ in range(options.pending_quotes):
+            quote = DeliveryQuote(
+                id=gen.uuid(),
+                client_id=rng.choice(result.client_ids),
+                pickup_address=gen.address(),
+                delivery_address=gen.address(),
+                category=rng.choice(categories),
+                vehicle_type=rng.choice(vehicle_types),
+                client_price=gen.price(),
+                payment_method=rng.choice(('efectivo', 'nequi')),
+                expires_at=DeliveryQuote.default_expires_at(now),
+                history_id=gen.uuid(),
+            )
+            quotes.append(quote)
+            bidders = rng.sample(result.driver_ids, min(len(result.driver_ids), rng.randint(0, options.offers_per_quote)))
+            for driver_id in bidders:
+                offers.append(DeliveryOffer(
+                    id=gen.uuid(),
+                    delivery_person_id=driver_id,
+                    quote_id=quote.id,
+                    proposed_price=quote.client_price + rng.randrange(0, 5000, 500),
+                    estimated_delivery_time=timedelta(minutes=rng.randint(10, 60)),
+                    vehicle_id=vehicle_by_driver[driver_id],
+                    expires_at=DeliveryOffer.default_expires_at(now),
+                ))
+        insert(DeliveryQuote, quotes)
+        insert(DeliveryOffer, offers)
+
+        # Los domicilios se generan e insertan por lotes para no retener millones de filas
+        with without_auto_now(Delivery, 'created_at', 'updated_at'), without_auto_now(DeliveryHistory, 'created_at'):
+            remaining = options.deliveries
+            while remaining > 0:
+                batch, history = [], []
+                for _ in range(min(chunk, remaining)):
+                    driver_id = rng.choice(result.driver_ids)
+                    delivery, path, moments, cancelled_from = gen.delivery(
+                        rng.choice(result.client_ids), driver_id, vehicle_by_driver[driver_id],
+                    )
+                    batch.append(delivery)
+                    if options.with_history:
+                        history.extend(gen.history(delivery, path, moments, cancelled_from))
+                insert(Delivery, batch)
+                if history:
+                    insert(DeliveryHistory, history)
+                remaining -= len(batch)
+
+    return result
@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from deliveries.models import Delivery
+from deliveries.services import delivery_cache
+
+
+# Timestamp que se fija al entrar en cada estado (además de updated_at)
+STATUS_TIMESTAMPS = {
+    'delivered': 'completed_at',
+    'cancelled': 'cancelled_at',
+}
+
+
+def transition(delivery, new_status):
+    """Cambia el estado de `delivery` con un UPDATE condicional (compare-and-swap).
+
+    La sentencia solo afecta la fila si sigue en el estado y la versión que se
+    leyeron (`WHERE id = ? AND status = ? AND version = ?`) y escribe únicamente
+    `status`, los timestamps y `version`. Devuelve False si otra petición cambió
+    la fila entretanto; en ese caso la instancia no se modifica.
+    """
+    now = timezone.now()
+    changes = {'status': new_status, 'updated_at': now, 'version': F('version') + 1}
+    timestamp_field = STATUS_TIMESTAMPS.get(new_status)
+    if timestamp_field and getattr(delivery, timestamp_field) is None:
+        changes[timestamp_field] = now
+
+    rows = Delivery.objects.filter(pk=delivery.pk, status=delivery.status, version=delivery.version)
+    if not rows.update(**changes):
+        return False
+
+    delivery_cache.invalidate(delivery.pk)
+
+    # Reflejar en memoria lo que quedó en la base de datos
+    changes['version'] = delivery.version + 1
+    for field, value in changes.items():
+        setattr(delivery, field, value)
+    return True
+
+
+class TransitionConflict(Exception):
+    """Alguna fila cambió de estado entre la lectura y el UPDATE por lotes."""
+
+
+def bulk_transition(changes):
+    """Aplica varias transiciones [(delivery, nuevo_estado)] con UPDATEs por conjunto.
+
+    Agrupa por (estado actual, estado nuevo) y emite un UPDATE condicional por
+    grupo (`WHERE id IN (...) AND status = ?`). Como cada transición cambia el
+    estado y el flujo no tiene ciclos, coincidir en estado implica coincidir en
+    versión. Si algún grupo no actualiza todas sus filas se lanza
+    `TransitionConflict` y la transacción se revierte completa.
+    """
+    now = timezone.now()
+    groups = defaultdict(list)
+    for delivery, new_status in changes:
+        groups[(delivery.status, new_status)].append(delivery)
+
+    with transaction.atomic():
+        for (old_status, new_status), deliveries in groups.items():
+            values = {'status': new_status, 'updated_at': now, 'version': F('version') + 1}
+            timestamp_field = STATUS_TIMESTAMPS.get(new_status)
+            if timestamp_field:
+                values[timestamp_field] = Coalesce(F(timestamp_field), Value(now))
+            updated = Delivery.objects.filter(
+                pk__in=[delivery.pk for delivery in deliveries], status=old_status
+            ).update(**values)
+            if updated != len(deliveries):
+                raise TransitionConflict(old_status)
+            for delivery in deliveries:
+                delivery_cache.invalidate(delivery.pk)
+
+    for delivery, new_status in changes:
+        timestamp_field = STATUS_TIMESTAMPS.get(new_status)
+        if timestamp_field and getattr(delivery, timestamp_field) is None:
+            setattr(delivery, timestamp_field, now)
+        delivery.status = new_status
+        delivery.updated_at = now
+        delivery.version += 1
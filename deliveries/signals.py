@@ -1,78 +1,74 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from .models import DeliveryQuote, DeliveryOffer, Delivery
+from users.models import User, UserRating
+from vehicles.models import Vehicle, VehicleType
+from .models import DeliveryCategory, DeliveryQuote, DeliveryOffer, Delivery
 from .serializers import DeliveryQuoteSerializer, DeliveryOfferSerializer, DeliverySerializer
-import json
+from .services import delivery_cache
+from .services.broadcasts import broadcast_on_commit, render
+from .services.catalog import bump_version
 
-channel_layer = get_channel_layer()
 
 @receiver(post_save, sender=DeliveryQuote)
 def on_quote_created(sender, instance, created, **kwargs):
     if created:
-        data = DeliveryQuoteSerializer(instance).data
-        # Convertir a JSON y back para asegurar que todos los tipos son serializables
-        safe_data = json.loads(json.dumps(data, default=str))
-        async_to_sync(channel_layer.group_send)(
-            'new_quotes',
-            {'type': 'broadcast', 'data': {'type': 'quote_created', 'data': safe_data}}
-        )
-        async_to_sync(channel_layer.group_send)(
-            f'quote_{instance.id}',
-            {'type': 'broadcast', 'data': {'type': 'quote_created', 'data': safe_data}}
-        )
-        async_to_sync(channel_layer.group_send)(
-            f'user_quotes_{instance.client_id}',
-            {'type': 'broadcast', 'data': {'type': 'quote_created', 'data': safe_data}}
+        broadcast_on_commit(
+            ['new_quotes', f'quote_{instance.id}', f'user_quotes_{instance.client_id}'],
+            'quote_created',
+            render('quote_created', DeliveryQuoteSerializer, instance),
         )
 
 @receiver(post_save, sender=DeliveryOffer)
 def on_offer_saved(sender, instance, created, **kwargs):
-    data = DeliveryOfferSerializer(instance).data
-    # Convertir a JSON y back para asegurar que todos los tipos son serializables
-    safe_data = json.loads(json.dumps(data, default=str))
     event_type = 'offer_made' if created else 'offer_updated'
-    async_to_sync(channel_layer.group_send)(
-        f'quote_{instance.quote.id}',
-        {'type': 'broadcast', 'data': {'type': event_type, 'data': safe_data}}
-    )
-    if instance.status == 'accepted':
-        async_to_sync(channel_layer.group_send)(
-            f'quote_{instance.quote.id}',
-            {'type': 'broadcast', 'data': {'type': 'offer.accepted', 'data': safe_data}}
-        )
-    async_to_sync(channel_layer.group_send)(
-        f'user_quotes_{instance.quote.client_id}',
-        {'type': 'broadcast', 'data': {'type': event_type, 'data': safe_data}}
-    )
-    if instance.status == 'accepted':
-        async_to_sync(channel_layer.group_send)(
-            f'user_quotes_{instance.quote.client_id}',
-            {'type': 'broadcast', 'data': {'type': 'offer.accepted', 'data': safe_data}}
-        )
+    groups = [f'quote_{instance.quote_id}', f'user_quotes_{instance.quote.client_id}']
+    # La aceptación (`offer.accepted`) la emite `DeliveryOfferViewSet.accept`
+    broadcast_on_commit(groups, event_type, render(event_type, DeliveryOfferSerializer, instance))
 
 @receiver(post_save, sender=Delivery)
 def on_delivery_saved(sender, instance, created, **kwargs):
-    data = DeliverySerializer(instance).data
-    # Convertir a JSON y back para asegurar que todos los tipos son serializables
-    safe_data = json.loads(json.dumps(data, default=str))
+    delivery_cache.invalidate(instance.id)
     event_type = 'delivery.created' if created else 'delivery.status'
-    async_to_sync(channel_layer.group_send)(
-        f'delivery_{instance.id}',
-        {'type': 'broadcast', 'data': {'type': event_type, 'data': safe_data}}
-    )
-    async_to_sync(channel_layer.group_send)(
-        f'user_deliveries_{instance.client_id}',
-        {'type': 'broadcast', 'data': {'type': event_type, 'data': safe_data}}
-    )
+    groups = [f'delivery_{instance.id}', f'user_deliveries_{instance.client_id}']
     # También notificar al domiciliario asignado (si existe) para que reciba actualizaciones
-    try:
-        delivery_person_id = getattr(instance, 'delivery_person_id', None)
-        if delivery_person_id:
-            async_to_sync(channel_layer.group_send)(
-                f'driver_deliveries_{delivery_person_id}',
-                {'type': 'broadcast', 'data': {'type': event_type, 'data': safe_data}}
-            )
-    except Exception:
-        pass
\ No newline at end of file
+    delivery_person_id = getattr(instance, 'delivery_person_id', None)
+    if delivery_person_id:
+        groups.append(f'driver_deliveries_{delivery_person_id}')
+    broadcast_on_commit(groups, event_type, render(event_type, DeliverySerializer, instance))
+
+
+@receiver(post_save, sender=User)
+def on_user_saved(sender, instance, **kwargs):
+    # El detalle cacheado de sus domicilios incluye al usuario (y su `updated_at` en el ETag)
+    delivery_cache.touch_participant(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserRating)
+def on_rating_changed(sender, instance, **kwargs):
+    # `rating_average`/`rating_count` del usuario calificado salen en el detalle
+    delivery_cache.touch_participant(instance.ratee_id)
+
+
+@receiver(post_save, sender=Vehicle)
+def on_vehicle_saved(sender, instance, **kwargs):
+    # `vehicle_type` del detalle sale del vehículo actual del domiciliario
+    user_ids = {instance.userId_id, *instance.active_drivers.values_list('pk', flat=True)}
+    for user_id in user_ids:
+        delivery_cache.touch_participant(user_id)
+
+
+@receiver([post_save, post_delete], sender=DeliveryCategory)
+@receiver([post_save, post_delete], sender=VehicleType)
+def on_catalog_changed(sender, **kwargs):
+    bump_version()
+
+
+@receiver(m2m_changed, sender=VehicleType.delivery_categories.through)
+def on_vehicle_type_categories_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version()
+
+
+@receiver(post_delete, sender=Delivery)
+def on_delivery_deleted(sender, instance, **kwargs):
+    delivery_cache.invalidate(instance.id)
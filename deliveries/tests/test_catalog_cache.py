@@ -0,0 +1,93 @@
+import uuid
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import User
+from vehicles.models import Vehicle, VehicleType
+from vehicles.serializers import VehicleSerializer
+from deliveries.models import DeliveryCategory, DeliveryQuote
+
+
+@pytest.mark.django_db
+def test_category_list_supports_etag_and_changes_version_on_save():
+    user = User.objects.create(userid="user_cat_1", role="client")
+    DeliveryCategory.objects.create(name="Catálogo A")
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+
+    first = api_client.get("/deliveries/api/categories/")
+    assert first.status_code == 200
+    etag = first['ETag']
+    assert "Catálogo A" in [c['name'] for c in first.data]
+
+    with CaptureQueriesContext(connection) as ctx:
+        cached = api_client.get("/deliveries/api/categories/", HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert not [q for q in ctx.captured_queries if 'deliveries_deliverycategory' in q['sql']]
+
+    DeliveryCategory.objects.create(name="Catálogo B")
+    refreshed = api_client.get("/deliveries/api/categories/", HTTP_IF_NONE_MATCH=etag)
+    assert refreshed.status_code == 200
+    assert refreshed['ETag'] != etag
+    assert "Catálogo B" in [c['name'] for c in refreshed.data]
+
+
+@pytest.mark.django_db
+def test_quote_create_resolves_category_from_catalog():
+    user = User.objects.create(userid="user_cat_2", role="client")
+    category = DeliveryCategory.objects.create(name="Catálogo C")
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+    api_client.get("/deliveries/api/categories/")  # calienta el catálogo
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.post("/deliveries/api/quotes/", {
+            'client_id': user.pk,
+            'category_id': str(category.id),
+            'pickup_address': 'Origen',
+            'delivery_address': 'Destino',
+            'client_price': '9000.00',
+        }, format='json')
+
+    assert response.status_code == 201
+    assert response.data['category'] == "Catálogo C"
+    assert not [q for q in ctx.captured_queries if 'deliveries_deliverycategory' in q['sql']]
+    assert DeliveryQuote.objects.get().category_id == category.id
+
+
+@pytest.mark.django_db
+def test_vehicle_serializer_reads_type_from_catalog_and_sees_updates():
+    owner = User.objects.create(userid="user_cat_3", role="delivery")
+    vehicle_type = VehicleType.objects.create(name="Moto")
+    vehicle = Vehicle.objects.create(
+        userId=owner, type=vehicle_type, brand="Marca", model="Modelo", year=2020,
+        licensePlate="ABC123", vin="VIN00000000000001", color="Rojo",
+    )
+    assert VehicleSerializer(vehicle).data['type']['name'] == "Moto"
+
+    vehicle_type.name = "Motocicleta"
+    vehicle_type.save()
+    assert VehicleSerializer(vehicle).data['type']['name'] == "Motocicleta"
+
+
+@pytest.mark.django_db
+def test_unknown_catalog_pks_do_not_reload_the_catalog_on_every_request(settings):
+    settings.DELIVERIES_CATALOG_MISS_RELOAD_SECONDS = 3600
+    user = User.objects.create(userid="user_cat_4", role="client")
+    DeliveryCategory.objects.create(name="Catálogo D")
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+    api_client.get("/deliveries/api/categories/")  # calienta el catálogo
+
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(3):
+            response = api_client.get(f"/deliveries/api/categories/{uuid.uuid4()}/")
+            assert response.status_code == 404
+    assert not [q for q in ctx.captured_queries if 'deliveries_deliverycategory' in q['sql']]
+
+    # Pasado el plazo, un fallo vuelve a recargar (por si se perdió un cambio de versión)
+    settings.DELIVERIES_CATALOG_MISS_RELOAD_SECONDS = 0
+    with CaptureQueriesContext(connection) as ctx:
+        assert api_client.get(f"/deliveries/api/categories/{uuid.uuid4()}/").status_code == 404
+    assert [q for q in ctx.captured_queries if 'deliveries_deliverycategory' in q['sql']]
@@ -0,0 +1,114 @@
+import pytest
+from decimal import Decimal
+from rest_framework.test import APIClient
+from users.models import User, UserRating
+from vehicles.models import Vehicle, VehicleType
+from deliveries.models import DeliveryCategory, Delivery
+from deliveries.services.transitions import transition
+
+
+def _make_delivery(client_user, driver, suffix):
+    category = DeliveryCategory.objects.create(name=f"Condicional {suffix}")
+    return Delivery.objects.create(
+        client=client_user,
+        delivery_person=driver,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=category,
+        final_price=Decimal("10000.00"),
+    )
+
+
+@pytest.mark.django_db
+def test_delivery_detail_and_list_return_304_until_the_delivery_changes():
+    client_user = User.objects.create(userid="user_cg_c", role="client")
+    driver = User.objects.create(userid="user_cg_d", role="delivery")
+    delivery = _make_delivery(client_user, driver, "1")
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+
+    for url in (f"/deliveries/api/{delivery.id}/", "/deliveries/api/?status=assigned"):
+        first = api_client.get(url)
+        assert first.status_code == 200
+        assert first['Last-Modified']
+        cached = api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        assert cached.status_code == 304
+        assert not cached.content
+
+    detail_etag = api_client.get(f"/deliveries/api/{delivery.id}/")['ETag']
+    transition(delivery, 'picked_up')
+    changed = api_client.get(f"/deliveries/api/{delivery.id}/", HTTP_IF_NONE_MATCH=detail_etag)
+    assert changed.status_code == 200
+    assert changed.data['status'] == 'picked_up'
+
+    # Un domicilio que deja de cumplir el filtro cambia el conteo y por tanto el ETag
+    list_etag = api_client.get("/deliveries/api/?status=picked_up")['ETag']
+    transition(delivery, 'in_transit')
+    assert api_client.get("/deliveries/api/?status=picked_up", HTTP_IF_NONE_MATCH=list_etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_profile_etag_changes_with_received_ratings():
+    user = User.objects.create(userid="user_cg_p", role="delivery")
+    rater = User.objects.create(userid="user_cg_r", role="client")
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+
+    first = api_client.get("/user/api/me/")
+    assert first.status_code == 200
+    assert api_client.get("/user/api/me/", HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
+
+    UserRating.objects.create(ratee=user, rater=rater, rating=9)
+    assert api_client.get("/user/api/me/", HTTP_IF_NONE_MATCH=first['ETag']).status_code == 200
+
+
+@pytest.mark.django_db
+def test_profile_etag_changes_when_a_rating_is_edited():
+    user = User.objects.create(userid="user_cg_p2", role="delivery")
+    rater = User.objects.create(userid="user_cg_r2", role="client")
+    rating = UserRating.objects.create(ratee=user, rater=rater, rating=9)
+    api_client = APIClient()
+    api_client.force_authenticate(user=user)
+    etag = api_client.get("/user/api/me/")['ETag']
+
+    rater_client = APIClient()
+    rater_client.force_authenticate(user=rater)
+    assert rater_client.patch(f"/user/api/user-ratings/{rating.id}/", {'rating': 3}, format='json').status_code == 200
+    refreshed = api_client.get("/user/api/me/", HTTP_IF_NONE_MATCH=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.data[0]['rating_average'] == 3
+
+
+@pytest.mark.django_db
+def test_delivery_list_etag_covers_the_driver_vehicle_and_participant_ratings():
+    client_user = User.objects.create(userid="user_cg_c3", role="client")
+    driver = User.objects.create(userid="user_cg_d3", role="delivery")
+    vehicle = Vehicle.objects.create(
+        userId=driver, type=VehicleType.objects.create(name="Moto condicional"), brand="Marca", model="Modelo",
+        year=2020, licensePlate="CG0003", vin="VINCG000000000003", color="Rojo",
+    )
+    driver.current_vehicle = vehicle
+    driver.save()
+    _make_delivery(client_user, driver, "3")
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+    url = "/deliveries/api/"
+
+    etag = api_client.get(url)['ETag']
+    vehicle.color = "Azul"
+    vehicle.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    etag = response['ETag']
+    rating = UserRating.objects.create(ratee=driver, rater=client_user, rating=9)
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    etag = response['ETag']
+    rating.rating = 4
+    rating.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['results'][0]['delivery_person']['rating_average'] == 4
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
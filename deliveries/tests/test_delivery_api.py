@@ -1,9 +1,11 @@
 import pytest
+from datetime import timedelta
 from decimal import Decimal
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from users.models import User
-from deliveries.models import DeliveryCategory, DeliveryQuote
+from deliveries.models import DeliveryCategory, DeliveryQuote, DeliveryOffer
 
 
 @pytest.mark.django_db
@@ -34,7 +36,7 @@ def test_quote_list_returns_only_authenticated_user_quotes():
 
     assert response.status_code == 200
     # Ahora los usuarios autenticados pueden ver todas las cotizaciones
-    assert len(response.data) == 2
+    assert len(response.data["results"]) == 2
 
 
 @pytest.mark.django_db
@@ -58,3 +60,43 @@ def test_quote_detail_returns_404_for_other_user():
     # Ya no devolvemos 404 para usuarios autenticados; debería retornar 200
     assert response.status_code == 200
     assert response.data["client"]["userid"] == owner.userid
+
+
+@pytest.mark.django_db
+def test_quote_list_and_offers_exclude_expired_rows():
+    client_user = User.objects.create(userid="user_q_5", role="client")
+    driver = User.objects.create(userid="user_q_6", role="delivery")
+    category = DeliveryCategory.objects.create(name="Mercado")
+
+    live_quote = DeliveryQuote.objects.create(
+        client=client_user,
+        pickup_address="Origen D",
+        delivery_address="Destino D",
+        category=category,
+        client_price=Decimal("10000.00"),
+    )
+    DeliveryQuote.objects.create(
+        client=client_user,
+        pickup_address="Origen E",
+        delivery_address="Destino E",
+        category=category,
+        client_price=Decimal("10000.00"),
+        expires_at=timezone.now() - timedelta(minutes=1),
+    )
+    DeliveryOffer.objects.create(
+        delivery_person=driver,
+        quote=live_quote,
+        proposed_price=Decimal("12000.00"),
+        expires_at=timezone.now() - timedelta(minutes=1),
+    )
+
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+
+    response = api_client.get(reverse('delivery-quote-list'))
+    assert response.status_code == 200
+    assert [item["id"] for item in response.data["results"]] == [str(live_quote.id)]
+
+    response = api_client.get(reverse('delivery-quote-offers', args=[live_quote.id]))
+    assert response.status_code == 200
+    assert response.data["results"] == []
@@ -69,7 +69,7 @@ class DeliveryFiltersTest(APITestCase):
         self.auth(self.client_user)
         resp = self.client.get(self.list_url)
         assert resp.status_code == status.HTTP_200_OK
-        ids = {item['id'] for item in resp.json()}
+        ids = {item['id'] for item in resp.json()['results']}
         assert str(self.d1.id) in ids
         assert str(self.d2.id) in ids
         assert str(self.d3.id) not in ids
@@ -78,7 +78,7 @@ class DeliveryFiltersTest(APITestCase):
         self.auth(self.driver_user)
         resp = self.client.get(self.list_url + '?filter_by=delivery_person')
         assert resp.status_code == status.HTTP_200_OK
-        ids = {item['id'] for item in resp.json()}
+        ids = {item['id'] for item in resp.json()['results']}
         # driver assigned to d1,d2,d3
         assert str(self.d1.id) in ids
         assert str(self.d2.id) in ids
@@ -89,7 +89,7 @@ class DeliveryFiltersTest(APITestCase):
         now = timezone.now()
         resp = self.client.get(f"{self.list_url}?month={now.month}")
         assert resp.status_code == status.HTTP_200_OK
-        ids = {item['id'] for item in resp.json()}
+        ids = {item['id'] for item in resp.json()['results']}
         # only d1 is in current month for client_user
         assert str(self.d1.id) in ids
         assert str(self.d2.id) not in ids
@@ -100,7 +100,7 @@ class DeliveryFiltersTest(APITestCase):
         lm = self.d2.created_at
         resp = self.client.get(f"{self.list_url}?month={lm.month}&year={lm.year}")
         assert resp.status_code == status.HTTP_200_OK
-        ids = {item['id'] for item in resp.json()}
+        ids = {item['id'] for item in resp.json()['results']}
         assert str(self.d2.id) in ids
         assert str(self.d1.id) not in ids
 
@@ -119,3 +119,58 @@ class DeliveryFiltersTest(APITestCase):
         self.auth(self.other_user)
         resp = self.client.get(url)
         assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_is_cursor_paginated_newest_first(self):
+        self.auth(self.driver_user)
+        resp = self.client.get(self.list_url + '?filter_by=delivery_person&page_size=2')
+        assert resp.status_code == status.HTTP_200_OK
+        first = resp.json()
+        # d1 y d3 comparten created_at; el id desempata el orden entre ellos
+        assert {item['id'] for item in first['results']} == {str(self.d3.id), str(self.d1.id)}
+        assert first['next'] is not None
+
+        resp = self.client.get(first['next'])
+        second = resp.json()
+        assert [item['id'] for item in second['results']] == [str(self.d2.id)]
+        assert second['next'] is None
+
+    def test_month_filter_returns_summary(self):
+        self.auth(self.driver_user)
+        self.d3.status = 'paid'
+        self.d3.save()
+        now = timezone.now()
+        resp = self.client.get(f"{self.list_url}?filter_by=delivery_person&month={now.month}&year={now.year}")
+        assert resp.status_code == status.HTTP_200_OK
+        payload = resp.json()
+        assert {item['id'] for item in payload['results']} == {str(self.d1.id), str(self.d3.id)}
+        summary = payload['summary']
+        assert summary['count'] == 2
+        assert summary['total'] == '120.00'
+        assert summary['completed_count'] == 1
+        assert summary['completed_total'] == '20.00'
+
+    def test_from_to_range_is_inclusive_by_day(self):
+        self.auth(self.client_user)
+        day = self.d2.created_at.date().isoformat()
+        resp = self.client.get(f"{self.list_url}?from={day}&to={day}")
+        assert resp.status_code == status.HTTP_200_OK
+        ids = {item['id'] for item in resp.json()['results']}
+        assert ids == {str(self.d2.id)}
+
+    def test_month_filter_respects_time_zone(self):
+        self.auth(self.client_user)
+        # 02:00 UTC del día 1 sigue siendo el mes anterior en Bogotá (UTC-5)
+        boundary = datetime.datetime(2025, 3, 1, 2, 0, tzinfo=datetime.timezone.utc)
+        Delivery.objects.filter(pk=self.d1.pk).update(created_at=boundary)
+        resp = self.client.get(f"{self.list_url}?month=2&year=2025&tz=America/Bogota")
+        assert {item['id'] for item in resp.json()['results']} == {str(self.d1.id)}
+        resp = self.client.get(f"{self.list_url}?month=3&year=2025")
+        assert {item['id'] for item in resp.json()['results']} == {str(self.d1.id)}
+
+    def test_invalid_time_zone_falls_back_to_project_zone(self):
+        self.auth(self.client_user)
+        day = self.d2.created_at.date().isoformat()
+        for tz_name in ('America', 'x' * 300, 'No/Existe', '../etc/passwd'):
+            resp = self.client.get(f"{self.list_url}?tz={tz_name}&from={day}&to={day}")
+            assert resp.status_code == status.HTTP_200_OK, tz_name
+            assert {item['id'] for item in resp.json()['results']} == {str(self.d2.id)}
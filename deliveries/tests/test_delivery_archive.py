@@ -0,0 +1,67 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from users.models import User
+from deliveries.models import (
+    DeliveryCategory, DeliveryQuote, DeliveryOffer, DeliveryQuoteArchive, DeliveryOfferArchive
+)
+from deliveries.services.archive import archive_quotes
+from deliveries.services.expiration import expire_quotes_and_offers
+
+
+def _quote(client, category, **kwargs):
+    return DeliveryQuote.objects.create(
+        client=client,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=category,
+        client_price=Decimal("10000.00"),
+        **kwargs
+    )
+
+
+@pytest.mark.django_db
+def test_archive_quotes_moves_quote_and_offers():
+    client = User.objects.create(userid="user_a1", role="client")
+    driver = User.objects.create(userid="user_a2", role="delivery")
+    other_driver = User.objects.create(userid="user_a3", role="delivery")
+    category = DeliveryCategory.objects.create(name="Archivo")
+    quote = _quote(client, category)
+    accepted = DeliveryOffer.objects.create(
+        delivery_person=driver, quote=quote, proposed_price=Decimal("11000.00"), status='accepted'
+    )
+    pending = DeliveryOffer.objects.create(
+        delivery_person=other_driver, quote=quote, proposed_price=Decimal("12000.00")
+    )
+
+    assert archive_quotes([quote.id], 'accepted') == 1
+
+    assert not DeliveryQuote.objects.exists()
+    assert not DeliveryOffer.objects.exists()
+    archived = DeliveryQuoteArchive.objects.get(id=quote.id)
+    assert archived.outcome == 'accepted'
+    assert archived.client_id == client.userid
+    assert archived.history_id == quote.history_id
+    assert archived.bucket == timezone.localtime(quote.created_at).date().replace(day=1)
+    outcomes = dict(DeliveryOfferArchive.objects.values_list('id', 'outcome'))
+    assert outcomes == {accepted.id: 'accepted', pending.id: 'closed'}
+
+
+@pytest.mark.django_db
+def test_expirer_archives_expired_rows():
+    client = User.objects.create(userid="user_a4", role="client")
+    driver = User.objects.create(userid="user_a5", role="delivery")
+    category = DeliveryCategory.objects.create(name="Archivo 2")
+    past = timezone.now() - timedelta(minutes=1)
+    expired_quote = _quote(client, category, expires_at=past)
+    live_quote = _quote(client, category)
+    expired_offer = DeliveryOffer.objects.create(
+        delivery_person=driver, quote=live_quote, proposed_price=Decimal("9000.00"), expires_at=past
+    )
+
+    assert expire_quotes_and_offers() == (1, 1)
+
+    assert list(DeliveryQuote.objects.values_list('id', flat=True)) == [live_quote.id]
+    assert DeliveryQuoteArchive.objects.get(id=expired_quote.id).outcome == 'expired'
+    assert DeliveryOfferArchive.objects.get(id=expired_offer.id).outcome == 'expired'
@@ -0,0 +1,98 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import User, UserRating
+from vehicles.models import Vehicle, VehicleType
+from deliveries.models import DeliveryCategory, Delivery
+
+
+@pytest.mark.django_db
+def test_detail_is_served_from_cache_and_invalidated_by_transitions():
+    client_user = User.objects.create(userid="user_dc_c", role="client")
+    driver = User.objects.create(userid="user_dc_d", role="delivery")
+    stranger = User.objects.create(userid="user_dc_s", role="client")
+    delivery = Delivery.objects.create(
+        client=client_user,
+        delivery_person=driver,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=DeliveryCategory.objects.create(name="Detalle cacheado"),
+        final_price=Decimal("10000.00"),
+    )
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+    url = f"/deliveries/api/{delivery.id}/"
+
+    assert api_client.get(url).status_code == 200
+    with CaptureQueriesContext(connection) as ctx:
+        cached = api_client.get(url)
+        history = api_client.get(f"{url}history/")
+    assert cached.status_code == 200 and history.status_code == 200
+    assert not [q for q in ctx.captured_queries if 'deliveries_delivery"' in q['sql']]
+
+    assert api_client.post(f"{url}change_status/", {}, format='json').status_code == 200
+    refreshed = api_client.get(url)
+    assert refreshed.data['status'] == 'picked_up'
+    assert refreshed.data['version'] == 1
+
+    # El pk en mayúsculas apunta al mismo registro
+    assert api_client.get(f"/deliveries/api/{str(delivery.id).upper()}/").data['status'] == 'picked_up'
+
+    outsider = APIClient()
+    outsider.force_authenticate(user=stranger)
+    assert outsider.get(url).status_code == 404
+    assert outsider.get(f"{url}history/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_participant_changes_refresh_the_cached_detail_and_its_etag():
+    client_user = User.objects.create(userid="user_dc_c2", role="client", first_name="Ana")
+    driver = User.objects.create(userid="user_dc_d2", role="delivery")
+    vehicle = Vehicle.objects.create(
+        userId=driver, type=VehicleType.objects.create(name="Moto detalle"), brand="Marca", model="Modelo",
+        year=2020, licensePlate="DC0002", vin="VINDC000000000002", color="Rojo",
+    )
+    driver.current_vehicle = vehicle
+    driver.save()
+    delivery = Delivery.objects.create(
+        client=client_user,
+        delivery_person=driver,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=DeliveryCategory.objects.create(name="Detalle participantes"),
+        final_price=Decimal("10000.00"),
+    )
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+    url = f"/deliveries/api/{delivery.id}/"
+    etag = api_client.get(url)['ETag']
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    client_user.first_name = "Ana María"
+    client_user.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['client']['first_name'] == "Ana María"
+
+    etag = response['ETag']
+    vehicle.color = "Azul"
+    vehicle.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['delivery_person']['current_vehicle']['color'] == "Azul"
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+    # Las reseñas no tocan el `updated_at` del usuario, pero sí el detalle y su ETag
+    etag = response['ETag']
+    rating = UserRating.objects.create(ratee=driver, rater=client_user, rating=9)
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['delivery_person']['rating_count'] == 1
+
+    etag = response['ETag']
+    rating.delete()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['delivery_person']['rating_count'] == 0
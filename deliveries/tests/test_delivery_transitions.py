@@ -0,0 +1,155 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import DeliveryCategory, Delivery, DeliveryHistory
+from deliveries.services.transitions import transition
+
+
+def _make_delivery(suffix, status='assigned'):
+    client_user = User.objects.create(userid=f"user_tr_c{suffix}", role="client")
+    driver = User.objects.create(userid=f"user_tr_d{suffix}", role="delivery")
+    category = DeliveryCategory.objects.create(name=f"Transiciones {suffix}")
+    delivery = Delivery.objects.create(
+        client=client_user,
+        delivery_person=driver,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=category,
+        final_price=Decimal("10000.00"),
+        status=status,
+    )
+    return client_user, driver, delivery
+
+
+@pytest.mark.django_db
+def test_change_status_updates_only_status_columns_and_bumps_version():
+    _, driver, delivery = _make_delivery("1", status='in_transit')
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.post(f"/deliveries/api/{delivery.id}/change_status/", {}, format='json')
+
+    assert response.status_code == 200
+    assert response.data['new_status'] == 'delivered'
+    assert response.data['delivery']['version'] == 1
+    updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 1
+    assert 'pickup_address' not in updates[0]
+
+    delivery.refresh_from_db()
+    assert delivery.status == 'delivered'
+    assert delivery.completed_at is not None
+    assert delivery.version == 1
+    assert DeliveryHistory.objects.filter(history_id=delivery.history_id, event_type='status_changed').count() == 1
+
+
+@pytest.mark.django_db
+def test_transition_fails_when_row_changed_underneath():
+    _, _, delivery = _make_delivery("2")
+    stale = Delivery.objects.get(pk=delivery.pk)
+
+    assert transition(delivery, 'picked_up') is True
+    # La copia leída antes ya no coincide en estado ni versión
+    assert transition(stale, 'cancelled') is False
+    assert stale.status == 'assigned'
+
+    delivery.refresh_from_db()
+    assert delivery.status == 'picked_up'
+    assert delivery.cancelled_at is None
+
+
+@pytest.mark.django_db
+def test_change_status_and_cancel_return_409_for_stale_version():
+    client_user, driver, delivery = _make_delivery("3")
+    driver_client = APIClient()
+    driver_client.force_authenticate(user=driver)
+    customer_client = APIClient()
+    customer_client.force_authenticate(user=client_user)
+
+    assert driver_client.post(f"/deliveries/api/{delivery.id}/change_status/", {'version': 0}, format='json').status_code == 200
+
+    # El cliente cancela con la versión que tenía en pantalla: el domicilio ya avanzó
+    response = customer_client.post(f"/deliveries/api/{delivery.id}/cancel/", {'version': 0}, format='json')
+    assert response.status_code == 409
+    assert response.data['current_status'] == 'picked_up'
+    assert response.data['version'] == 1
+
+    response = customer_client.post(f"/deliveries/api/{delivery.id}/cancel/", {'version': 1}, format='json')
+    assert response.status_code == 200
+    delivery.refresh_from_db()
+    assert delivery.status == 'cancelled'
+    assert delivery.cancelled_at is not None
+    assert delivery.version == 2
+
+
+@pytest.mark.django_db
+def test_bulk_change_status_applies_all_transitions_and_merges_broadcasts(monkeypatch):
+    client_user, driver, first = _make_delivery("4", status='assigned')
+    second = Delivery.objects.create(
+        client=client_user, delivery_person=driver, pickup_address="Origen 2", delivery_address="Destino 2",
+        category=first.category, final_price=Decimal("5000.00"), status='in_transit',
+    )
+    sent = []
+    monkeypatch.setattr('deliveries.api._broadcast', lambda group, payload: sent.append((group, payload)))
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.post("/deliveries/api/bulk_change_status/", {'items': [
+            {'id': str(first.id), 'status': 'picked_up'},
+            {'id': str(second.id), 'status': 'delivered'},
+        ]}, format='json')
+
+    assert response.status_code == 200
+    assert {r['new_status'] for r in response.data['results']} == {'picked_up', 'delivered'}
+    assert len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]) == 2
+    assert len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]) == 1
+
+    second.refresh_from_db()
+    assert second.status == 'delivered' and second.completed_at is not None and second.version == 1
+    assert DeliveryHistory.objects.filter(event_type='status_changed').count() == 2
+
+    by_group = dict(sent)
+    assert len(sent) == len(by_group)
+    assert by_group[f'driver_deliveries_{driver.pk}']['type'] == 'deliveries_batch'
+    assert len(by_group[f'driver_deliveries_{driver.pk}']['data']) == 2
+    assert by_group[f'delivery_{first.id}']['type'] == 'delivery_status_changed'
+
+
+@pytest.mark.django_db
+def test_bulk_change_status_is_all_or_nothing():
+    _, driver, delivery = _make_delivery("5", status='paid')
+    other = Delivery.objects.create(
+        client=delivery.client, delivery_person=driver, pickup_address="Origen 2", delivery_address="Destino 2",
+        category=delivery.category, final_price=Decimal("5000.00"), status='assigned',
+    )
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+
+    response = api_client.post("/deliveries/api/bulk_change_status/", {'items': [
+        {'id': str(other.id), 'status': 'picked_up'},
+        {'id': str(delivery.id), 'status': 'cancelled'},
+    ]}, format='json')
+
+    assert response.status_code == 400
+    assert str(delivery.id) in response.data['errors']
+    other.refresh_from_db()
+    assert other.status == 'assigned'
+    assert not DeliveryHistory.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_change_status_rejects_bodies_that_are_not_an_object():
+    _, driver, delivery = _make_delivery("6")
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+
+    for body in ([{'id': str(delivery.id), 'status': 'picked_up'}], 5, 'items'):
+        response = api_client.post("/deliveries/api/bulk_change_status/", body, format='json')
+        assert response.status_code == 400, body
+    delivery.refresh_from_db()
+    assert delivery.status == 'assigned'
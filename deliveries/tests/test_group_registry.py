@@ -0,0 +1,190 @@
+import re
+import uuid
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend import metrics
+from backend.asgi import application
+from users.models import User
+from deliveries.models import DeliveryCategory, DeliveryOffer, DeliveryQuote
+from deliveries.serializers import DeliveryOfferSerializer
+from deliveries.services import group_registry
+from deliveries.services.expiration import expire_quotes_and_offers
+from deliveries.services.offers import upsert_offer
+
+
+@pytest.fixture
+def registry(monkeypatch, settings):
+    settings.DELIVERIES_GROUP_REGISTRY_ENABLED = True
+    settings.DELIVERIES_GROUP_HEARTBEAT_SECONDS = 30
+    now = [30 * 1000 + 25.0]
+    monkeypatch.setattr(group_registry, '_clock', lambda: now[0])
+    # Sin hilo de latido: cada test late explícitamente
+    monkeypatch.setattr(group_registry, '_ensure_heartbeat', group_registry.heartbeat)
+    cache.clear()
+    group_registry._local.clear()
+    group_registry._written.clear()
+    yield now
+    cache.clear()
+    group_registry._local.clear()
+    group_registry._written.clear()
+
+
+def _forget_local():
+    """Simula otro worker: solo queda lo volcado en la caché compartida."""
+    group_registry._local.clear()
+    group_registry._written.clear()
+
+
+def _value(sample):
+    match = re.search(rf'^{re.escape(sample)} (\S+)$', metrics.registry.render(), re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_without_heartbeats_every_group_counts_as_live(registry):
+    assert group_registry.live_groups(['quote_a', 'driver_offers_b']) == ['quote_a', 'driver_offers_b']
+
+
+def test_counts_are_shared_through_the_cache_and_expire_by_epoch(registry):
+    group_registry.join('quote_a')
+    group_registry.join('quote_a')
+    group_registry.leave('quote_a')
+    _forget_local()
+
+    assert group_registry.live_groups(['quote_a', 'quote_b']) == ['quote_a']
+
+    # Dos épocas después, sin latidos del worker que la tenía
+    registry[0] += 60
+    group_registry.heartbeat()
+    assert group_registry.live_groups(['quote_a']) == []
+
+
+def test_a_late_heartbeat_never_hides_live_subscribers(registry, monkeypatch):
+    group_registry.join('quote_a')
+    group_registry.join('quote_b')
+    worker = dict(group_registry._local)
+    _forget_local()
+
+    # Casi al final de la época siguiente y el latido del worker todavía no llegó
+    registry[0] = 30 * 1001 + 26
+    assert group_registry.live_groups(['quote_a', 'quote_b', 'quote_c']) == ['quote_a', 'quote_b']
+
+    # El latido tardío vuelca todos sus grupos en una sola llamada
+    calls = []
+    incr_many = cache.incr_many
+    monkeypatch.setattr(cache, 'incr_many', lambda deltas, *args: calls.append(len(deltas)) or incr_many(deltas, *args))
+    group_registry._local.update(worker)
+    group_registry.heartbeat()
+    assert calls == [2]
+    _forget_local()
+    assert group_registry.live_groups(['quote_a', 'quote_b', 'quote_c']) == ['quote_a', 'quote_b']
+
+
+def test_heartbeats_are_aligned_to_half_epochs(registry):
+    offset = group_registry.BEAT_OFFSET
+    assert group_registry._until_next_beat(30 * 1000 + 3.5) == pytest.approx(15 - 3.5 + offset)
+    # Un volcado lento no desplaza el siguiente latido
+    assert group_registry._until_next_beat(30 * 1000 + 15 + 14.0) == pytest.approx(1.0 + offset)
+
+
+def test_leaving_empties_the_group(registry):
+    group_registry.join('quote_a')
+    group_registry.leave('quote_a')
+    assert group_registry.is_live('quote_a') is False
+
+
+@pytest.mark.django_db
+def test_signals_skip_serialization_and_sends_for_groups_without_subscribers(registry, monkeypatch, django_capture_on_commit_callbacks):
+    sent = []
+    monkeypatch.setattr('deliveries.services.broadcasts._broadcast', lambda group, payload: sent.append((group, payload['type'])))
+    client = User.objects.create(userid="user_registry_1", role="client")
+    category = DeliveryCategory.objects.create(name="Registro")
+    group_registry.heartbeat()
+    renders = 'broadcast_render_seconds_count{event="quote_created"}'
+    skipped = 'broadcast_skipped_total{event="quote_created",group="quote_*"}'
+    before_renders, before_skipped = _value(renders), _value(skipped)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DeliveryQuote.objects.create(client=client, pickup_address="A", delivery_address="B",
+                                     category=category, client_price=Decimal("9000.00"))
+    assert sent == []
+    assert _value(renders) == before_renders
+    assert _value(skipped) == before_skipped + 1
+
+    group_registry.join('new_quotes')
+    with django_capture_on_commit_callbacks(execute=True):
+        DeliveryQuote.objects.create(client=client, pickup_address="A", delivery_address="B",
+                                     category=category, client_price=Decimal("9000.00"))
+    assert sent == [('new_quotes', 'quote_created')]
+    assert _value(renders) == before_renders + 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_consumer_registers_on_connect_and_unregisters_on_disconnect(registry):
+    quote_id = uuid.uuid4()
+    group = f'quote_{quote_id}'
+
+    async def connect_and_leave():
+        communicator = WebsocketCommunicator(application, f'/ws/deliveries/quotes/{quote_id}/')
+        connected, _ = await communicator.connect()
+        assert connected
+        assert group_registry._local[group] == 1
+        await communicator.disconnect()
+
+    async_to_sync(connect_and_leave)()
+    assert group not in group_registry._local
+    assert group_registry.is_live(group) is False
+
+
+@pytest.mark.django_db
+def test_explicit_broadcasts_skip_serialization_and_check_the_registry_once(registry, monkeypatch, django_capture_on_commit_callbacks):
+    sent, serialized, lookups = [], [], []
+    monkeypatch.setattr('deliveries.services.broadcasts._broadcast', lambda group, payload: sent.append((group, payload['type'])))
+    monkeypatch.setattr('deliveries.services.expiration._broadcast', lambda group, payload: sent.append((group, payload['type'])))
+    original_to_representation = DeliveryOfferSerializer.to_representation
+
+    def counting_to_representation(serializer, instance):
+        serialized.append(instance.pk)
+        return original_to_representation(serializer, instance)
+    monkeypatch.setattr(DeliveryOfferSerializer, 'to_representation', counting_to_representation)
+    original_get_many = cache.get_many
+    monkeypatch.setattr(cache, 'get_many', lambda keys: lookups.append(keys) or original_get_many(keys))
+
+    client = User.objects.create(userid="user_registry_2", role="client")
+    drivers = [User.objects.create(userid=f"user_registry_d{i}", role="delivery") for i in range(2)]
+    category = DeliveryCategory.objects.create(name="Registro explícito")
+    quote = DeliveryQuote.objects.create(client=client, pickup_address="A", delivery_address="B",
+                                         category=category, client_price=Decimal("9000.00"))
+    offers = [DeliveryOffer.objects.create(quote=quote, delivery_person=driver, proposed_price=Decimal("9500.00"))
+              for driver in drivers]
+    group_registry.heartbeat()
+    api_client = APIClient()
+    api_client.force_authenticate(user=client)
+
+    # Nadie escucha `quote_*`, `user_quotes_*` ni `driver_offers_*`: ni render ni envío
+    serialized.clear()
+    lookups.clear()
+    assert api_client.post(f"/deliveries/api/offers/{offers[0].id}/reject/").status_code == 200
+    assert sent == [] and serialized == []
+    # Una consulta para el `offer_updated` de la señal y otra para el rechazo
+    assert len(lookups) == 2
+
+    # Tampoco al volver a pujar (el upsert no pasa por la señal)
+    with django_capture_on_commit_callbacks(execute=True):
+        upsert_offer(quote, drivers[0], Decimal("9400.00"))
+    assert sent == [] and serialized == []
+
+    # El expirador consulta una vez por lote y solo serializa lo que tiene suscriptores
+    group_registry.join(f'user_quotes_{client.pk}')
+    DeliveryOffer.objects.filter(pk=offers[1].pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+    serialized.clear()
+    lookups.clear()
+    expire_quotes_and_offers()
+    assert serialized == [offers[1].pk]
+    assert sent == [(f'user_quotes_{client.pk}', 'offer_expired')]
+    assert len(lookups) == 1
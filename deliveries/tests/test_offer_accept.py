@@ -0,0 +1,108 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import (
+    DeliveryCategory, DeliveryQuote, DeliveryOffer, Delivery, DeliveryHistory, DeliveryOfferArchive
+)
+
+
+def _setup_quote_with_offers(suffix):
+    client_user = User.objects.create(userid=f"user_acc_c{suffix}", role="client")
+    drivers = [User.objects.create(userid=f"user_acc_d{suffix}_{i}", role="delivery") for i in range(2)]
+    category = DeliveryCategory.objects.create(name=f"Aceptar {suffix}")
+    quote = DeliveryQuote.objects.create(
+        client=client_user,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=category,
+        client_price=Decimal("10000.00"),
+    )
+    offers = [
+        DeliveryOffer.objects.create(delivery_person=driver, quote=quote, proposed_price=Decimal("11000.00"))
+        for driver in drivers
+    ]
+    return client_user, quote, offers
+
+
+@pytest.mark.django_db
+def test_accept_creates_single_delivery_and_broadcasts_on_commit(monkeypatch, django_capture_on_commit_callbacks):
+    client_user, quote, offers = _setup_quote_with_offers("1")
+    sent = []
+    monkeypatch.setattr('deliveries.services.broadcasts._broadcast', lambda group, payload: sent.append((group, payload['type'])))
+
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        response = api_client.post(f"/deliveries/api/offers/{offers[0].id}/accept/", {}, format='json')
+        assert response.status_code == 201
+        # Nada se emite antes del commit
+        assert sent == []
+    for callback in callbacks:
+        callback()
+    assert ('new_quotes', 'quote_accepted') in sent
+    assert (f'quote_{quote.id}', 'offer.accepted') in sent
+    assert (f'user_quotes_{client_user.pk}', 'offer_updated') in sent
+    assert (f'driver_deliveries_{offers[0].delivery_person_id}', 'delivery_assigned') in sent
+
+    delivery = Delivery.objects.get()
+    assert delivery.history_id == quote.history_id
+    assert DeliveryHistory.objects.filter(history_id=quote.history_id, event_type='offer_accepted').count() == 2
+    assert DeliveryOfferArchive.objects.get(id=offers[0].id).outcome == 'accepted'
+
+    # Un segundo toque (u otra oferta de la misma cotización) ya no encuentra nada que aceptar
+    assert api_client.post(f"/deliveries/api/offers/{offers[0].id}/accept/").status_code == 404
+    assert api_client.post(f"/deliveries/api/offers/{offers[1].id}/accept/").status_code == 404
+    assert Delivery.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_accepts_create_one_delivery(monkeypatch):
+    """Dos aceptaciones de la misma cotización que se cruzan antes de reclamarla.
+
+    La segunda se ejecuta completa justo cuando la primera, con la cotización ya
+    leída, va a hacer el `UPDATE ... WHERE status='pending'`: ese UPDATE ya no
+    encuentra la fila pendiente y la primera responde 409. No depende del
+    bloqueo de filas, así que corre igual en SQLite.
+    """
+    client_user, quote, offers = _setup_quote_with_offers("2")
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+    statuses = []
+    raced = []
+    original_update = QuerySet.update
+
+    def update_after_rival(queryset, **kwargs):
+        if queryset.model is DeliveryQuote and kwargs == {'status': 'accepted'} and not raced:
+            raced.append(True)
+            statuses.append(api_client.post(f"/deliveries/api/offers/{offers[1].id}/accept/").status_code)
+        return original_update(queryset, **kwargs)
+
+    monkeypatch.setattr(QuerySet, 'update', update_after_rival)
+    statuses.append(api_client.post(f"/deliveries/api/offers/{offers[0].id}/accept/").status_code)
+
+    # La que se adelantó ganó; la primera perdió el UPDATE condicional
+    assert statuses == [201, 409]
+    delivery = Delivery.objects.get()
+    assert delivery.delivery_person_id == offers[1].delivery_person_id
+    assert DeliveryOfferArchive.objects.get(id=offers[1].id).outcome == 'accepted'
+
+
+@pytest.mark.django_db
+def test_expired_quote_cannot_be_accepted_before_the_sweep():
+    client_user, quote, offers = _setup_quote_with_offers("3")
+    # Vencida, pero el expirador aún no la archivó: sigue en 'pending'
+    DeliveryQuote.objects.filter(pk=quote.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+    api_client = APIClient()
+    api_client.force_authenticate(user=client_user)
+
+    response = api_client.post(f"/deliveries/api/offers/{offers[0].id}/accept/", {}, format='json')
+    assert response.status_code == 409
+    assert not Delivery.objects.exists()
+    quote.refresh_from_db()
+    assert quote.status == 'pending'
+    assert DeliveryOffer.objects.get(pk=offers[0].pk).status == 'pending'
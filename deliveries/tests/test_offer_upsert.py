@@ -0,0 +1,73 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import DeliveryCategory, DeliveryQuote, DeliveryOffer, DeliveryHistory
+
+
+@pytest.mark.django_db
+def test_offer_post_upserts_and_records_history_only_on_insert(monkeypatch, django_capture_on_commit_callbacks):
+    client_user = User.objects.create(userid="user_up_c", role="client")
+    driver = User.objects.create(userid="user_up_d", role="delivery")
+    category = DeliveryCategory.objects.create(name="Upsert")
+    quote = DeliveryQuote.objects.create(
+        client=client_user,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=category,
+        client_price=Decimal("10000.00"),
+    )
+    sent = []
+    monkeypatch.setattr('deliveries.services.broadcasts._broadcast', lambda group, payload: sent.append((group, payload['type'])))
+
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+    url = f"/deliveries/api/quotes/{quote.id}/offers/"
+
+    # Una oferta inválida no deja rastro en el historial
+    assert api_client.post(url, {'proposed_price': '0'}, format='json').status_code == 400
+    assert not DeliveryHistory.objects.filter(history_id=quote.history_id, event_type='offer_made').exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first = api_client.post(url, {'proposed_price': '11000.00'}, format='json')
+    assert first.status_code == 201
+    assert (f'quote_{quote.id}', 'offer_made') in sent
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second = api_client.post(url, {'proposed_price': '10500.00'}, format='json')
+    assert second.status_code == 200
+    assert second.data['id'] == first.data['id']
+    assert (f'quote_{quote.id}', 'offer_updated') in sent
+
+    offer = DeliveryOffer.objects.get()
+    assert offer.proposed_price == Decimal("10500.00")
+    assert offer.expires_at is not None
+    assert DeliveryHistory.objects.filter(history_id=quote.history_id, event_type='offer_made').count() == 1
+
+
+@pytest.mark.django_db
+def test_rebid_on_expired_but_unswept_offer_renews_its_expiration():
+    client_user = User.objects.create(userid="user_up_c2", role="client")
+    driver = User.objects.create(userid="user_up_d2", role="delivery")
+    category = DeliveryCategory.objects.create(name="Upsert vencida")
+    quote = DeliveryQuote.objects.create(
+        client=client_user,
+        pickup_address="Origen",
+        delivery_address="Destino",
+        category=category,
+        client_price=Decimal("10000.00"),
+    )
+    offer = DeliveryOffer.objects.create(quote=quote, delivery_person=driver, proposed_price=Decimal("11000.00"))
+    DeliveryOffer.objects.filter(pk=offer.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+    assert not DeliveryOffer.objects.live().filter(quote=quote).exists()
+
+    api_client = APIClient()
+    api_client.force_authenticate(user=driver)
+    response = api_client.post(f"/deliveries/api/quotes/{quote.id}/offers/", {'proposed_price': '10500.00'}, format='json')
+
+    assert response.status_code == 200
+    assert response.data['id'] == str(offer.id)
+    assert DeliveryOffer.objects.live().filter(quote=quote).count() == 1
+    assert DeliveryOffer.objects.get(pk=offer.pk).expires_at > timezone.now()
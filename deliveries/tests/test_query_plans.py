@@ -0,0 +1,10 @@
+import pytest
+from deliveries.services.query_plans import explain_hot_queries
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_an_index():
+    results = explain_hot_queries()
+    assert results
+    missing = [(name, plan) for name, _, plan, indexed in results if not indexed]
+    assert missing == []
@@ -0,0 +1,73 @@
+import json
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import User
+from deliveries.models import DeliveryCategory, DeliveryQuote
+
+
+def _row(category, i):
+    return {
+        'pickup_address': f'Tienda {i}',
+        'delivery_address': f'Cliente {i}',
+        'category_id': str(category.id),
+        'client_price': '8000.00',
+    }
+
+
+@pytest.mark.django_db
+def test_batch_creates_quotes_without_per_row_lookups_and_one_event(monkeypatch, django_capture_on_commit_callbacks):
+    shop = User.objects.create(userid="user_batch_1", role="client")
+    category = DeliveryCategory.objects.create(name="Lotes")
+    sent = []
+    monkeypatch.setattr('deliveries.services.quote_ingest._broadcast',
+                        lambda group, payload: sent.append((group, payload)))
+    api_client = APIClient()
+    api_client.force_authenticate(user=shop)
+
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+        response = api_client.post("/deliveries/api/quotes/batch/", [_row(category, i) for i in range(5)], format='json')
+
+    assert response.status_code == 201
+    assert response.data['created'] == 5
+    assert DeliveryQuote.objects.filter(client=shop, expires_at__isnull=False).count() == 5
+    # Las categorías salen del catálogo en memoria: a lo sumo la carga inicial del catálogo
+    category_selects = [q for q in ctx.captured_queries if 'deliveries_deliverycategory' in q['sql']]
+    assert len(category_selects) <= 1
+    assert [group for group, _ in sent] == ['new_quotes', f'user_quotes_{shop.pk}']
+    assert sent[0][1]['type'] == 'quotes_created'
+    assert len(sent[0][1]['data']) == 5
+
+
+@pytest.mark.django_db
+def test_batch_accepts_ndjson_and_rejects_whole_load_on_invalid_row():
+    shop = User.objects.create(userid="user_batch_2", role="client")
+    category = DeliveryCategory.objects.create(name="Lotes NDJSON")
+    api_client = APIClient()
+    api_client.force_authenticate(user=shop)
+
+    body = '\n'.join(json.dumps(_row(category, i)) for i in range(3)) + '\n'
+    response = api_client.post("/deliveries/api/quotes/batch/", body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.data['created'] == 3
+
+    bad = _row(category, 99)
+    bad['client_price'] = '0'
+    body = '\n'.join([json.dumps(_row(category, 10)), json.dumps(bad)])
+    response = api_client.post("/deliveries/api/quotes/batch/", body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert 1 in response.data['errors']
+    assert DeliveryQuote.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_batch_rejects_bodies_that_are_not_a_list_of_quotes():
+    shop = User.objects.create(userid="user_batch_3", role="client")
+    api_client = APIClient()
+    api_client.force_authenticate(user=shop)
+
+    for body in ('5', 'true', 'null', '"cotizaciones"', '{"quotes": 5}', '{"otra": []}'):
+        response = api_client.post("/deliveries/api/quotes/batch/", body, content_type='application/json')
+        assert response.status_code == 400, body
+    assert DeliveryQuote.objects.count() == 0
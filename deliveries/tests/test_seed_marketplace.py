@@ -0,0 +1,61 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from users.models import User, UserRating
+from vehicles.models import Vehicle
+from deliveries.models import Delivery, DeliveryHistory, DeliveryOffer, DeliveryQuote
+
+
+def _seed(**kwargs):
+    options = dict(clients=30, drivers=8, pending_quotes=10, deliveries=200, years=1,
+                   until='2026-01-01', chunk_size=64, stdout=StringIO())
+    options.update(kwargs)
+    call_command('seed_marketplace', **options)
+
+
+@pytest.mark.django_db
+def test_seed_marketplace_builds_consistent_dataset():
+    _seed()
+
+    assert User.objects.filter(userid__startswith='seed_client_').count() == 30
+    drivers = User.objects.filter(userid__startswith='seed_driver_')
+    assert drivers.count() == 8
+    assert drivers.filter(current_vehicle__isnull=False).count() == 8
+    assert Vehicle.objects.count() == 8
+    assert UserRating.objects.count() == 8 * 5
+    assert DeliveryQuote.objects.live().filter(status='pending').count() == 10
+    assert DeliveryOffer.objects.filter(quote__status='pending').count() <= 10 * 3
+
+    deliveries = Delivery.objects.all()
+    assert deliveries.count() == 200
+    assert not deliveries.filter(status='paid', completed_at__isnull=True).exists()
+    assert not deliveries.filter(status='cancelled', cancelled_at__isnull=True).exists()
+    # Cada domicilio tiene al menos cotización, oferta y aceptación en su historial
+    sample = deliveries.first()
+    assert DeliveryHistory.objects.filter(history_id=sample.history_id).count() >= 3
+
+
+@pytest.mark.django_db
+def test_seed_marketplace_is_deterministic_and_refuses_duplicate_prefix():
+    _seed(deliveries=20, no_history=True)
+    first = list(Delivery.objects.order_by('id').values_list('id', 'status', 'final_price', 'created_at'))
+    assert not DeliveryHistory.objects.exists()
+
+    with pytest.raises(CommandError):
+        _seed(deliveries=20, no_history=True)
+
+    User.objects.filter(userid__startswith='seed_').delete()
+    _seed(deliveries=20, no_history=True)
+    second = list(Delivery.objects.order_by('id').values_list('id', 'status', 'final_price', 'created_at'))
+    assert first == second
+
+
+@pytest.mark.django_db
+def test_prefixes_sharing_their_start_can_be_seeded_side_by_side():
+    _seed(deliveries=5, no_history=True)
+    _seed(deliveries=5, no_history=True, prefix='seed2')
+
+    assert Vehicle.objects.count() == 16
+    assert Vehicle.objects.values('vin').distinct().count() == 16
+    assert Vehicle.objects.values('licensePlate').distinct().count() == 16
@@ -1,6 +1,6 @@
 Param(
     [string]$ProjectPath = "C:\Trabajo-local\Domicilio Donatello (Navidad)\Hermez_backend",
-    [int]$IntervalSeconds = 60,
+    [int]$IntervalSeconds = 600,
     [string]$PythonExe = "python"
 )
 
@@ -2,6 +2,10 @@ from .models import User, UserRating
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Count, Max
+from backend.conditional import conditional_response, digest_etag, latest
+from backend.pagination import CreatedAtCursorPagination
+from deliveries.services.catalog import catalog_version
 from .serializers import UserSerializer, UserRatingSerializer
 from users.authentication import ClerkAuthentication
 from vehicles.models import Vehicle
@@ -17,6 +21,38 @@ class UserViewSet(viewsets.ModelViewSet):
         else:
             return User.objects.none()
 
+    def _profile_validators(self, pk):
+        """ETag y Last-Modified del perfil con una sola consulta, sin serializar.
+
+        Cubre los campos del usuario, su vehículo actual, las reseñas recibidas
+        (conteo y última modificación, de donde sale el promedio) y el catálogo.
+        """
+        row = self.get_queryset().filter(pk=pk).values('updated_at', 'current_vehicle__updated_at').annotate(
+            rating_count=Count('received_ratings'),
+            last_rating=Max('received_ratings__updated_at'),
+        ).order_by('pk').first()
+        if row is None:
+            return None, None
+        etag = digest_etag('profile', pk, catalog_version(), *row.values())
+        return etag, latest(row['updated_at'], row['current_vehicle__updated_at'], row['last_rating'])
+
+    def list(self, request, *args, **kwargs):
+        """GET /user/api/me/ con soporte de If-None-Match (304)."""
+        etag, last_modified = self._profile_validators(request.user.pk)
+        if etag is None:
+            return super().list(request, *args, **kwargs)
+        return conditional_response(
+            request, etag, last_modified, lambda: super(UserViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self._profile_validators(kwargs.get('pk'))
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request, etag, last_modified, lambda: super(UserViewSet, self).retrieve(request, *args, **kwargs)
+        )
+
     ## Funciones para la gestion del usuario: se busca que solo el propio usuario pueda actualizar o eliminar su perfil
     def update(self, request, *args, **kwargs):
         """
@@ -60,9 +96,7 @@ class UserViewSet(viewsets.ModelViewSet):
         GET /api/users/{pk}/ratings/ -> lista los UserRating recibidos por el usuario
         """
         user = self.get_object()
-        ratings = user.received_ratings.all()
-        serializer = UserRatingSerializer(ratings, many=True, context=self.get_serializer_context())
-        return Response(serializer.data)
+        return self._paginated_ratings(request, user.received_ratings.all())
 
     @action(detail=False, methods=['get'], url_path='ratings')
     def my_ratings(self, request):
@@ -70,9 +104,14 @@ class UserViewSet(viewsets.ModelViewSet):
         GET /user/api/me/ratings/ -> lista las reseñas recibidas del usuario autenticado (sin pasar pk)
         """
         user = request.user
-        ratings = user.received_ratings.all()
-        serializer = UserRatingSerializer(ratings, many=True, context=self.get_serializer_context())
-        return Response(serializer.data)
+        return self._paginated_ratings(request, user.received_ratings.all())
+
+    def _paginated_ratings(self, request, ratings):
+        # El listado de /me/ devuelve un único usuario y no se pagina; solo las reseñas.
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(ratings, request, view=self)
+        serializer = UserRatingSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['post'], url_path='set-current-vehicle')
     def set_current_vehicle(self, request):
@@ -101,12 +140,12 @@ class UserViewSet(viewsets.ModelViewSet):
         # Si el vehículo enviado es el mismo que el actual, deseleccionarlo (poner a null)
         if getattr(user, 'current_vehicle_id', None) == vehicle.vehicleId:
             user.current_vehicle = None
-            user.save(update_fields=['current_vehicle'])
+            user.save(update_fields=['current_vehicle', 'updated_at'])
             return Response({'message': 'Vehículo deseleccionado correctamente', 'vehicle_id': None}, status=status.HTTP_200_OK)
 
         # Asignar y guardar
         user.current_vehicle = vehicle
-        user.save(update_fields=['current_vehicle'])
+        user.save(update_fields=['current_vehicle', 'updated_at'])
 
         return Response({'message': 'Vehículo actual establecido correctamente', 'vehicle_id': str(vehicle.vehicleId)}, status=status.HTTP_200_OK)
 
@@ -114,6 +153,7 @@ class UserRatingViewSet(viewsets.ModelViewSet):
     queryset = UserRating.objects.all()
     serializer_class = UserRatingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     authentication_classes = [ClerkAuthentication]
 
     def get_serializer_context(self):
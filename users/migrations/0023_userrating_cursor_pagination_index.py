@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0022_user_username_alter_user_userid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userrating',
+            index=models.Index(fields=['ratee', 'created_at', 'id'], name='user_rating_ratee_i_407fcc_idx'),
+        ),
+    ]
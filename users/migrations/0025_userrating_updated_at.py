@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0024_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userrating',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
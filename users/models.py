@@ -36,6 +36,9 @@ class User(models.Model):
     # Campo de contraseña requerido por Django, pero no usado por Clerk
     password = models.CharField(max_length=128, blank=True, null=True)
 
+    # Validador para GET condicionales del perfil (ETag/Last-Modified)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
     USERNAME_FIELD = 'userid'
     REQUIRED_FIELDS = []
 
@@ -75,7 +78,7 @@ class User(models.Model):
         Invierte el estado de `is_available`, guarda el cambio y devuelve el nuevo valor (bool).
         """
         self.is_available = not self.is_available
-        self.save(update_fields=['is_available'])
+        self.save(update_fields=['is_available', 'updated_at'])
         return self.is_available
 
 class UserRating(models.Model):
@@ -85,9 +88,14 @@ class UserRating(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     rating = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(10)])
     comment = models.TextField(blank=True, null=True)
+    # Validador para GET condicionales: editar una reseña cambia el promedio del perfil
+    updated_at = models.DateTimeField(auto_now=True, null=True)
     
     class Meta:
         db_table = 'user_rating'
+        indexes = [
+            models.Index(fields=['ratee', 'created_at', 'id']),  # Paginación por cursor
+        ]
 
     def __str__(self):
         return f"Rating {self.id} - Score: {self.rating}"
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from backend.metrics import TimedRepresentationMixin
 from django.db.models import Avg, Count
 from .models import User, UserRating
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     current_vehicle = serializers.SerializerMethodField(read_only=True)
     current_vehicle_id = serializers.PrimaryKeyRelatedField(
         source='current_vehicle',
@@ -48,7 +49,7 @@ class UserSerializer(serializers.ModelSerializer):
         from vehicles.models import Vehicle
         self.fields['current_vehicle_id'].queryset = Vehicle.objects.all()
 
-class UserRatingSerializer(serializers.ModelSerializer):
+class UserRatingSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     # Lectura: datos completos del usuario
     ratee = UserSerializer(read_only=True)
     rater = UserSerializer(read_only=True)
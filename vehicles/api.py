@@ -1,12 +1,14 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from deliveries.services.catalog import CatalogViewSetMixin
 from .models import Vehicle, VehicleType
 from .serializers import VehicleSerializer, VehicleTypeSerializer
 
 
-class VehicleTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class VehicleTypeViewSet(CatalogViewSetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = VehicleType.objects.all()
+    catalog_name = 'vehicle_types'
     serializer_class = VehicleTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
 
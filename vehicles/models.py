@@ -44,6 +44,7 @@ class Vehicle(models.Model):
     criminalRecordStatus = models.CharField(max_length=20, default='pending')
     isVerified = models.BooleanField(default=False)
     verificationNotes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
 
     def __str__(self):
         return f'{self.brand} {self.model} ({self.licensePlate})'
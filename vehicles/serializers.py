@@ -1,16 +1,19 @@
 from rest_framework import serializers
+from backend.metrics import TimedRepresentationMixin
+from deliveries.services.catalog import CatalogPrimaryKeyRelatedField, lookup, memoized
 from .models import Vehicle, VehicleType
 
 
-class VehicleTypeSerializer(serializers.ModelSerializer):
+class VehicleTypeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = VehicleType
         fields = '__all__'
 
 
-class VehicleSerializer(serializers.ModelSerializer):
-    type = VehicleTypeSerializer(read_only=True)
-    type_id = serializers.PrimaryKeyRelatedField(
+class VehicleSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    type = serializers.SerializerMethodField()
+    type_id = CatalogPrimaryKeyRelatedField(
+        'vehicle_types',
         queryset=VehicleType.objects.all(),
         source='type',
         write_only=True,
@@ -38,4 +41,17 @@ class VehicleSerializer(serializers.ModelSerializer):
             'isVerified',
             'verificationNotes',
         )
-        read_only_fields = ('userId', 'vehicleId')
\ No newline at end of file
+        read_only_fields = ('userId', 'vehicleId')
+
+    def get_type(self, obj):
+        """Tipo de vehículo serializado una sola vez por versión del catálogo."""
+        if obj.type_id is None:
+            return None
+        return vehicle_type_data(obj.type_id)
+
+
+def vehicle_type_data(type_id):
+    vehicle_type = lookup('vehicle_types', type_id)
+    if vehicle_type is None:
+        return None
+    return memoized(('vehicle_type', type_id), lambda: VehicleTypeSerializer(vehicle_type).data)